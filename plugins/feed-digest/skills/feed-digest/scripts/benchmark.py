@@ -0,0 +1,840 @@
+#!/usr/bin/env python3
+"""
+Benchmark the feed-digest scripts against a local stand-in server.
+
+A mock HTTP server (run as a subprocess) serves synthetic RSS 2.0 / Atom
+feeds and stand-ins for the GitHub REST, search and GraphQL APIs, Tavily,
+Exa, Discourse, HN Algolia and SOV2EX, with injectable latency and error
+rates. Each stage runs in a fresh worker process with its own cache
+directory, so peak RSS and CPU time are per stage.
+
+Usage:
+    python benchmark.py
+    python benchmark.py --feeds 200 --items 50 --latency-ms 20 --error-rate 0.02
+    python benchmark.py --latency-ms "5,tavily=300,exa=250" --stages search
+    python benchmark.py --output bench.json --compare last.json
+
+Output: JSON with per-stage throughput, p50/p99 latency, CPU time and peak
+RSS, plus the parameters of the run.
+"""
+
+import sys
+import os
+import json
+import gzip
+import random
+import hashlib
+import argparse
+import asyncio
+import platform
+import subprocess
+import tempfile
+import threading
+import time
+from datetime import datetime, timezone
+from email.utils import format_datetime
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import urlsplit, parse_qsl, urlencode
+from xml.sax.saxutils import escape
+
+try:
+    import resource
+except ImportError:  # Windows
+    resource = None
+
+from latency import percentile
+
+SCRIPTS_DIR = os.path.dirname(os.path.abspath(__file__))
+# Stages in run order; stages sharing a cache group share a cache directory,
+# so feeds-warm revalidates what feeds fetched.
+STAGES = {
+    'feeds': 'feeds',
+    'feeds-warm': 'feeds',
+    'feeds-async': 'feeds-async',
+    'github-rest': 'github',
+    'github-graphql': 'github',
+    'search': 'search',
+    'parse': None,
+    'parse-pool': None,
+    'dedup': None,
+    'filter': None,
+    'posts': None,
+    'index': 'index',
+}
+ENDPOINTS = ('feeds', 'github', 'tavily', 'exa', 'discourse', 'algolia', 'sov2ex')
+# One story in SHARED_EVERY is cross-posted by every feed, for dedup to merge.
+SHARED_EVERY = 7
+CHUNK_SIZE = 64 * 1024
+
+WORDS = (
+    'rust python release compiler kernel linux async runtime database index query cache '
+    'latency memory garbage collector benchmark profile network protocol http server client '
+    'browser engine javascript typescript webassembly container kubernetes cluster storage '
+    'security vulnerability patch update design pattern library framework testing debugging '
+    'performance scaling concurrency thread process scheduler model training inference gpu '
+    'open source community maintainer review feature roadmap tutorial guide 性能 优化 发布 数据库'
+).split()
+
+
+# =============================================================================
+# Synthetic data
+# =============================================================================
+
+def sentence(rng, count):
+    return ' '.join(rng.choice(WORDS) for _ in range(count))
+
+
+def feed_items(index, items, desc_words, now, seed):
+    """(title, link, html description, timestamp) of one feed's items, newest first."""
+    rng = random.Random(seed * 100003 + index)
+    entries = []
+    for j in range(items):
+        timestamp = now - j * 3600 - rng.randrange(3600)
+        if j % SHARED_EVERY == SHARED_EVERY - 1:
+            story = random.Random(seed * 7919 + j)
+            title = f"Shared story {j}: {sentence(story, 6)}"
+            link = f"https://news.example.com/story/{j}?utm_source=feed{index}"
+            body = sentence(story, desc_words)
+        else:
+            title = sentence(rng, 8).capitalize()
+            link = f"https://blog{index}.example.com/posts/{j}"
+            body = sentence(rng, desc_words)
+        entries.append((title, link, f"<p>{escape(body)}</p>", timestamp))
+    return entries
+
+
+def rss_feed(index, entries):
+    items = ''.join(
+        f"<item><title>{escape(title)}</title><link>{escape(link)}</link>"
+        f"<description>{escape(description)}</description>"
+        f"<pubDate>{format_datetime(datetime.fromtimestamp(ts, timezone.utc))}</pubDate>"
+        f"<guid>{escape(link)}</guid></item>\n"
+        for title, link, description, ts in entries
+    )
+    return (f'<?xml version="1.0" encoding="UTF-8"?>\n<rss version="2.0"><channel>'
+            f'<title>Synthetic RSS {index}</title><link>https://blog{index}.example.com/</link>\n'
+            f'{items}</channel></rss>\n')
+
+
+def atom_feed(index, entries):
+    items = ''.join(
+        f'<entry><title>{escape(title)}</title><link href="{escape(link)}"/>'
+        f'<id>{escape(link)}</id>'
+        f'<updated>{datetime.fromtimestamp(ts, timezone.utc).isoformat()}</updated>'
+        f'<summary type="html">{escape(description)}</summary></entry>\n'
+        for title, link, description, ts in entries
+    )
+    return (f'<?xml version="1.0" encoding="UTF-8"?>\n<feed xmlns="http://www.w3.org/2005/Atom">'
+            f'<title>Synthetic Atom {index}</title>\n{items}</feed>\n')
+
+
+def feed_body(index, items, desc_words, now, seed):
+    """Feed `index` as bytes: even feeds are RSS 2.0, odd ones Atom."""
+    entries = feed_items(index, items, desc_words, now, seed)
+    build = rss_feed if index % 2 == 0 else atom_feed
+    return build(index, entries).encode('utf-8')
+
+
+def feed_urls(base_url, count):
+    return [{'url': f"{base_url}/feeds/{i}.xml", 'name': f"Feed {i}"} for i in range(count)]
+
+
+def repo_names(count):
+    return [f"bench-org/repo{i}" for i in range(count)]
+
+
+def rest_issue(repo, number, now, rng):
+    created = datetime.fromtimestamp(now - number * 600, timezone.utc)
+    issue = {
+        'number': number,
+        'title': sentence(rng, 8).capitalize(),
+        'html_url': f"https://github.com/{repo}/issues/{number}",
+        'body': sentence(rng, 60),
+        'created_at': created.strftime('%Y-%m-%dT%H:%M:%SZ'),
+        'user': {'login': f"user{rng.randrange(500)}"},
+        'comments': rng.randrange(30),
+        'labels': [{'name': rng.choice(('bug', 'enhancement', 'question'))}],
+        'reactions': {'+1': rng.randrange(20), 'heart': rng.randrange(5),
+                      'hooray': rng.randrange(3), 'rocket': rng.randrange(3)},
+    }
+    if number % 10 == 0:
+        issue['pull_request'] = {'url': issue['html_url']}
+    return issue
+
+
+def graphql_node(issue):
+    return {
+        'number': issue['number'],
+        'title': issue['title'],
+        'url': issue['html_url'],
+        'body': issue['body'],
+        'createdAt': issue['created_at'],
+        'author': issue['user'],
+        'comments': {'totalCount': issue['comments']},
+        'labels': {'nodes': issue['labels']},
+        'thumbsUp': {'totalCount': issue['reactions']['+1']},
+        'heart': {'totalCount': issue['reactions']['heart']},
+        'hooray': {'totalCount': issue['reactions']['hooray']},
+        'rocket': {'totalCount': issue['reactions']['rocket']},
+    }
+
+
+# =============================================================================
+# Mock server
+# =============================================================================
+
+def parse_rates(spec, cast=float):
+    """'5,tavily=300' -> {'*': 5, 'tavily': 300}: a default plus per-endpoint values."""
+    rates = {'*': cast(0)}
+    for part in str(spec).split(','):
+        part = part.strip()
+        if not part:
+            continue
+        name, sep, value = part.rpartition('=')
+        if sep and name not in ENDPOINTS:
+            raise ValueError(f"unknown endpoint {name!r} (expected one of {', '.join(ENDPOINTS)})")
+        rates[name if sep else '*'] = cast(value)
+    return rates
+
+
+class MockHandler(BaseHTTPRequestHandler):
+    """Routes every stand-in API; state lives on self.server."""
+
+    protocol_version = 'HTTP/1.1'
+    # Headers and body go out in separate writes; with Nagle on, delayed ACKs
+    # would add ~40ms to every response.
+    disable_nagle_algorithm = True
+
+    def log_message(self, format, *args):
+        pass
+
+    def do_GET(self):
+        self.route('GET')
+
+    def do_POST(self):
+        self.route('POST')
+
+    def route(self, method):
+        parts = urlsplit(self.path)
+        path, query = parts.path, dict(parse_qsl(parts.query))
+        body = None
+        if method == 'POST':
+            length = int(self.headers.get('Content-Length') or 0)
+            body = json.loads(self.rfile.read(length) or b'{}')
+
+        if path.startswith('/feeds/'):
+            endpoint, handler = 'feeds', self.serve_feed
+        elif path.startswith(('/repos/', '/search/', '/graphql')):
+            endpoint, handler = 'github', self.serve_github
+        else:
+            endpoint = path.strip('/').split('/')[0]
+            handler = getattr(self, f"serve_{endpoint}", None)
+            if handler is None:
+                return self.send_json({'message': 'Not Found'}, 404)
+
+        server = self.server
+        delay = server.latency.get(endpoint, server.latency['*']) / 1000
+        if server.jitter:
+            with server.lock:
+                delay += server.rng.uniform(0, server.jitter / 1000)
+        time.sleep(delay)
+        with server.lock:
+            failed = server.rng.random() < server.errors.get(endpoint, server.errors['*'])
+        if failed:
+            return self.send_json({'message': 'Injected failure'}, 503)
+        handler(path, query, body)
+
+    def send_body(self, payload, status=200, content_type='application/json', headers=None):
+        headers = dict(headers or {})
+        if payload and 'gzip' in (self.headers.get('Accept-Encoding') or ''):
+            payload = gzip.compress(payload, compresslevel=5)
+            headers['Content-Encoding'] = 'gzip'
+        self.send_response(status)
+        self.send_header('Content-Type', content_type)
+        self.send_header('Content-Length', str(len(payload)))
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.end_headers()
+        self.wfile.write(payload)
+
+    def send_json(self, data, status=200, headers=None):
+        self.send_body(json.dumps(data).encode('utf-8'), status, headers=headers)
+
+    # -- feeds ---------------------------------------------------------------
+
+    def serve_feed(self, path, query, body):
+        name = path.rsplit('/', 1)[-1]
+        index = int(name.split('.')[0]) if name.split('.')[0].isdigit() else -1
+        feed = self.server.feeds.get(index)
+        if feed is None:
+            return self.send_json({'message': 'Not Found'}, 404)
+        payload, etag = feed
+        if self.headers.get('If-None-Match') == etag:
+            return self.send_body(b'', 304, headers={'ETag': etag})
+        self.send_body(payload, content_type='application/xml', headers={'ETag': etag})
+
+    # -- GitHub --------------------------------------------------------------
+
+    def repo_issues(self, repo):
+        rng = random.Random(f"{self.server.seed}:{repo}")
+        return [rest_issue(repo, n, self.server.now, rng) for n in range(1, self.server.issues + 1)]
+
+    def rate_headers(self, resource):
+        limit = 30 if resource == 'search' else 5000
+        return {
+            'X-RateLimit-Limit': str(limit),
+            'X-RateLimit-Remaining': str(limit - 1),
+            'X-RateLimit-Reset': str(int(self.server.now) + 3600),
+            'X-RateLimit-Resource': resource,
+        }
+
+    def page(self, items, query, resource):
+        per_page = int(query.get('per_page', 30))
+        page = int(query.get('page', 1))
+        last = max(1, -(-len(items) // per_page))
+        headers = self.rate_headers(resource)
+        if last > 1:
+            base = f"http://{self.headers.get('Host')}{urlsplit(self.path).path}"
+            links = [(rel, p) for rel, p in (('next', page + 1), ('last', last)) if p <= last]
+            headers['Link'] = ', '.join(
+                f'<{base}?{urlencode({**query, "page": p})}>; rel="{rel}"' for rel, p in links
+            )
+        return items[(page - 1) * per_page:page * per_page], headers
+
+    def serve_github(self, path, query, body):
+        if path == '/graphql':
+            return self.serve_graphql(body or {})
+        if path == '/search/issues':
+            repo = next((t[5:] for t in query.get('q', '').split() if t.startswith('repo:')), '')
+            issues = [i for i in self.repo_issues(repo) if 'pull_request' not in i]
+            items, headers = self.page(issues, query, 'search')
+            return self.send_json({'total_count': len(issues), 'items': items}, headers=headers)
+        segments = path.strip('/').split('/')
+        if len(segments) == 4 and segments[3] == 'issues':
+            items, headers = self.page(self.repo_issues('/'.join(segments[1:3])), query, 'core')
+            return self.send_json(items, headers=headers)
+        self.send_json({'message': 'Not Found'}, 404)
+
+    def serve_graphql(self, body):
+        variables = body.get('variables', {})
+        data = {}
+        for i in range(len(variables)):
+            if f'q{i}' in variables:
+                repo = next(t[5:] for t in variables[f'q{i}'].split() if t.startswith('repo:'))
+                nodes = [graphql_node(x) for x in self.repo_issues(repo)[:100]
+                         if 'pull_request' not in x]
+                data[f'r{i}'] = {'nodes': nodes}
+            elif f'o{i}' in variables:
+                repo = f"{variables[f'o{i}']}/{variables[f'n{i}']}"
+                nodes = [graphql_node(x) for x in self.repo_issues(repo)[:100]]
+                data[f'r{i}'] = {'issues': {'nodes': nodes}}
+        data['rateLimit'] = {'cost': 1, 'remaining': 4999, 'resetAt': None}
+        self.send_json({'data': data}, headers=self.rate_headers('graphql'))
+
+    # -- search engines and sites -------------------------------------------
+
+    def search_hits(self, query, count):
+        rng = random.Random(f"{self.server.seed}:{query}:{count}")
+        return [(n, sentence(rng, 8).capitalize(), sentence(rng, 50)) for n in range(count)]
+
+    def serve_tavily(self, path, query, body):
+        hits = self.search_hits(body.get('query', ''), int(body.get('max_results', 10)))
+        self.send_json({'answer': 'Synthetic answer.', 'results': [
+            {'title': title, 'url': f"https://web.example.com/{n}", 'content': text,
+             'score': round(1 - n / 50, 3), 'published_date': ''}
+            for n, title, text in hits
+        ]})
+
+    def serve_exa(self, path, query, body):
+        hits = self.search_hits(body.get('query', ''), int(body.get('numResults', 10)))
+        self.send_json({'results': [
+            {'title': title, 'url': f"https://web.example.com/{n}", 'text': text,
+             'score': round(1 - n / 50, 3), 'publishedDate': ''}
+            for n, title, text in hits
+        ]})
+
+    def serve_discourse(self, path, query, body):
+        hits = self.search_hits(query.get('q', ''), 20)
+        self.send_json({
+            'topics': [{'id': n, 'title': title, 'slug': f"topic-{n}", 'created_at': '',
+                        'reply_count': n, 'like_count': n} for n, title, _ in hits],
+            'posts': [{'topic_id': n, 'blurb': text, 'username': f"user{n}", 'score': n}
+                      for n, _, text in hits],
+        })
+
+    def serve_algolia(self, path, query, body):
+        hits = self.search_hits(query.get('query', ''), int(query.get('hitsPerPage', 20)))
+        self.send_json({'hits': [
+            {'objectID': str(n), 'title': title, 'url': f"https://hn.example.com/{n}",
+             'story_text': text, 'points': 100 - n, 'num_comments': n, 'author': f"user{n}",
+             'created_at': ''}
+            for n, title, text in hits
+        ]})
+
+    def serve_sov2ex(self, path, query, body):
+        hits = self.search_hits(query.get('q', ''), int(query.get('size', 20)))
+        self.send_json({'hits': [
+            {'_score': 10 - n / 10, '_source': {'id': n, 'title': title, 'content': text,
+                                                'member': f"user{n}", 'created': '', 'replies': n}}
+            for n, title, text in hits
+        ]})
+
+
+def serve(args):
+    """Run the mock server until killed; prints its port on the first line of stdout."""
+    server = ThreadingHTTPServer(('127.0.0.1', args.port), MockHandler)
+    server.daemon_threads = True
+    server.lock = threading.Lock()
+    server.rng = random.Random(args.seed)
+    server.seed = args.seed
+    server.now = args.now
+    server.issues = args.issues
+    server.latency = parse_rates(args.latency_ms)
+    server.jitter = args.jitter_ms
+    server.errors = parse_rates(args.error_rate)
+    server.feeds = {}
+    for i in range(args.feeds):
+        payload = feed_body(i, args.items, args.desc_words, args.now, args.seed)
+        server.feeds[i] = (payload, '"%s"' % hashlib.sha1(payload).hexdigest()[:16])
+    print(server.server_address[1], flush=True)
+    server.serve_forever()
+
+
+# =============================================================================
+# Stages (run in a worker process each)
+# =============================================================================
+
+def timed(module, name, samples):
+    """Replace module.name with a wrapper appending each call's duration to samples."""
+    original = getattr(module, name)
+    if asyncio.iscoroutinefunction(original):
+        async def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return await original(*args, **kwargs)
+            finally:
+                samples.append(time.perf_counter() - start)
+    else:
+        def wrapper(*args, **kwargs):
+            start = time.perf_counter()
+            try:
+                return original(*args, **kwargs)
+            finally:
+                samples.append(time.perf_counter() - start)
+    setattr(module, name, wrapper)
+
+
+def synthetic_posts(args):
+    """Every synthetic feed parsed into posts, for the CPU-only stages."""
+    from fetch_feeds import parse_feed
+
+    posts = []
+    for i in range(args.feeds):
+        body = feed_body(i, args.items, args.desc_words, args.now, args.seed)
+        posts.extend(parse_feed([body], f"Feed {i}", f"https://blog{i}.example.com/")[0])
+    return posts
+
+
+def stage_feeds(args, samples, use_async=False):
+    import fetch_feeds
+
+    feeds = feed_urls(args.base_url, args.feeds)
+    if use_async:
+        timed(fetch_feeds, 'fetch_and_parse_feed_async', samples)
+        run = lambda: asyncio.run(fetch_feeds.fetch_all_feeds_async(feeds, use_cache=False))
+    else:
+        timed(fetch_feeds, 'fetch_and_parse_feed', samples)
+        run = lambda: fetch_feeds.fetch_all_feeds(feeds, concurrency=args.concurrency)
+
+    def stage():
+        digest = run()
+        return {
+            'units': len(feeds),
+            'posts': digest['total_posts'],
+            'errors': sum(1 for r in digest['feed_results'] if not r['success']),
+            'cache_hits': sum(1 for r in digest['feed_results'] if r.get('cache') == 'hit'),
+        }
+    return 'feeds', stage
+
+
+def stage_github(args, samples, graphql=False):
+    import fetch_github_issues
+
+    fetch_github_issues.GITHUB_API = args.base_url
+    timed(fetch_github_issues, 'github_request', samples)
+
+    def stage():
+        output = fetch_github_issues.fetch_all_repos(
+            repo_names(args.repos), days=3650, token='benchmark',
+            concurrency=args.concurrency, graphql=graphql,
+        )
+        return {
+            'units': len(output['repo_results']),
+            'posts': output['total_posts'],
+            'errors': sum(1 for r in output['repo_results'] if not r['success']),
+            'requests': len(samples),
+        }
+    return 'repos', stage
+
+
+def stage_search(args, samples):
+    import deep_search
+
+    deep_search.TAVILY_URL = f"{args.base_url}/tavily"
+    deep_search.EXA_URL = f"{args.base_url}/exa"
+    deep_search.HN_SEARCH_URL = f"{args.base_url}/algolia/api/v1/search"
+    deep_search.SOV2EX_URL = f"{args.base_url}/sov2ex/api/search"
+    timed(deep_search, 'fetch_json', samples)
+    config = {
+        'search': {'tavily': {'api_key': 'benchmark'}, 'exa': {'api_key': 'benchmark'}},
+        'sites': [
+            {'url': f"{args.base_url}/discourse", 'type': 'discourse', 'name': 'Discourse'},
+            {'type': 'hackernews'},
+            {'type': 'v2ex'},
+        ],
+    }
+    rng = random.Random(args.seed)
+    queries = [sentence(rng, 3) for _ in range(args.queries)]
+
+    def stage():
+        posts = errors = 0
+        for query in queries:
+            result = deep_search.deep_search(query, config)
+            posts += len(result['all_results'])
+            errors += sum(1 for r in result['engines'] + result['sites'] if not r['success'])
+        return {'units': len(queries), 'posts': posts, 'errors': errors}
+    return 'queries', stage
+
+
+def stage_parse(args, samples):
+    from fetch_feeds import parse_feed
+
+    bodies = [feed_body(i, args.items, args.desc_words, args.now, args.seed)
+              for i in range(args.feeds)]
+
+    def stage():
+        posts = 0
+        for i, body in enumerate(bodies):
+            start = time.perf_counter()
+            chunks = (body[j:j + CHUNK_SIZE] for j in range(0, len(body), CHUNK_SIZE))
+            posts += len(parse_feed(chunks, f"Feed {i}", f"https://blog{i}.example.com/")[0])
+            samples.append(time.perf_counter() - start)
+        return {'units': len(bodies), 'posts': posts, 'bytes': sum(map(len, bodies))}
+    return 'feeds', stage
+
+
+def stage_parse_pool(args, samples):
+    from fetch_feeds import parse_feed_body, start_parse_pool
+
+    bodies = [feed_body(i, args.items, args.desc_words, args.now, args.seed)
+              for i in range(args.feeds)]
+    workers = args.parse_workers or os.cpu_count() or 1
+    pool = start_parse_pool(workers)
+
+    def stage():
+        # Throughput only: per-feed latency would mostly be time queued for a worker.
+        futures = [pool.submit(parse_feed_body, body, f"Feed {i}", f"https://blog{i}.example.com/")
+                   for i, body in enumerate(bodies)]
+        posts = sum(len(future.result()[0]) for future in futures)
+        pool.shutdown()
+        return {'units': len(bodies), 'posts': posts, 'bytes': sum(map(len, bodies)),
+                'workers': workers}
+    return 'feeds', stage
+
+
+def stage_dedup(args, samples):
+    from dedup import Deduplicator
+
+    posts = synthetic_posts(args)
+
+    def stage():
+        deduplicator = Deduplicator()
+        kept = 0
+        for post in posts:
+            start = time.perf_counter()
+            if deduplicator.add(post) is not None:
+                kept += 1
+            samples.append(time.perf_counter() - start)
+        return {'units': len(posts), 'posts': len(posts), 'kept': kept,
+                'duplicates': deduplicator.duplicates}
+    return 'posts', stage
+
+
+def stage_filter(args, samples):
+    from keyword_filter import KeywordFilter, parse_terms
+
+    posts = synthetic_posts(args)
+    matcher = KeywordFilter(parse_terms('rust, python, kernel, 数据库, +release, -vulnerability'))
+
+    def stage():
+        kept = 0
+        for post in posts:
+            start = time.perf_counter()
+            kept += matcher.matches(post['title'], post['description'])
+            samples.append(time.perf_counter() - start)
+        return {'units': len(posts), 'posts': len(posts), 'kept': kept}
+    return 'posts', stage
+
+
+def stage_posts(args, samples):
+    import tracemalloc
+    from columnar import write_columns
+    from posts import to_json
+
+    posts = synthetic_posts(args)
+    cutoff = args.now - 3 * 86400
+    # Memory held by the records themselves: copies share the field strings.
+    tracemalloc.start()
+    copies = [post.copy() for post in posts]
+    post_bytes = tracemalloc.get_traced_memory()[0] / max(1, len(copies))
+    tracemalloc.stop()
+    del copies
+
+    def step(work):
+        start = time.perf_counter()
+        result = work()
+        samples.append(time.perf_counter() - start)
+        return result
+
+    def stage():
+        ordered = step(lambda: sorted(posts, key=lambda p: p.get('timestamp') or 0, reverse=True))
+        recent = step(lambda: [p for p in ordered if (p.get('timestamp') or 0) >= cutoff])
+        size = len(step(lambda: json.dumps(ordered, ensure_ascii=False, default=to_json)))
+        with tempfile.TemporaryDirectory() as tmp:
+            path = os.path.join(tmp, 'posts.cols')
+            step(lambda: write_columns(ordered, path))
+            columns_size = os.path.getsize(path)
+        return {'units': len(posts), 'posts': len(posts), 'recent': len(recent),
+                'post_bytes': round(post_bytes), 'json_bytes': size,
+                'columns_bytes': columns_size,
+                'steps_ms': {name: round(sample * 1000, 1) for name, sample in
+                             zip(('sort', 'filter', 'json', 'columns'), samples)}}
+    return 'posts', stage
+
+
+def stage_index(args, samples):
+    from local_index import LocalIndex
+
+    posts = synthetic_posts(args)
+    rng = random.Random(args.seed)
+    queries = [sentence(rng, 2) for _ in range(args.queries)]
+
+    def stage():
+        with LocalIndex() as index:
+            index.ingest(posts)
+            hits = 0
+            for query in queries:
+                start = time.perf_counter()
+                hits += len(index.search(query))
+                samples.append(time.perf_counter() - start)
+        return {'units': len(queries), 'posts': len(posts), 'hits': hits}
+    return 'queries', stage
+
+
+STAGE_FUNCTIONS = {
+    'feeds': stage_feeds,
+    'feeds-warm': stage_feeds,
+    'feeds-async': lambda args, samples: stage_feeds(args, samples, use_async=True),
+    'github-rest': stage_github,
+    'github-graphql': lambda args, samples: stage_github(args, samples, graphql=True),
+    'search': stage_search,
+    'parse': stage_parse,
+    'parse-pool': stage_parse_pool,
+    'dedup': stage_dedup,
+    'filter': stage_filter,
+    'posts': stage_posts,
+    'index': stage_index,
+}
+
+
+def usage_snapshot():
+    """(CPU seconds, peak RSS in MB) of this process so far."""
+    if resource is None:
+        return time.process_time(), None
+    usage = resource.getrusage(resource.RUSAGE_SELF)
+    # ru_maxrss is in bytes on macOS, kilobytes elsewhere.
+    scale = 1024 * 1024 if sys.platform == 'darwin' else 1024
+    return usage.ru_utime + usage.ru_stime, round(usage.ru_maxrss / scale, 1)
+
+
+def run_stage(name, args):
+    """Set up one stage, time it and return its metrics."""
+    samples = []
+    unit, stage = STAGE_FUNCTIONS[name](args, samples)
+    cpu_before, rss_before = usage_snapshot()
+    start = time.perf_counter()
+    stats = stage()
+    wall = time.perf_counter() - start
+    cpu_after, rss_after = usage_snapshot()
+
+    metrics = {
+        'wall_s': round(wall, 3),
+        'cpu_s': round(cpu_after - cpu_before, 3),
+        'peak_rss_mb': rss_after,
+        'rss_before_mb': rss_before,
+        'unit': unit,
+        f'{unit}_per_s': round(stats['units'] / wall, 1) if wall else None,
+        'posts_per_s': round(stats['posts'] / wall, 1) if wall else None,
+        **stats,
+    }
+    if samples:
+        metrics['latency_ms'] = {
+            'p50': round(percentile(samples, 0.5) * 1000, 2),
+            'p99': round(percentile(samples, 0.99) * 1000, 2),
+            'max': round(max(samples) * 1000, 2),
+            'samples': len(samples),
+        }
+    return metrics
+
+
+# =============================================================================
+# Orchestration
+# =============================================================================
+
+SIZE_FLAGS = ('feeds', 'items', 'desc_words', 'repos', 'issues', 'queries', 'concurrency',
+              'parse_workers', 'seed', 'now')
+
+
+def size_args(args):
+    argv = []
+    for flag in SIZE_FLAGS:
+        argv += [f"--{flag.replace('_', '-')}", str(getattr(args, flag))]
+    return argv
+
+
+def start_server(args):
+    command = [sys.executable, os.path.abspath(__file__), '--serve',
+               '--latency-ms', str(args.latency_ms), '--jitter-ms', str(args.jitter_ms),
+               '--error-rate', str(args.error_rate)] + size_args(args)
+    server = subprocess.Popen(command, stdout=subprocess.PIPE, text=True)
+    port = server.stdout.readline().strip()
+    if not port.isdigit():
+        server.kill()
+        raise RuntimeError('mock server failed to start')
+    return server, f"http://127.0.0.1:{port}"
+
+
+def run_worker(name, args, base_url, cache_dir):
+    env = dict(os.environ, FEED_DIGEST_CACHE_DIR=cache_dir)
+    # The stand-in server must never be reached through a proxy.
+    env['no_proxy'] = env['NO_PROXY'] = ','.join(
+        filter(None, ['127.0.0.1', 'localhost', env.get('no_proxy', '')]))
+    command = [sys.executable, os.path.abspath(__file__), '--stage', name,
+               '--base-url', base_url] + size_args(args)
+    completed = subprocess.run(command, env=env, cwd=SCRIPTS_DIR, capture_output=True, text=True)
+    if completed.returncode != 0:
+        return {'error': (completed.stderr.strip().splitlines() or ['worker failed'])[-1]}
+    return json.loads(completed.stdout)
+
+
+def compare(previous, current):
+    """Print wall time, throughput and p99 of each stage against a previous run."""
+    print(f"{'stage':<16}{'wall_s':>18}{'posts/s':>22}{'p99 ms':>20}", file=sys.stderr)
+
+    def cell(old, new):
+        if old is None or new is None:
+            return f"{new if new is not None else '-':>20}"
+        delta = f" ({(new - old) / old * 100:+.0f}%)" if old else ''
+        return f"{f'{new}{delta}':>20}"
+
+    for name, stage in current['stages'].items():
+        old = previous.get('stages', {}).get(name, {})
+        print(f"{name:<16}"
+              f"{cell(old.get('wall_s'), stage.get('wall_s'))}"
+              f"{cell(old.get('posts_per_s'), stage.get('posts_per_s'))}"
+              f"{cell(old.get('latency_ms', {}).get('p99'), stage.get('latency_ms', {}).get('p99'))}",
+              file=sys.stderr)
+
+
+def run_benchmark(args, stages):
+    server, base_url = start_server(args)
+    report = {
+        'run_at': datetime.now(timezone.utc).isoformat(),
+        'python': platform.python_version(),
+        'platform': platform.platform(),
+        'params': {
+            **{flag: getattr(args, flag) for flag in SIZE_FLAGS if flag != 'now'},
+            'latency_ms': args.latency_ms,
+            'jitter_ms': args.jitter_ms,
+            'error_rate': args.error_rate,
+        },
+        'stages': {},
+    }
+    try:
+        with tempfile.TemporaryDirectory(prefix='feed-digest-bench-') as workdir:
+            for name in stages:
+                cache_dir = os.path.join(workdir, STAGES[name] or name)
+                print(f"  {name}...", file=sys.stderr, flush=True)
+                report['stages'][name] = run_worker(name, args, base_url, cache_dir)
+    finally:
+        server.kill()
+        server.wait()
+    return report
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Benchmark feed-digest against a local mock server')
+    parser.add_argument('--stages', default=','.join(STAGES),
+                        help=f"Comma-separated stages to run (default: all of {', '.join(STAGES)})")
+    parser.add_argument('--feeds', type=int, default=100, help='Synthetic feeds (default: 100)')
+    parser.add_argument('--items', type=int, default=50, help='Items per feed (default: 50)')
+    parser.add_argument('--desc-words', type=int, default=80,
+                        help='Words per item description (default: 80)')
+    parser.add_argument('--repos', type=int, default=20, help='Mock GitHub repos (default: 20)')
+    parser.add_argument('--issues', type=int, default=150, help='Issues per repo (default: 150)')
+    parser.add_argument('--queries', type=int, default=10,
+                        help='Queries for the search and index stages (default: 10)')
+    parser.add_argument('--concurrency', type=int, default=8,
+                        help='Thread pool size for feeds and GitHub (default: 8)')
+    parser.add_argument('--parse-workers', type=int, default=0,
+                        help='Worker processes for the parse-pool stage (default: one per core)')
+    parser.add_argument('--latency-ms', default='5',
+                        help='Server latency in ms, optionally per endpoint: "5,tavily=300" (default: 5)')
+    parser.add_argument('--jitter-ms', type=float, default=5,
+                        help='Random extra latency up to this many ms (default: 5)')
+    parser.add_argument('--error-rate', default='0',
+                        help='Fraction of requests answered 503, optionally per endpoint (default: 0)')
+    parser.add_argument('--seed', type=int, default=1, help='Seed for the synthetic data (default: 1)')
+    parser.add_argument('--output', help='Write the JSON report here instead of stdout')
+    parser.add_argument('--compare', help='Previous JSON report to print deltas against')
+    # Internal: the mock server and stage workers are this script in another process.
+    parser.add_argument('--serve', action='store_true', help=argparse.SUPPRESS)
+    parser.add_argument('--port', type=int, default=0, help=argparse.SUPPRESS)
+    parser.add_argument('--stage', help=argparse.SUPPRESS)
+    parser.add_argument('--base-url', help=argparse.SUPPRESS)
+    parser.add_argument('--now', type=float, default=time.time(), help=argparse.SUPPRESS)
+
+    args = parser.parse_args()
+    try:
+        parse_rates(args.latency_ms)
+        parse_rates(args.error_rate)
+    except ValueError as e:
+        parser.error(str(e))
+
+    if args.serve:
+        serve(args)
+        return
+    if args.stage:
+        print(json.dumps(run_stage(args.stage, args)))
+        return
+
+    stages = [s.strip() for s in args.stages.split(',') if s.strip()]
+    unknown = [s for s in stages if s not in STAGES]
+    if unknown:
+        parser.error(f"unknown stage(s): {', '.join(unknown)}")
+
+    report = run_benchmark(args, stages)
+    output = json.dumps(report, ensure_ascii=False, indent=2)
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            f.write(output + '\n')
+    else:
+        print(output)
+
+    if args.compare:
+        with open(args.compare, encoding='utf-8') as f:
+            compare(json.load(f), report)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+"""
+Columnar export of posts for downstream analysis.
+
+write_columns() stores a batch of posts column by column in a packed
+binary file that read_columns() (or anything that follows the layout
+below) loads back without parsing JSON:
+
+    b'FDCOLS1\\n'
+    uint32 header length, then a UTF-8 JSON header:
+        {"rows": N, "byteorder": "little", "columns": [
+            {"name": ..., "type": ..., "parts": [[array typecode, count], ...]}, ...]}
+    the parts of every column, in header order, as raw arrays
+
+Column types and their parts:
+    float64        timestamp: d[N], NaN for no date
+    string         title, link, description, pub_date:
+                   Q[N+1] offsets into B[...] UTF-8 data
+    dictionary     creator, source, source_url: I[N] codes into a string
+                   column of the distinct values (Q offsets, B data)
+    list<dict>     categories: Q[N+1] offsets into I[...] codes into
+                   distinct values (Q offsets, B data)
+
+If pyarrow is installed, a path ending in .arrow is written as an Arrow
+IPC file instead (dictionary-encoded columns as Arrow dictionaries).
+"""
+
+import sys
+import json
+import math
+import struct
+from array import array
+from itertools import accumulate
+
+try:
+    import pyarrow
+except ImportError:
+    pyarrow = None
+
+MAGIC = b'FDCOLS1\n'
+STRING_COLUMNS = ('title', 'link', 'description', 'pub_date')
+DICTIONARY_COLUMNS = ('creator', 'source', 'source_url')
+
+
+def _string_parts(values):
+    encoded = [(value or '').encode('utf-8') for value in values]
+    offsets = array('Q', accumulate(map(len, encoded), initial=0))
+    return [offsets, array('B', b''.join(encoded))]
+
+
+def _dictionary_parts(values, codes_type='I'):
+    index = {}
+    codes = array(codes_type, (index.setdefault(v or '', len(index)) for v in values))
+    return [codes] + _string_parts(list(index))
+
+
+def write_columns(posts, path):
+    """Write posts (dicts or Posts) to path; returns the number of rows."""
+    if path.endswith('.arrow'):
+        return write_arrow(posts, path)
+    posts = list(posts)
+    columns = []
+    timestamps = array('d', (p.get('timestamp') if p.get('timestamp') is not None else math.nan
+                             for p in posts))
+    columns.append(('timestamp', 'float64', [timestamps]))
+    for name in STRING_COLUMNS:
+        columns.append((name, 'string', _string_parts(p.get(name) for p in posts)))
+    for name in DICTIONARY_COLUMNS:
+        columns.append((name, 'dictionary', _dictionary_parts(p.get(name) for p in posts)))
+    list_offsets = array('Q', [0])
+    flat = []
+    for post in posts:
+        flat.extend(post.get('categories') or ())
+        list_offsets.append(len(flat))
+    columns.append(('categories', 'list<dict>', [list_offsets] + _dictionary_parts(flat)))
+
+    header = {
+        'rows': len(posts),
+        'byteorder': sys.byteorder,
+        'columns': [{'name': name, 'type': kind,
+                     'parts': [[part.typecode, len(part)] for part in parts]}
+                    for name, kind, parts in columns],
+    }
+    header_bytes = json.dumps(header).encode('utf-8')
+    with open(path, 'wb') as f:
+        f.write(MAGIC)
+        f.write(struct.pack('<I', len(header_bytes)))
+        f.write(header_bytes)
+        for _, _, parts in columns:
+            for part in parts:
+                part.tofile(f)
+    return len(posts)
+
+
+def _strings(offsets, data):
+    raw = data.tobytes()
+    return [raw[start:end].decode('utf-8') for start, end in zip(offsets, offsets[1:])]
+
+
+def read_columns(path):
+    """Load a write_columns() file as {column name: list of values}."""
+    with open(path, 'rb') as f:
+        if f.read(len(MAGIC)) != MAGIC:
+            raise ValueError(f'not a feed-digest column file: {path}')
+        (header_size,) = struct.unpack('<I', f.read(4))
+        header = json.loads(f.read(header_size))
+        swap = header['byteorder'] != sys.byteorder
+        result = {}
+        for column in header['columns']:
+            parts = []
+            for typecode, count in column['parts']:
+                part = array(typecode)
+                part.fromfile(f, count)
+                if swap:
+                    part.byteswap()
+                parts.append(part)
+            kind = column['type']
+            if kind == 'float64':
+                values = [None if math.isnan(v) else v for v in parts[0]]
+            elif kind == 'string':
+                values = _strings(*parts)
+            elif kind == 'dictionary':
+                distinct = _strings(parts[1], parts[2])
+                values = [distinct[code] for code in parts[0]]
+            elif kind == 'list<dict>':
+                offsets, codes = parts[0], parts[1]
+                distinct = _strings(parts[2], parts[3])
+                values = [[distinct[code] for code in codes[offsets[i]:offsets[i + 1]]]
+                          for i in range(len(offsets) - 1)]
+            else:
+                raise ValueError(f'unknown column type: {kind}')
+            result[column['name']] = values
+    return result
+
+
+def write_arrow(posts, path):
+    """Write posts as an Arrow IPC file (needs pyarrow)."""
+    if pyarrow is None:
+        raise RuntimeError('writing .arrow files needs pyarrow (pip install pyarrow)')
+    posts = list(posts)
+    data = {'timestamp': pyarrow.array([p.get('timestamp') for p in posts], pyarrow.float64())}
+    for name in STRING_COLUMNS:
+        data[name] = pyarrow.array([p.get(name) or '' for p in posts], pyarrow.string())
+    for name in DICTIONARY_COLUMNS:
+        data[name] = pyarrow.array([p.get(name) or '' for p in posts]).dictionary_encode()
+    data['categories'] = pyarrow.array([list(p.get('categories') or ()) for p in posts],
+                                       pyarrow.list_(pyarrow.string()))
+    table = pyarrow.table(data)
+    with pyarrow.OSFile(path, 'wb') as sink:
+        with pyarrow.ipc.new_file(sink, table.schema) as writer:
+            writer.write_table(table)
+    return len(posts)
@@ -0,0 +1,102 @@
+"""Shared pytest fixtures: an isolated cache directory and a local feed server."""
+
+import os
+import tempfile
+import threading
+from collections import Counter
+from email.utils import formatdate
+from urllib.parse import quote
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from xml.sax.saxutils import escape
+
+import pytest
+
+# Before any script module is imported, so nothing touches ~/.cache.
+os.environ['FEED_DIGEST_CACHE_DIR'] = tempfile.mkdtemp(prefix='feed-digest-test-')
+
+import feed_cache  # noqa: E402
+import transport  # noqa: E402
+
+
+def rss(items, title='Test feed', extra=''):
+    """RSS 2.0 body for (title, epoch timestamp) items, newest first as given."""
+    entries = ''.join(
+        f'<item><title>{escape(item_title)}</title>'
+        f'<link>https://example.com/{quote(item_title)}</link>'
+        f'<description>{escape(item_title)} in detail</description>'
+        f'<pubDate>{formatdate(ts, usegmt=True)}</pubDate></item>'
+        for item_title, ts in items
+    )
+    return (f'<?xml version="1.0"?><rss version="2.0"><channel><title>{escape(title)}</title>'
+            f'{extra}{entries}</channel></rss>').encode('utf-8')
+
+
+class FeedServer:
+    """
+    Serves feeds added with add(); answers 304 when a request's
+    If-None-Match matches the feed's ETag. `hits` counts requests per path
+    and `conditional` those that carried a validator.
+    """
+
+    def __init__(self):
+        self.feeds = {}
+        self.hits = Counter()
+        self.conditional = Counter()
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+
+            def do_GET(self):
+                server.hits[self.path] += 1
+                if self.path not in server.feeds:
+                    self.send_error(404)
+                    return
+                body, etag = server.feeds[self.path]
+                validator = self.headers.get('If-None-Match')
+                if validator:
+                    server.conditional[self.path] += 1
+                if etag and validator == etag:
+                    self.send_response(304)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/rss+xml')
+                if etag:
+                    self.send_header('ETag', etag)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        threading.Thread(target=self.httpd.serve_forever, daemon=True).start()
+
+    def add(self, path, body, etag=None):
+        """Serve body at path; returns the feed's URL."""
+        self.feeds[path] = (body, etag)
+        return f'http://127.0.0.1:{self.httpd.server_port}{path}'
+
+    def close(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+
+@pytest.fixture
+def cache_dir(tmp_path, monkeypatch):
+    """A fresh feed cache directory for one test."""
+    monkeypatch.setattr(feed_cache, 'CACHE_DIR', str(tmp_path / 'cache'))
+    return tmp_path / 'cache'
+
+
+@pytest.fixture
+def feed_server(monkeypatch):
+    monkeypatch.setattr(transport, 'proxy_for', lambda url: None)
+    server = FeedServer()
+    yield server
+    transport.close_all()
+    server.close()
@@ -0,0 +1,403 @@
+#!/usr/bin/env python3
+"""
+Long-running digest daemon: keeps the feeds fresh in the background and
+answers digest, cursor and search requests from memory.
+
+Usage:
+    python daemon.py <feeds_config.json>
+    python daemon.py <feeds_config.json> --port 8765 --interval 300
+    python daemon.py <feeds_config.json> --socket /tmp/feed-digest.sock --search-config <search.json>
+
+A cold fetch_feeds.py run re-imports everything, re-reads its config and
+starts with a new thread pool, no open connections and empty in-memory
+caches. The daemon keeps all of that: one thread pool, the transport's
+keep-alive connections and DNS cache, the health and schedule records, and
+the latest digest. Every --interval seconds it fetches the feeds that are
+due (see schedule.py; the others serve their cached posts), re-reading the
+config files when they change on disk.
+
+Endpoints (JSON):
+    GET  /digest[?limit=N&filter=kw1,kw2]   latest digest, shaped like fetch_feeds.py output
+    GET  /since?cursor=C[&limit=N]          posts first seen after cursor C, oldest first
+    GET  /search?q=...[&top_k=N&deadline=S&local=1]
+                                            deep_search.py over --search-config
+                                            (default: the local index only)
+    GET  /health                            refresh status and per-feed health
+    POST /refresh[?all=1]                   fetch due (or all) feeds now
+
+    curl -s localhost:8765/digest
+    curl -s --unix-socket /tmp/feed-digest.sock 'http://localhost/since?cursor=0'
+
+Cursors are millisecond timestamps of when the daemon first saw a post, so
+they keep increasing across restarts; after a restart the current posts
+are announced again rather than any being skipped.
+"""
+
+import os
+import sys
+import json
+import argparse
+import bisect
+import socket
+import socketserver
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timezone
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlsplit
+
+import transport
+from dates import format_utc
+from dedup import dedupe
+from deep_search import deep_search
+from fetch_feeds import fetch_all_feeds, health_key, parse_since, start_parse_pool
+from health import HealthStore
+from keyword_filter import KeywordFilter, parse_terms
+from latency import LatencyHistory
+from local_index import LocalIndex
+from posts import to_json
+from schedule import FeedSchedule
+from search_cache import DEFAULT_TTLS, SearchCache
+from seen_store import post_key
+
+DEFAULT_PORT = 8765
+DEFAULT_INTERVAL = 300
+# Posts remembered for /since; older cursors get `truncated` results.
+JOURNAL_SIZE = 10000
+LOCAL_ONLY = {'search': {}, 'sites': [{'type': 'local'}]}
+
+
+class ConfigFile:
+    """A JSON file re-read whenever it changes on disk."""
+
+    def __init__(self, path, default=None):
+        self.path = path
+        self.data = default
+        self.mtime = None
+
+    def get(self):
+        if not self.path:
+            return self.data
+        mtime = os.stat(self.path).st_mtime
+        if mtime != self.mtime:
+            with open(self.path) as f:
+                self.data = json.load(f)
+            self.mtime = mtime
+        return self.data
+
+
+class DigestState:
+    """The latest digest plus a journal of posts ordered by first-seen cursor."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.digest = None
+        self.cursor = 0
+        self.journal = []       # (cursor, post), ascending
+        self.cursors = {}       # post key -> cursor
+        self.trimmed_to = 0     # cursor of the newest post dropped from the journal
+
+    def update(self, digest):
+        with self.lock:
+            live = set()
+            # Oldest first, so cursors follow publish order within a refresh.
+            for post in reversed(digest['posts']):
+                key = post_key(post)
+                live.add(key)
+                if key in self.cursors:
+                    continue
+                self.cursor = max(self.cursor + 1, int(time.time() * 1000))
+                self.cursors[key] = self.cursor
+                self.journal.append((self.cursor, post))
+            if len(self.journal) > JOURNAL_SIZE:
+                self.trimmed_to = self.journal[-JOURNAL_SIZE - 1][0]
+                del self.journal[:-JOURNAL_SIZE]
+            if self.journal and len(self.cursors) > len(self.journal):
+                # Forget cursors older than the journal, except those of posts
+                # still in the digest, which must not be announced again.
+                oldest = self.journal[0][0]
+                self.cursors = {key: cursor for key, cursor in self.cursors.items()
+                                if cursor >= oldest or key in live}
+            self.digest = {**digest, 'cursor': self.cursor}
+
+    def since(self, cursor, limit=None):
+        with self.lock:
+            # (c,) sorts before every (c, post), so posts are never compared.
+            start = bisect.bisect_left(self.journal, (cursor + 1,))
+            entries = self.journal[start:start + limit] if limit else self.journal[start:]
+            more = start + len(entries) < len(self.journal)
+            result = {
+                'cursor': entries[-1][0] if entries else max(cursor, self.cursor),
+                'count': len(entries),
+                'posts': [{**post, 'cursor': c} for c, post in entries],
+            }
+            if more:
+                result['more'] = True
+            if cursor < self.trimmed_to:
+                result['truncated'] = True
+            return result
+
+
+class Daemon:
+    """Background refresher plus the request handlers' view of its state."""
+
+    def __init__(self, args):
+        self.args = args
+        self.feeds = ConfigFile(args.config)
+        self.search_config = ConfigFile(args.search_config, LOCAL_ONLY)
+        self.state = DigestState()
+        # Before any thread exists, so the workers fork cleanly.
+        self.parse_pool = start_parse_pool(args.parse_workers)
+        self.executor = ThreadPoolExecutor(max_workers=args.concurrency)
+        self.health = HealthStore()
+        self.schedule = FeedSchedule(due_only=True, honor_hints=args.honor_ttl)
+        # Shared by all /search requests, like the feeds' health records.
+        self.latency = LatencyHistory()
+        self.search_cache = SearchCache()
+        self.wake = threading.Event()
+        self.fetch_all = False
+        self.started = time.time()
+        self.refreshing = False
+        self.last_refresh = None
+        self.last_refresh_s = None
+        self.last_error = None
+
+    # =========================================================================
+    # Background refresh
+    # =========================================================================
+
+    def refresh(self, index):
+        self.refreshing = True
+        started = time.perf_counter()
+        feeds = self.feeds.get().get('feeds', [])
+        self.schedule.due_only = not self.fetch_all
+        self.fetch_all = False
+        digest = fetch_all_feeds(
+            feeds, since=parse_since(self.args.since) if self.args.since else None,
+            max_items=self.args.max_items, health=self.health, schedule=self.schedule,
+            executor=self.executor, parse_pool=self.parse_pool,
+        )
+        self.health.save()
+        self.schedule.save()
+        if index:
+            index.ingest(digest['posts'], 'feed')
+        unique_posts = dedupe(digest['posts'])
+        digest['duplicates_merged'] = len(digest['posts']) - len(unique_posts)
+        digest['posts'] = unique_posts
+        digest['total_posts'] = len(unique_posts)
+        self.state.update(digest)
+        self.last_refresh = time.time()
+        self.last_refresh_s = round(time.perf_counter() - started, 3)
+        self.last_error = None
+
+    def run(self):
+        """Refresh loop; runs on its own thread until the process exits."""
+        index = None if self.args.no_index else LocalIndex()
+        while True:
+            self.wake.clear()
+            try:
+                self.refresh(index)
+            except Exception as e:
+                self.last_error = str(e) or type(e).__name__
+                print(f"refresh failed: {self.last_error}", file=sys.stderr)
+            finally:
+                self.refreshing = False
+            self.wake.wait(self.args.interval)
+
+    # =========================================================================
+    # Endpoints: each takes the query parameters and returns (status, body)
+    # =========================================================================
+
+    def get_digest(self, query):
+        digest = self.state.digest
+        if digest is None:
+            return 503, {'error': 'first refresh still running'}
+        posts = digest['posts']
+        if query.get('filter'):
+            posts = KeywordFilter(parse_terms(query['filter'])).filter_posts(posts)
+        if query.get('limit'):
+            posts = posts[:int(query['limit'])]
+        return 200, {**digest, 'refreshed_at': format_utc(self.last_refresh),
+                     'total_posts': len(posts), 'posts': posts}
+
+    def get_since(self, query):
+        if self.state.digest is None:
+            return 503, {'error': 'first refresh still running'}
+        limit = int(query['limit']) if query.get('limit') else None
+        return 200, self.state.since(int(query.get('cursor') or 0), limit)
+
+    def get_search(self, query):
+        if not query.get('q'):
+            raise ValueError('missing q parameter')
+        config = self.search_config.get()
+        if query.get('local') and not any(s.get('type') == 'local' for s in config.get('sites', [])):
+            config = {**config, 'sites': config.get('sites', []) + [{'type': 'local'}]}
+        search_config = config.get('search', {})
+        top_k = int(query['top_k']) if query.get('top_k') else search_config.get('top_k')
+        deadline = float(query.get('deadline') or transport.MAX_TIME)
+        # The config may have changed on disk since the last request.
+        self.search_cache.ttls = {**DEFAULT_TTLS, **(search_config.get('cache_ttl') or {})}
+        return 200, deep_search(query['q'], config, top_k=top_k, cache=self.search_cache,
+                                deadline=deadline, latency=self.latency, health=self.health)
+
+    def get_health(self, query):
+        feeds = []
+        for feed in self.feeds.data.get('feeds', []) if self.feeds.data else []:
+            key = health_key(feed['url'])
+            record = self.health.records.get(key) or {}
+            next_due = self.schedule.next_due(feed['url'])
+            entry = {
+                'url': feed['url'],
+                'name': feed.get('name'),
+                'state': self.health.state(key),
+                'failures': record.get('failures', 0),
+                'next_due': format_utc(next_due) if next_due else None,
+            }
+            if 'latency' in record:
+                entry['latency_ms'] = round(record['latency'] * 1000, 1)
+            if record.get('last_error') and record.get('failures'):
+                entry['last_error'] = record['last_error']
+            feeds.append(entry)
+        return 200, {
+            'status': 'ok' if self.last_error is None else 'degraded',
+            'uptime_s': round(time.time() - self.started),
+            'refreshing': self.refreshing,
+            'last_refresh': format_utc(self.last_refresh) if self.last_refresh else None,
+            'last_refresh_s': self.last_refresh_s,
+            'last_error': self.last_error,
+            'cursor': self.state.cursor,
+            'total_posts': len(self.state.digest['posts']) if self.state.digest else 0,
+            'feeds': feeds,
+        }
+
+    def post_refresh(self, query):
+        if query.get('all'):
+            self.fetch_all = True
+        self.wake.set()
+        return 202, {'refresh': 'all' if query.get('all') else 'due'}
+
+
+# =============================================================================
+# HTTP / Unix socket server
+# =============================================================================
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def handle_route(self, routes):
+        parts = urlsplit(self.path)
+        query = {k: v[-1] for k, v in parse_qs(parts.query).items()}
+        route = routes.get(parts.path)
+        if route is None:
+            self.reply(404, {'error': f'unknown endpoint: {parts.path}'})
+            return
+        try:
+            status, body = route(query)
+        except ValueError as e:
+            status, body = 400, {'error': str(e)}
+        except Exception as e:
+            status, body = 500, {'error': str(e) or type(e).__name__}
+        self.reply(status, body)
+
+    def do_GET(self):
+        daemon = self.server.owner
+        self.handle_route({
+            '/digest': daemon.get_digest,
+            '/since': daemon.get_since,
+            '/search': daemon.get_search,
+            '/health': daemon.get_health,
+        })
+
+    def do_POST(self):
+        self.handle_route({'/refresh': self.server.owner.post_refresh})
+
+    def reply(self, status, body):
+        data = json.dumps(body, ensure_ascii=False, default=to_json).encode('utf-8')
+        self.send_response(status)
+        self.send_header('Content-Type', 'application/json; charset=utf-8')
+        self.send_header('Content-Length', str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def address_string(self):
+        # Unix socket peers have no address.
+        return self.client_address[0] if self.client_address else 'unix'
+
+    def log_message(self, format, *args):
+        if self.server.owner.args.verbose:
+            super().log_message(format, *args)
+
+
+class UnixHTTPServer(ThreadingHTTPServer):
+    address_family = socket.AF_UNIX
+
+    def server_bind(self):
+        if os.path.exists(self.server_address):
+            os.unlink(self.server_address)
+        # Skip HTTPServer.server_bind, which expects a (host, port) address.
+        socketserver.TCPServer.server_bind(self)
+        self.server_name = 'localhost'
+        self.server_port = 0
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Serve feed digests from a long-running process')
+    parser.add_argument('config', help='JSON config file with feeds array (re-read when changed)')
+    parser.add_argument('--search-config',
+                        help='JSON config with API keys and sites for /search (default: local index only)')
+    parser.add_argument('--host', default='127.0.0.1', help='Address to listen on (default: 127.0.0.1)')
+    parser.add_argument('--port', type=int, default=DEFAULT_PORT,
+                        help=f'HTTP port (default: {DEFAULT_PORT})')
+    parser.add_argument('--socket', help='Listen on this Unix socket instead of TCP')
+    parser.add_argument('--interval', type=float, default=DEFAULT_INTERVAL,
+                        help=f'Seconds between refreshes of the due feeds (default: {DEFAULT_INTERVAL})')
+    parser.add_argument('--concurrency', type=int, default=5, help='Fetch threads (default: 5)')
+    parser.add_argument('--parse-workers', type=int, nargs='?', const=os.cpu_count() or 1,
+                        default=0, metavar='N',
+                        help='Parse feeds in N worker processes (default without N: one per core); '
+                             'bodies are then downloaded whole, without --since/--max-items early exit')
+    parser.add_argument('--honor-ttl', action='store_true',
+                        help="Never poll a feed more often than its own <ttl> / sy:updatePeriod asks")
+    parser.add_argument('--since',
+                        help='Only keep posts newer than this: 36h, 7d, 2w or an ISO date')
+    parser.add_argument('--max-items', type=int, help='Stop reading each feed after this many posts')
+    parser.add_argument('--no-index', action='store_true',
+                        help='Do not add fetched posts to the local search index')
+    parser.add_argument('--verbose', action='store_true', help='Log every request to stderr')
+    args = parser.parse_args()
+    if args.since:
+        try:
+            parse_since(args.since)
+        except ValueError as e:
+            parser.error(str(e))
+
+    daemon = Daemon(args)
+    daemon.feeds.get()
+    if args.socket:
+        server = UnixHTTPServer(args.socket, Handler)
+        address = args.socket
+    else:
+        server = ThreadingHTTPServer((args.host, args.port), Handler)
+        address = f'http://{args.host}:{server.server_port}'
+    server.daemon_threads = True
+    # Not `daemon`, which reads as a threading flag next to daemon_threads.
+    server.owner = daemon
+
+    threading.Thread(target=daemon.run, name='refresh', daemon=True).start()
+    print(json.dumps({'listening': address, 'pid': os.getpid(),
+                      'started_at': datetime.now(timezone.utc).isoformat()}), flush=True)
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        daemon.search_cache.close()
+        if args.socket and os.path.exists(args.socket):
+            os.unlink(args.socket)
+        transport.close_all()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,181 @@
+"""
+Duplicate and near-duplicate detection for posts and search results.
+
+Two passes per item, both hash lookups rather than pairwise comparisons:
+
+1. Canonical URL (seen_store.normalize_url): the same link reached with
+   tracking parameters, www., http/https or a trailing slash.
+2. SimHash over title + description tokens (word tokens, CJK character
+   bigrams). The 64-bit fingerprint is cut into BLOCKS blocks and indexed
+   under every pair of blocks. Two fingerprints within MAX_DISTANCE bits
+   differ in at most MAX_DISTANCE blocks, so by pigeonhole they agree on at
+   least two blocks and meet in some bucket; only bucket-mates are compared.
+
+Near-duplicates from the same source are only merged if their titles are
+identical too: one feed's templated posts (release notes, weekly digests)
+read alike but are different posts, which its distinct links already say.
+
+Each cluster keeps its first item as the representative; later members are
+attached to it as `alternates`.
+"""
+
+import re
+import sys
+from array import array
+from collections import defaultdict
+from itertools import combinations
+from functools import lru_cache
+from hashlib import blake2b
+
+from seen_store import normalize_url
+
+FINGERPRINT_BITS = 64
+# Blocks are the fingerprint's bytes.
+BLOCKS = FINGERPRINT_BITS // 8
+MAX_DISTANCE = BLOCKS - 2
+# Fingerprints of very short texts collide too easily to be trusted.
+MIN_FEATURES = 6
+# Cap on representatives compared per bucket, keeping degenerate buckets linear.
+BUCKET_LIMIT = 64
+# Only the head of long descriptions matters for near-duplicate detection.
+TEXT_LIMIT = 400
+
+TOKEN_RE = re.compile(r'[a-z0-9]+|[\u3040-\u30ff\u3400-\u9fff\uac00-\ud7af]+')
+STOPWORDS = frozenset(
+    'a an and are as at be by for from has in is it of on or that the this to was with'.split()
+)
+
+# Bits of a byte spread into 16-bit lanes, so summing spread fingerprints
+# counts every bit position at once with plain integer additions.
+LANE_BITS = 16
+_SPREAD_BYTE = [
+    sum(1 << (bit * LANE_BITS) for bit in range(8) if byte >> bit & 1)
+    for byte in range(256)
+]
+
+
+def tokenize(text):
+    """Lowercased word tokens, with CJK runs split into character bigrams."""
+    features = []
+    for token in TOKEN_RE.findall(text.lower()):
+        if token[0] > 'z':
+            if len(token) == 1:
+                features.append(token)
+            else:
+                features.extend(token[i:i + 2] for i in range(len(token) - 1))
+        elif token not in STOPWORDS:
+            features.append(token)
+    return features
+
+
+@lru_cache(maxsize=65536)
+def _spread_hash(feature):
+    digest = blake2b(feature.encode('utf-8'), digest_size=FINGERPRINT_BITS // 8).digest()
+    spread = 0
+    for i, byte in enumerate(digest):
+        spread |= _SPREAD_BYTE[byte] << (i * 8 * LANE_BITS)
+    return spread
+
+
+def simhash(features):
+    """64-bit SimHash of a feature list (repeated features weigh more)."""
+    features = features[:(1 << LANE_BITS) - 1]
+    total = 0
+    for feature in features:
+        total += _spread_hash(feature)
+    half = len(features) / 2
+    counts = array('H', total.to_bytes(FINGERPRINT_BITS * LANE_BITS // 8, 'little'))
+    if sys.byteorder == 'big':
+        counts.byteswap()
+    return sum(1 << bit for bit, count in enumerate(counts) if count > half)
+
+
+_BLOCK_PAIRS = [(n << 16, i, j) for n, (i, j) in enumerate(combinations(range(BLOCKS), 2))]
+
+
+def bucket_keys(fingerprint):
+    """One int key per pair of blocks: pair number, then the two blocks' 16 bits."""
+    blocks = fingerprint.to_bytes(BLOCKS, 'little')
+    return [n | blocks[i] << 8 | blocks[j] for n, i, j in _BLOCK_PAIRS]
+
+
+class Deduplicator:
+    """
+    Incremental clusterer: add() items one at a time, in priority order.
+
+    Works for both batch use (see dedupe) and streaming, where a
+    representative may already have been emitted before its alternates show
+    up; those are then only counted in `duplicates`.
+    """
+
+    def __init__(self, url_key='link', text_keys=('title', 'description'),
+                 max_distance=MAX_DISTANCE, alternate_keys=('source',), source_key='source',
+                 title_key='title'):
+        self.url_key = url_key
+        self.text_keys = text_keys
+        self.source_key = source_key
+        self.title_key = title_key
+        self.alternate_keys = alternate_keys
+        self.max_distance = max_distance
+        self.duplicates = 0
+        self._by_url = {}
+        self._buckets = defaultdict(list)
+
+    def _alternate(self, item):
+        alternate = {self.url_key: item.get(self.url_key, '')}
+        for key in self.alternate_keys:
+            alternate[key] = item.get(key, '')
+        return alternate
+
+    def _distinct_posts(self, representative, item):
+        """Whether a near-duplicate pair is two posts of one source (see module doc)."""
+        source = item.get(self.source_key)
+        return (bool(source) and representative.get(self.source_key) == source
+                and representative.get(self.title_key) != item.get(self.title_key))
+
+    def _attach(self, representative, item):
+        representative.setdefault('alternates', []).append(self._alternate(item))
+        self.duplicates += 1
+
+    def add(self, item):
+        """Return a representative copy of item if it is new, or None if it is a duplicate."""
+        url = normalize_url(item.get(self.url_key))
+        if url and url in self._by_url:
+            self._attach(self._by_url[url], item)
+            return None
+
+        text = ' '.join((item.get(k) or '')[:TEXT_LIMIT] for k in self.text_keys)
+        features = tokenize(text)
+        fingerprint = simhash(features) if len(features) >= MIN_FEATURES else None
+
+        keys = ()
+        if fingerprint is not None:
+            keys = bucket_keys(fingerprint)
+            buckets = self._buckets
+            for key in keys:
+                bucket = buckets.get(key)
+                if not bucket:
+                    continue
+                if len(bucket) > BUCKET_LIMIT:
+                    bucket = bucket[-BUCKET_LIMIT:]
+                for candidate_fp, representative in bucket:
+                    if (bin(candidate_fp ^ fingerprint).count('1') <= self.max_distance
+                            and not self._distinct_posts(representative, item)):
+                        self._attach(representative, item)
+                        if url:
+                            self._by_url[url] = representative
+                        return None
+
+        representative = item.copy()
+        if url:
+            self._by_url[url] = representative
+        entry = (fingerprint, representative)
+        for key in keys:
+            self._buckets[key].append(entry)
+        return representative
+
+
+def dedupe(items, url_key='link', text_keys=('title', 'description'), max_distance=MAX_DISTANCE):
+    """Collapse duplicates in items, keeping the first of each cluster with its alternates."""
+    deduplicator = Deduplicator(url_key, text_keys, max_distance)
+    return [r for r in map(deduplicator.add, items) if r is not None]
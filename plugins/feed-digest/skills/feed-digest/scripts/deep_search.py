@@ -6,53 +6,54 @@ Usage:
     python deep_search.py --config <config.json> --query "your question"
     python deep_search.py --tavily-key <key> --query "your question"
     python deep_search.py --exa-key <key> --query "your question"
+    python deep_search.py --config <config.json> --query "..." --format ndjson
 
 Output: JSON with search results from all sources, ready for Claude to analyze.
 """
 
-import sys
 import json
 import argparse
-import subprocess
 from datetime import datetime, timezone
-from concurrent.futures import ThreadPoolExecutor, as_completed
+import time
+import threading
+from concurrent.futures import Future, wait, FIRST_COMPLETED
 from urllib.parse import urlencode, quote_plus
-import re
 
+import tracing
+import transport
+from dedup import Deduplicator
+from fusion import assign_ranks, fuse
+from health import HealthStore
+from ndjson_output import NdjsonWriter
+from latency import LatencyHistory
+from local_index import LocalIndex
+from search_cache import SearchCache
 
-def fetch_with_curl(url, headers=None, method='GET', data=None):
-    """Fetch URL using curl (works with TUN/system proxy)."""
-    cmd = ['curl', '-sS', '-L', '--connect-timeout', '15', '--max-time', '30']
+TAVILY_URL = 'https://api.tavily.com/search'
+EXA_URL = 'https://api.exa.ai/search'
+HN_SEARCH_URL = 'https://hn.algolia.com/api/v1/search'
+SOV2EX_URL = 'https://www.sov2ex.com/api/search'
 
-    if headers:
-        for k, v in headers.items():
-            cmd.extend(['-H', f'{k}: {v}'])
 
-    if method == 'POST':
-        cmd.extend(['-X', 'POST'])
-        if data:
-            cmd.extend(['-d', json.dumps(data)])
-            cmd.extend(['-H', 'Content-Type: application/json'])
-
-    cmd.append(url)
-
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    if result.returncode != 0:
-        raise RuntimeError(f"curl failed: {result.stderr}")
-    return result.stdout
+def fetch_json(url, headers=None, method='GET', data=None, timeout=transport.MAX_TIME):
+    """Fetch URL over the shared pooled transport and decode the JSON body."""
+    response = transport.request(url, method=method, headers=headers, body=data, timeout=timeout)
+    if response.status >= 400:
+        raise RuntimeError(f"HTTP {response.status}")
+    return response.json()
 
 
 # =============================================================================
 # Search Engine Adapters
 # =============================================================================
 
-def search_tavily(query, api_key, max_results=10):
+def search_tavily(query, api_key, max_results=10, timeout=transport.MAX_TIME):
     """
     Search using Tavily API.
     https://docs.tavily.com/
     """
     try:
-        url = "https://api.tavily.com/search"
+        url = TAVILY_URL
         data = {
             "api_key": api_key,
             "query": query,
@@ -62,8 +63,7 @@ def search_tavily(query, api_key, max_results=10):
             "max_results": max_results,
         }
 
-        response = fetch_with_curl(url, method='POST', data=data)
-        result = json.loads(response)
+        result = fetch_json(url, method='POST', data=data, timeout=timeout)
 
         results = []
         for item in result.get('results', []):
@@ -92,13 +92,13 @@ def search_tavily(query, api_key, max_results=10):
         }
 
 
-def search_exa(query, api_key, max_results=10):
+def search_exa(query, api_key, max_results=10, timeout=transport.MAX_TIME):
     """
     Search using Exa API.
     https://docs.exa.ai/
     """
     try:
-        url = "https://api.exa.ai/search"
+        url = EXA_URL
         headers = {
             "x-api-key": api_key,
             "Content-Type": "application/json",
@@ -113,8 +113,7 @@ def search_exa(query, api_key, max_results=10):
             }
         }
 
-        response = fetch_with_curl(url, headers=headers, method='POST', data=data)
-        result = json.loads(response)
+        result = fetch_json(url, headers=headers, method='POST', data=data, timeout=timeout)
 
         results = []
         for item in result.get('results', []):
@@ -146,15 +145,14 @@ def search_exa(query, api_key, max_results=10):
 # Site-Specific Adapters
 # =============================================================================
 
-def search_discourse(base_url, query, name=None, max_results=20):
+def search_discourse(base_url, query, name=None, max_results=20, timeout=transport.MAX_TIME):
     """
     Search Discourse forum using API.
     Works with linux.do, meta.discourse.org, etc.
     """
     try:
         search_url = f"{base_url.rstrip('/')}/search.json?{urlencode({'q': query})}"
-        response = fetch_with_curl(search_url)
-        data = json.loads(response)
+        data = fetch_json(search_url, timeout=timeout)
 
         results = []
         topics = data.get('topics', [])
@@ -197,15 +195,14 @@ def search_discourse(base_url, query, name=None, max_results=20):
         }
 
 
-def search_hackernews(query, max_results=20):
+def search_hackernews(query, max_results=20, timeout=transport.MAX_TIME):
     """
     Search Hacker News using Algolia API.
     https://hn.algolia.com/api
     """
     try:
-        url = f"https://hn.algolia.com/api/v1/search?{urlencode({'query': query, 'hitsPerPage': max_results})}"
-        response = fetch_with_curl(url)
-        data = json.loads(response)
+        url = f"{HN_SEARCH_URL}?{urlencode({'query': query, 'hitsPerPage': max_results})}"
+        data = fetch_json(url, timeout=timeout)
 
         results = []
         for hit in data.get('hits', []):
@@ -239,16 +236,15 @@ def search_hackernews(query, max_results=20):
         }
 
 
-def search_v2ex(query, max_results=20):
+def search_v2ex(query, max_results=20, timeout=transport.MAX_TIME):
     """
     Search V2EX using SOV2EX (third-party search).
     Note: V2EX official API doesn't support search.
     """
     try:
         # Use Google site search as fallback
-        url = f"https://www.sov2ex.com/api/search?q={quote_plus(query)}&size={max_results}"
-        response = fetch_with_curl(url)
-        data = json.loads(response)
+        url = f"{SOV2EX_URL}?q={quote_plus(query)}&size={max_results}"
+        data = fetch_json(url, timeout=timeout)
 
         results = []
         for hit in data.get('hits', []):
@@ -282,11 +278,73 @@ def search_v2ex(query, max_results=20):
         }
 
 
+def search_local(query, max_results=20, timeout=transport.MAX_TIME):
+    """
+    Search posts fetched in earlier runs (local_index.py); no network.
+    """
+    try:
+        with LocalIndex() as index:
+            hits = index.search(query, max_results)
+
+        results = []
+        for hit in hits:
+            results.append({
+                'title': hit['title'],
+                'url': hit['link'],
+                'content': (hit['description'] or '')[:500],
+                'score': round(hit['score'], 3),
+                'source': hit['source'],
+                'source_type': 'local',
+                'published_date': hit['pub_date'],
+            })
+
+        return {
+            'site': 'local',
+            'site_type': 'local',
+            'success': True,
+            'results': results,
+            'result_count': len(results),
+        }
+    except Exception as e:
+        return {
+            'site': 'local',
+            'site_type': 'local',
+            'success': False,
+            'error': str(e),
+            'results': [],
+        }
+
+
 # =============================================================================
 # Main Search Orchestrator
 # =============================================================================
 
-def deep_search(query, config):
+# Adapters answered locally; caching them would only serve stale answers.
+UNCACHED_ADAPTERS = {'local'}
+
+def run_detached(function, *args, **kwargs):
+    """
+    Run function on a daemon thread and return a Future for its result.
+
+    Unlike a ThreadPoolExecutor, requests abandoned at the deadline do not
+    keep the interpreter alive on exit.
+    """
+    future = Future()
+
+    def runner():
+        if not future.set_running_or_notify_cancel():
+            return
+        try:
+            future.set_result(function(*args, **kwargs))
+        except BaseException as e:
+            future.set_exception(e)
+
+    threading.Thread(target=runner, daemon=True).start()
+    return future
+
+
+def deep_search(query, config, on_results=None, top_k=None, max_results=None, cache=None,
+                deadline=transport.MAX_TIME, hedge=False, latency=None, health=None):
     """
     Perform deep search across all configured sources.
 
@@ -294,14 +352,40 @@ def deep_search(query, config):
     {
         "search": {
             "tavily": {"api_key": "..."},
-            "exa": {"api_key": "..."}
+            "exa": {"api_key": "..."},
+            "weights": {"tavily": 1.0, "hackernews": 0.5},   # optional, default 1.0
+            "top_k": 30                                      # optional
         },
         "sites": [
             {"url": "https://linux.do", "type": "discourse", "name": "Linux.do"},
             {"url": "https://news.ycombinator.com", "type": "hackernews"},
-            {"url": "https://v2ex.com", "type": "v2ex"}
+            {"url": "https://v2ex.com", "type": "v2ex"},
+            {"type": "local"}                  # posts from earlier fetches
         ]
     }
+
+    With a SearchCache, fresh-enough responses are served from it and every
+    engine/site entry is marked with cache 'hit' or 'miss'. max_results
+    overrides each adapter's own default.
+
+    Sources are collected in completion order. Whatever has arrived when
+    `deadline` seconds have passed is returned; sources still running are
+    listed with timed_out. With a LatencyHistory, response times are
+    recorded, and with hedge=True a source running past its historical
+    p95 gets a duplicate request, the first answer winning.
+
+    With a HealthStore, sources whose circuit breaker is open are skipped
+    (unless cached), request timeouts adapt to each source's latency and
+    outcomes are recorded. Being cut off by the deadline is not a failure.
+
+    Results that repeat an earlier one (same canonical URL, or near-identical
+    title and content) are folded into it as `alternates`.
+
+    all_results is ranked by reciprocal rank fusion (see fusion.py) with
+    per-source weights from search.weights, cut to the best `top_k` if
+    given. If on_results is given it receives each source's new (not yet
+    seen) results, unfused, as soon as that source is collected, and
+    all_results is left empty instead.
     """
     results = {
         'query': query,
@@ -314,60 +398,179 @@ def deep_search(query, config):
     search_config = config.get('search', {})
     sites = config.get('sites', [])
 
-    futures = []
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        # Submit search engine queries
-        tavily_key = search_config.get('tavily', {}).get('api_key', '')
-        if tavily_key:
-            futures.append(('engine', executor.submit(search_tavily, query, tavily_key)))
-
-        exa_key = search_config.get('exa', {}).get('api_key', '')
-        if exa_key:
-            futures.append(('engine', executor.submit(search_exa, query, exa_key)))
-
-        # Submit site-specific queries
-        for site in sites:
-            site_type = site.get('type', '').lower()
-            site_url = site.get('url', '')
-            site_name = site.get('name')
-
-            if site_type == 'discourse':
-                futures.append(('site', executor.submit(search_discourse, site_url, query, site_name)))
-            elif site_type == 'hackernews':
-                futures.append(('site', executor.submit(search_hackernews, query)))
-            elif site_type == 'v2ex':
-                futures.append(('site', executor.submit(search_v2ex, query)))
-
-        # Collect results
-        for result_type, future in futures:
-            try:
-                result = future.result(timeout=30)
-                if result_type == 'engine':
-                    results['engines'].append(result)
+    # Collapse duplicates (canonical URL or near-identical text) as results arrive
+    deduplicator = Deduplicator(url_key='url', text_keys=('title', 'content'),
+                                alternate_keys=('source', 'rank'))
+    unique_results = []
+    added = 0
+    # Result `source` value -> adapter name, for adapter-level weights
+    source_adapters = {}
+
+    # (section, adapter, site key, label, function, args) for every source to query;
+    # the label identifies the source in its engines/sites entry.
+    sources = []
+    tavily_key = search_config.get('tavily', {}).get('api_key', '')
+    if tavily_key:
+        sources.append(('engine', 'tavily', '', {'engine': 'tavily'},
+                        search_tavily, (query, tavily_key)))
+
+    exa_key = search_config.get('exa', {}).get('api_key', '')
+    if exa_key:
+        sources.append(('engine', 'exa', '', {'engine': 'exa'}, search_exa, (query, exa_key)))
+
+    for site in sites:
+        site_type = site.get('type', '').lower()
+        site_url = site.get('url', '')
+        site_name = site.get('name')
+
+        if site_type == 'discourse':
+            sources.append(('site', 'discourse', f"{site_url}|{site_name or ''}",
+                            {'site': site_url, 'site_type': 'discourse'},
+                            search_discourse, (site_url, query, site_name)))
+        elif site_type == 'hackernews':
+            sources.append(('site', 'hackernews', '',
+                            {'site': 'https://news.ycombinator.com', 'site_type': 'hackernews'},
+                            search_hackernews, (query,)))
+        elif site_type == 'v2ex':
+            sources.append(('site', 'v2ex', '', {'site': 'https://v2ex.com', 'site_type': 'v2ex'},
+                            search_v2ex, (query,)))
+        elif site_type == 'local':
+            sources.append(('site', 'local', '', {'site': 'local', 'site_type': 'local'},
+                            search_local, (query,)))
+
+    def collect(source, result):
+        nonlocal added
+        result_type, adapter = source[:2]
+        if result_type == 'engine':
+            results['engines'].append(result)
+        else:
+            results['sites'].append(result)
+
+        items = assign_ranks(result.get('results', []))
+        for item in items:
+            source_adapters.setdefault(item.get('source'), adapter)
+        new_results = [r for r in map(deduplicator.add, items) if r is not None]
+        added += len(new_results)
+        if on_results:
+            on_results(new_results)
+        else:
+            unique_results.extend(new_results)
+
+    def history_key(source):
+        return f'{source[1]}|{source[2]}'
+
+    def health_key(source):
+        return f'search:{history_key(source)}'
+
+    extra_args = {'max_results': max_results} if max_results else {}
+    expires = time.monotonic() + deadline
+    attempts = {}     # future -> (source index, submitted at)
+    started = {}      # source index -> first submission time
+    hedged = set()
+    finished = set()
+
+    def submit(index):
+        _, adapter, _, label, function, args = sources[index]
+        now = time.monotonic()
+        # Bound each request by what is left of the budget, so abandoned
+        # requests die around the deadline too.
+        timeout = max(1.0, expires - now)
+        if health:
+            timeout = health.timeout_for(health_key(sources[index]), timeout)
+        function = tracing.traced(label.get('engine') or label.get('site'), adapter, function)
+        attempts[run_detached(function, *args, timeout=timeout, **extra_args)] = (index, now)
+        started.setdefault(index, now)
+
+    # Answer what we can from the cache; query the rest concurrently
+    for index, source in enumerate(sources):
+        result_type, adapter, site_key = source[:3]
+        use_cache = cache and adapter not in UNCACHED_ADAPTERS
+        cached = cache.get(adapter, query, max_results, site_key) if use_cache else None
+        if cached is not None:
+            cached['cache'] = 'hit'
+            # Timings of the request that filled the cache say nothing about this run.
+            cached.pop('timings', None)
+            finished.add(index)
+            collect(source, cached)
+        elif health and not health.allow(health_key(source)):
+            finished.add(index)
+            entry = {**source[3], 'success': False, 'skipped': True,
+                     'error': health.skip_reason(health_key(source)), 'results': []}
+            (results['engines'] if result_type == 'engine' else results['sites']).append(entry)
+        else:
+            submit(index)
+
+    # Collect results in completion order until everything is in or the
+    # deadline passes, hedging sources that run past their p95. Requests
+    # still running then are abandoned; their own timeout ends them.
+    while attempts:
+        now = time.monotonic()
+        if now >= expires:
+            break
+        wake = expires
+        if hedge and latency:
+            for index in set(started) - finished - hedged:
+                p95 = latency.p95(history_key(sources[index]))
+                if p95 is None:
+                    continue
+                if now - started[index] >= p95:
+                    hedged.add(index)
+                    submit(index)
                 else:
-                    results['sites'].append(result)
-
-                # Merge all results
-                results['all_results'].extend(result.get('results', []))
+                    wake = min(wake, started[index] + p95)
+
+        done, _ = wait(attempts, timeout=wake - now, return_when=FIRST_COMPLETED)
+        for future in done:
+            index, submitted = attempts.pop(future)
+            if index in finished:
+                continue
+            result_type, adapter, site_key, label = sources[index][:4]
+            try:
+                result = future.result()
             except Exception as e:
-                if result_type == 'engine':
-                    results['engines'].append({'success': False, 'error': str(e)})
-                else:
-                    results['sites'].append({'success': False, 'error': str(e)})
-
-    # Deduplicate by URL
-    seen_urls = set()
-    unique_results = []
-    for item in results['all_results']:
-        url = item.get('url', '')
-        if url and url not in seen_urls:
-            seen_urls.add(url)
-            unique_results.append(item)
-
-    # Sort by score
-    unique_results.sort(key=lambda x: x.get('score', 0), reverse=True)
-    results['all_results'] = unique_results
-    results['total_results'] = len(unique_results)
+                result = {**label, 'success': False, 'error': str(e), 'results': []}
+            retrying = any(i == index for i, _ in attempts.values())
+            if not result.get('success') and retrying:
+                # The hedged twin may still succeed.
+                continue
+
+            finished.add(index)
+            if latency and result.get('success'):
+                latency.record(history_key(sources[index]), time.monotonic() - submitted)
+            if health:
+                health.record(health_key(sources[index]), result.get('success'),
+                              time.monotonic() - submitted, result.get('error'))
+            if cache and adapter not in UNCACHED_ADAPTERS:
+                if result.get('success'):
+                    cache.put(adapter, query, max_results, result, site_key)
+                result['cache'] = 'miss'
+            if index in hedged:
+                result['hedged'] = True
+            collect(sources[index], result)
+            for other in [f for f, (i, _) in attempts.items() if i == index]:
+                other.cancel()
+                del attempts[other]
+
+    for index in set(started) - finished:
+        result_type, label = sources[index][0], sources[index][3]
+        if latency:
+            latency.record(history_key(sources[index]), deadline)
+        entry = {**label, 'success': False, 'timed_out': True,
+                 'error': f'no response within the {deadline}s deadline', 'results': []}
+        (results['engines'] if result_type == 'engine' else results['sites']).append(entry)
+    if latency:
+        latency.save()
+    if health:
+        health.save()
+
+    weights = search_config.get('weights', {})
+
+    def weight_of(source):
+        return weights.get(source, weights.get(source_adapters.get(source), 1.0))
+
+    results['all_results'] = fuse(unique_results, weight_of, top_k=top_k)
+    results['total_results'] = added
+    results['duplicates_merged'] = deduplicator.duplicates
 
     return results
 
@@ -378,8 +581,28 @@ def main():
     parser.add_argument('--query', required=True, help='Search query')
     parser.add_argument('--tavily-key', help='Tavily API key (overrides config)')
     parser.add_argument('--exa-key', help='Exa API key (overrides config)')
-    parser.add_argument('--max-results', type=int, default=20, help='Max results per source')
+    parser.add_argument('--local', action='store_true',
+                        help='Also search the local index of previously fetched posts')
+    parser.add_argument('--max-results', type=int,
+                        help='Max results per source (default: 10 per engine, 20 per site)')
+    parser.add_argument('--no-cache', action='store_true', help='Do not read or write the result cache')
+    parser.add_argument('--refresh', action='store_true',
+                        help='Ignore cached results but store the fresh ones')
+    parser.add_argument('--top-k', '--limit', dest='top_k', type=int,
+                        help='Only output the K best results by fused rank (default: search.top_k or all)')
+    parser.add_argument('--deadline', type=float, default=transport.MAX_TIME,
+                        help='Return what has arrived after this many seconds (default: 30)')
+    parser.add_argument('--hedge', action='store_true',
+                        help='Re-send requests to sources running past their usual p95 latency')
+    parser.add_argument('--no-breaker', action='store_true',
+                        help='Also query sources whose circuit breaker is open after repeated failures')
+    parser.add_argument('--format', choices=['json', 'ndjson'], default='json',
+                        help='json: one document at the end; ndjson: stream results as sources complete')
+    parser.add_argument('--trace', metavar='OUT_JSON',
+                        help='Write a Chrome trace (chrome://tracing, Perfetto) of the run to this file')
     args = parser.parse_args()
+    if args.trace:
+        tracing.start_trace()
 
     # Load config
     config = {'search': {}, 'sites': []}
@@ -392,10 +615,49 @@ def main():
         config.setdefault('search', {})['tavily'] = {'api_key': args.tavily_key}
     if args.exa_key:
         config.setdefault('search', {})['exa'] = {'api_key': args.exa_key}
+    if args.local and not any(s.get('type') == 'local' for s in config.get('sites', [])):
+        config.setdefault('sites', []).append({'type': 'local'})
+
+    cache = None
+    if not args.no_cache:
+        cache = SearchCache(ttls=config.get('search', {}).get('cache_ttl'), refresh=args.refresh)
+
+    latency = LatencyHistory()
+    health = HealthStore(breaker=not args.no_breaker)
+    top_k = args.top_k or config.get('search', {}).get('top_k')
 
     # Perform search
-    results = deep_search(args.query, config)
-    print(json.dumps(results, ensure_ascii=False, indent=2))
+    if args.format == 'ndjson':
+        writer = NdjsonWriter()
+        with tracing.span('search'):
+            if top_k:
+                # Fused ranks are only known once every source is in.
+                results = deep_search(args.query, config, top_k=top_k,
+                                      max_results=args.max_results, cache=cache,
+                                      deadline=args.deadline, hedge=args.hedge, latency=latency,
+                                      health=health)
+                writer.write_many('result', results['all_results'])
+            else:
+                results = deep_search(args.query, config,
+                                      on_results=lambda items: writer.write_many('result', items),
+                                      max_results=args.max_results, cache=cache,
+                                      deadline=args.deadline, hedge=args.hedge, latency=latency,
+                                      health=health)
+        # Per-source result lists were already streamed; keep their stats only.
+        for section in ('engines', 'sites'):
+            results[section] = [{k: v for k, v in r.items() if k != 'results'} for r in results[section]]
+        writer.summary(results, drop=('all_results',))
+        tracing.save_trace(args.trace)
+        return
+
+    with tracing.span('search'):
+        results = deep_search(args.query, config, top_k=top_k,
+                              max_results=args.max_results, cache=cache,
+                              deadline=args.deadline, hedge=args.hedge, latency=latency,
+                              health=health)
+    with tracing.span('output'):
+        print(json.dumps(results, ensure_ascii=False, indent=2))
+    tracing.save_trace(args.trace)
 
 
 if __name__ == '__main__':
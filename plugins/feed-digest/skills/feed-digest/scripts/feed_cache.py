@@ -0,0 +1,89 @@
+"""
+On-disk conditional-GET cache for feed fetching.
+
+Each feed URL maps to one JSON file holding the ETag / Last-Modified
+validators from its last successful response (if it sent any), the size of
+that body and the posts parsed from it. When the server answers 304 Not
+Modified the cached posts are reused as-is, so the XML is neither downloaded
+nor parsed again; feeds that are not due under --due-only serve them too.
+
+Cache location: $FEED_DIGEST_CACHE_DIR or ~/.cache/feed-digest
+"""
+
+import os
+import json
+import time
+import hashlib
+import tempfile
+
+from posts import to_json
+
+CACHE_DIR = os.environ.get('FEED_DIGEST_CACHE_DIR') or os.path.join(
+    os.path.expanduser('~'), '.cache', 'feed-digest'
+)
+
+
+def write_json_atomic(path, data):
+    """Write JSON to path via a temp file + rename so readers never see partial data."""
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+    try:
+        with os.fdopen(fd, 'w') as f:
+            json.dump(data, f, ensure_ascii=False, default=to_json)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def entry_path(url, cache_dir=None):
+    """Return the cache file path for a feed URL."""
+    digest = hashlib.sha1(url.encode('utf-8')).hexdigest()
+    return os.path.join(cache_dir or CACHE_DIR, 'feeds', f'{digest}.json')
+
+
+def load_entry(url, cache_dir=None):
+    """Load the cached entry for a feed, or None if missing/corrupt."""
+    try:
+        with open(entry_path(url, cache_dir)) as f:
+            entry = json.load(f)
+    except (OSError, ValueError):
+        return None
+    if entry.get('url') != url:
+        return None
+    return entry
+
+
+def covers_window(entry, since_ts=None, max_items=None, filter_key=None):
+    """
+    Whether an entry's posts cover the requested --since / --max-items / --filter window.
+
+    Entries parsed under a narrower window hold too few posts to answer a
+    wider request from a 304, so those must be refetched in full.
+    """
+    window = entry.get('window') or {}
+    if window.get('filter') and window['filter'] != filter_key:
+        return False
+    if window.get('since') is not None and (since_ts is None or since_ts < window['since']):
+        return False
+    if window.get('max_items') and (not max_items or max_items > window['max_items']):
+        return False
+    return True
+
+
+def store_entry(url, etag, last_modified, body_size, posts, window=None, cache_dir=None):
+    """Persist validators and parsed posts for a feed."""
+    entry = {
+        'url': url,
+        'etag': etag,
+        'last_modified': last_modified,
+        'bytes': body_size,
+        'stored_at': time.time(),
+        'window': window,
+        'posts': posts,
+    }
+    write_json_atomic(entry_path(url, cache_dir), entry)
+    return entry
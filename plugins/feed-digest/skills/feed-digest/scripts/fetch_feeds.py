@@ -6,6 +6,7 @@ Returns structured JSON with posts from all configured sources.
 Usage:
     python fetch_feeds.py <feeds_config.json>
     python fetch_feeds.py --urls "url1,url2,url3"
+    python fetch_feeds.py <feeds_config.json> --format ndjson
 
 Output: JSON with all posts merged, ready for Claude to classify and score.
 """
@@ -14,49 +15,67 @@ import sys
 import os
 import json
 import argparse
-import subprocess
-import urllib.request
+import asyncio
 import xml.etree.ElementTree as ET
+import time
 from datetime import datetime, timezone
-from html import unescape
 import re
-from concurrent.futures import ThreadPoolExecutor, as_completed
-
-def strip_html(html_text):
-    """Remove HTML tags and decode entities."""
-    if not html_text:
-        return ""
-    text = re.sub(r'<[^>]+>', '', html_text)
-    return unescape(text).strip()
-
-def parse_date(date_str):
-    """Parse various date formats from RSS/Atom feeds."""
-    if not date_str:
-        return None
-    formats = [
-        "%a, %d %b %Y %H:%M:%S %z",      # RSS
-        "%a, %d %b %Y %H:%M:%S %Z",      # RSS with timezone name
-        "%Y-%m-%dT%H:%M:%S%z",           # Atom ISO
-        "%Y-%m-%dT%H:%M:%SZ",            # Atom UTC
-        "%Y-%m-%d %H:%M:%S",             # Simple
-    ]
-    for fmt in formats:
-        try:
-            return datetime.strptime(date_str.strip(), fmt)
-        except ValueError:
-            continue
-    return None
-
-def fetch_with_curl(url):
-    """Fetch URL using curl (works with TUN/system proxy)."""
-    result = subprocess.run(
-        ['curl', '-sS', '-L', '--connect-timeout', '15', '--max-time', '30', url],
-        capture_output=True,
-        text=True
-    )
-    if result.returncode != 0:
-        raise RuntimeError(f"curl failed: {result.stderr}")
-    return result.stdout
+from concurrent.futures import ProcessPoolExecutor, ThreadPoolExecutor, as_completed
+from contextlib import nullcontext
+from urllib.parse import urlsplit
+
+import feed_cache
+import tracing
+import transport
+from dates import DateParser, format_utc, parse_iso, parse_timestamp, post_timestamp
+from dedup import Deduplicator
+from keyword_filter import KeywordFilter, parse_terms
+from health import HealthStore
+from html_text import strip_html
+from merge import Merger
+from local_index import LocalIndex
+from ndjson_output import NdjsonWriter
+from posts import Post, to_json
+from prescore import PreScorer, apply_prescore, by_prescore, load_lexicon
+from columnar import write_columns
+from schedule import SY_NS, FeedSchedule, ttl_seconds, update_period_seconds
+from seen_store import SeenStore, apply_incremental
+
+# Feeds are newest-first in practice but not strictly sorted, so only stop
+# reading after this many consecutive entries fall outside --since.
+STALE_RUN_LIMIT = 5
+# Characters of a post's description that are kept.
+DESCRIPTION_LIMIT = 800
+# Per-feed cap on the decoded body; longer feeds are parsed up to the cap.
+DEFAULT_MAX_BYTES = 10 * 1024 * 1024
+
+def parse_since(value):
+    """Parse --since (a relative window like 36h / 7d / 2w, or an ISO date) to epoch seconds."""
+    match = re.fullmatch(r'(\d+)([hdw])', value.strip().lower())
+    if match:
+        hours = int(match.group(1)) * {'h': 1, 'd': 24, 'w': 24 * 7}[match.group(2)]
+        return time.time() - hours * 3600
+    ts = parse_iso(value)
+    if ts is None:
+        raise ValueError(f'invalid --since value: {value}')
+    return ts
+
+def conditional_headers(cached):
+    """Build If-None-Match / If-Modified-Since headers from a cache entry."""
+    headers = {}
+    if cached and cached.get('etag'):
+        headers['If-None-Match'] = cached['etag']
+    if cached and cached.get('last_modified'):
+        headers['If-Modified-Since'] = cached['last_modified']
+    return headers
+
+def check_response(response):
+    """Raise on HTTP error statuses, like curl --fail would (closing the response first)."""
+    if response.status >= 400:
+        # A streamed error body is never read; drop its connection rather than leak it.
+        response.close()
+        raise RuntimeError(f"HTTP {response.status}")
+    return response
 
 def detect_feed_type(root):
     """Detect if feed is RSS or Atom."""
@@ -65,154 +84,684 @@ def detect_feed_type(root):
         return 'atom'
     return 'rss'
 
-def parse_rss(root, source_name, source_url):
-    """Parse RSS 2.0 format."""
-    channel = root.find('channel')
-    if channel is None:
-        return []
-
-    feed_title = channel.findtext('title', source_name)
+def rss_item_to_post(item, feed_title, source_url, matcher=None, parse_date=parse_timestamp):
+    """
+    Convert an RSS 2.0 <item> to a post. Returns (post, epoch timestamp);
+    post is None if the item is rejected by matcher.
+    """
+    title = item.findtext('title', '')
+    description = strip_html(item.findtext('description', ''), DESCRIPTION_LIMIT)
+    pub_date_str = item.findtext('pubDate', '')
+    timestamp = parse_date(pub_date_str)
+    if matcher and not matcher.matches(title, description):
+        return None, timestamp
+
+    link = item.findtext('link', '')
+    categories = [cat.text for cat in item.findall('category') if cat.text]
+    creator = item.findtext('{http://purl.org/dc/elements/1.1/}creator', '')
+
+    return Post(title, link, description,
+                format_utc(timestamp, pub_date_str),
+                timestamp, categories, creator, feed_title, source_url), timestamp
+
+def atom_entry_to_post(entry, ns_uri, feed_title, source_url, matcher=None,
+                       parse_date=parse_timestamp):
+    """Convert an Atom <entry> to a post, like rss_item_to_post."""
+    title = entry.findtext(f'{ns_uri}title', '')
+    content = entry.findtext(f'{ns_uri}content', '') or entry.findtext(f'{ns_uri}summary', '')
+    description = strip_html(content, DESCRIPTION_LIMIT)
+    updated = entry.findtext(f'{ns_uri}updated', '') or entry.findtext(f'{ns_uri}published', '')
+    timestamp = parse_date(updated)
+    if matcher and not matcher.matches(title, description):
+        return None, timestamp
+
+    link_elem = entry.find(f'{ns_uri}link')
+    link = link_elem.get('href', '') if link_elem is not None else ''
+    author_elem = entry.find(f'{ns_uri}author')
+    creator = author_elem.findtext(f'{ns_uri}name', '') if author_elem is not None else ''
+
+    return Post(title, link, description,
+                format_utc(timestamp, updated),
+                timestamp, (), creator, feed_title, source_url), timestamp
+
+def parse_feed(chunks, source_name, source_url, since=None, max_items=None, matcher=None,
+               cadence=None):
+    """
+    Incrementally parse an RSS 2.0 or Atom document from byte chunks.
+
+    Each item/entry is turned into a post and cleared as soon as its end tag
+    arrives, so memory stays proportional to one entry. Entries older than
+    `since` or rejected by the keyword matcher are skipped; reading stops
+    after max_items posts or after STALE_RUN_LIMIT consecutive entries older
+    than `since`. If the chunks end in transport.BodyTooLarge, the entries
+    that arrived whole are kept and it counts as stopping early. Time spent
+    normalizing dates and building posts is reported to tracing as the
+    dates and build phases.
+
+    If a `cadence` dict is given it receives the publish timestamps of all
+    entries read (including skipped ones) and the feed's own update
+    interval hint from <ttl> or sy:updatePeriod, for schedule.py.
+
+    Returns (posts, stopped_early).
+    """
+    parser = ET.XMLPullParser(events=('start', 'end'))
     posts = []
+    feed_type = None
+    ns_uri = ''
+    feed_title = source_name
+    parents = []
+    stale_run = 0
+    date_parser = DateParser()
+    date_time = build_time = 0.0
+    items = 0
+    timestamps = []
+    hint = {}
+
+    def parse_date(value):
+        nonlocal date_time
+        started = time.perf_counter()
+        try:
+            return date_parser(value)
+        finally:
+            date_time += time.perf_counter() - started
 
-    for item in channel.findall('item'):
-        title = item.findtext('title', '')
-        link = item.findtext('link', '')
-        description = strip_html(item.findtext('description', ''))
-        pub_date_str = item.findtext('pubDate', '')
-        pub_date = parse_date(pub_date_str)
-
-        categories = [cat.text for cat in item.findall('category') if cat.text]
-        creator = item.findtext('{http://purl.org/dc/elements/1.1/}creator', '')
-
-        posts.append({
-            'title': title,
-            'link': link,
-            'description': description[:800] if description else '',
-            'pub_date': pub_date.isoformat() if pub_date else pub_date_str,
-            'categories': categories,
-            'creator': creator,
-            'source': feed_title,
-            'source_url': source_url,
-        })
-
-    return posts
-
-def parse_atom(root, source_name, source_url):
-    """Parse Atom format."""
-    ns = {'atom': 'http://www.w3.org/2005/Atom'}
-
-    # Handle namespace
-    if root.tag.startswith('{'):
-        ns_uri = root.tag.split('}')[0] + '}'
-        entries = root.findall(f'{ns_uri}entry')
-        feed_title = root.findtext(f'{ns_uri}title', source_name)
-    else:
-        entries = root.findall('entry', ns) or root.findall('entry')
-        feed_title = root.findtext('title', source_name)
-
-    posts = []
-    for entry in entries:
-        # Handle namespaced or non-namespaced
-        if root.tag.startswith('{'):
-            title = entry.findtext(f'{ns_uri}title', '')
-            link_elem = entry.find(f'{ns_uri}link')
-            content = entry.findtext(f'{ns_uri}content', '') or entry.findtext(f'{ns_uri}summary', '')
-            updated = entry.findtext(f'{ns_uri}updated', '') or entry.findtext(f'{ns_uri}published', '')
-            author_elem = entry.find(f'{ns_uri}author')
-            creator = author_elem.findtext(f'{ns_uri}name', '') if author_elem is not None else ''
-        else:
-            title = entry.findtext('title', '')
-            link_elem = entry.find('link')
-            content = entry.findtext('content', '') or entry.findtext('summary', '')
-            updated = entry.findtext('updated', '') or entry.findtext('published', '')
-            author_elem = entry.find('author')
-            creator = author_elem.findtext('name', '') if author_elem is not None else ''
-
-        link = link_elem.get('href', '') if link_elem is not None else ''
-        description = strip_html(content)
-        pub_date = parse_date(updated)
-
-        posts.append({
-            'title': title,
-            'link': link,
-            'description': description[:800] if description else '',
-            'pub_date': pub_date.isoformat() if pub_date else updated,
-            'categories': [],
-            'creator': creator,
-            'source': feed_title,
-            'source_url': source_url,
-        })
-
-    return posts
-
-def fetch_and_parse_feed(url, name=None):
-    """Fetch a single feed and parse it."""
     try:
-        xml_content = fetch_with_curl(url)
-        root = ET.fromstring(xml_content)
-
-        feed_type = detect_feed_type(root)
-        source_name = name or url
-
-        if feed_type == 'atom':
-            posts = parse_atom(root, source_name, url)
-        else:
-            posts = parse_rss(root, source_name, url)
+        for chunk in chunks:
+            parser.feed(chunk)
+            for event, elem in parser.read_events():
+                if event == 'start':
+                    if feed_type is None:
+                        feed_type = detect_feed_type(elem)
+                        if elem.tag.startswith('{'):
+                            ns_uri = elem.tag.split('}')[0] + '}'
+                    parents.append(elem)
+                    continue
+
+                parents.pop()
+                depth = len(parents)
+                if elem.tag.startswith(SY_NS) and depth <= 2:
+                    hint[elem.tag[len(SY_NS):]] = elem.text
+                    continue
+                if feed_type == 'atom':
+                    if depth != 1:
+                        continue
+                    if elem.tag == f'{ns_uri}title':
+                        feed_title = elem.text or source_name
+                        continue
+                    if elem.tag != f'{ns_uri}entry':
+                        continue
+                    started = time.perf_counter()
+                    post, timestamp = atom_entry_to_post(elem, ns_uri, feed_title, source_url,
+                                                         matcher, parse_date)
+                else:
+                    # rss > channel > item
+                    if depth != 2:
+                        continue
+                    if elem.tag == 'title':
+                        feed_title = elem.text or source_name
+                        continue
+                    if elem.tag == 'ttl':
+                        hint['ttl'] = elem.text
+                        continue
+                    if elem.tag != 'item':
+                        continue
+                    started = time.perf_counter()
+                    post, timestamp = rss_item_to_post(elem, feed_title, source_url, matcher,
+                                                       parse_date)
+                build_time += time.perf_counter() - started
+                items += 1
+                if timestamp is not None:
+                    timestamps.append(timestamp)
+
+                elem.clear()
+                parents[-1].remove(elem)
+
+                if since and timestamp is not None and timestamp < since:
+                    stale_run += 1
+                    if stale_run >= STALE_RUN_LIMIT:
+                        return posts, True
+                    continue
+                stale_run = 0
+                if post is None:
+                    continue
+                posts.append(post)
+                if max_items and len(posts) >= max_items:
+                    return posts, True
+
+        parser.close()
+        return posts, False
+    except transport.BodyTooLarge:
+        return posts, True
+    finally:
+        tracing.add('dates', date_time)
+        tracing.add('build', build_time - date_time)
+        tracing.count('items', items)
+        if cadence is not None:
+            cadence['timestamps'] = timestamps
+            cadence['hint'] = (ttl_seconds(hint.get('ttl'))
+                               or update_period_seconds(hint.get('updatePeriod'),
+                                                        hint.get('updateFrequency')))
+
+def parse_feed_body(body, source_name, source_url, since=None, max_items=None, matcher=None,
+                    truncated=False):
+    """
+    parse_feed() over a whole body in a parse worker; returns (posts,
+    stopped_early, cadence, timings), where timings are the worker's
+    (phases, counts) for tracing.merge(). A truncated body was cut off at
+    the byte cap.
+    """
+    def chunks():
+        yield body
+        if truncated:
+            raise transport.BodyTooLarge(f"{source_url} cut off after {len(body)} bytes")
+
+    cadence = {}
+    with tracing.source(source_name, 'feed') as scope:
+        posts, stopped_early = parse_feed(chunks(), source_name, source_url, since, max_items,
+                                          matcher, cadence)
+    return posts, stopped_early, cadence, (scope.phases, scope.counts)
+
+def start_parse_pool(workers):
+    """
+    Process pool for parse_feed_body, or None if workers is 0 (parse on the
+    fetch threads). Workers start right away, before any fetch thread exists
+    to be forked along.
+    """
+    if not workers:
+        return None
+    pool = ProcessPoolExecutor(max_workers=workers)
+    pool.submit(int).result()
+    return pool
+
+def submit_parse(parse_pool, response, url, name, since=None, max_items=None, matcher=None):
+    """
+    Read the body (up to the response's byte cap) and hand it to a parse
+    worker; returns (future, body size, truncated). The whole body is read
+    first, so --since and --max-items no longer end the download early.
+    """
+    chunks = []
+    truncated = False
+    try:
+        for chunk in response.iter_chunks():
+            chunks.append(chunk)
+    except transport.BodyTooLarge:
+        truncated = True
+    body = b''.join(chunks)
+    future = parse_pool.submit(parse_feed_body, body, name or url, url, since, max_items, matcher,
+                               truncated)
+    return future, len(body), truncated
+
+def worker_parsed(result, body_size, truncated):
+    """
+    Merge a parse worker's timings into the current source and return its
+    result as build_feed_result()'s `parsed`.
+    """
+    posts, stopped_early, cadence, (phases, counts) = result
+    tracing.merge(phases, counts)
+    return posts, stopped_early, cadence, body_size, truncated
+
+def within_window(posts, since=None, max_items=None, matcher=None):
+    """Apply the --since / --filter / --max-items window to cached posts (as Posts)."""
+    posts = [Post.from_dict(p) for p in posts]
+    if since:
+        posts = [
+            p for p in posts
+            if (ts := post_timestamp(p)) is None or ts >= since
+        ]
+    if matcher:
+        posts = matcher.filter_posts(posts)
+    if max_items:
+        posts = posts[:max_items]
+    return posts
 
+def build_feed_result(url, name, response, cached, use_cache, since=None, max_items=None,
+                      matcher=None, parsed=None):
+    """
+    Turn a feed response into a result, reusing cached posts on 304.
+
+    The body is parsed while it streams in, unless a parse worker already
+    returned it as `parsed` (posts, stopped_early, cadence, body size,
+    truncated). A body cut off at the response's max_bytes is parsed up to
+    there and the result marked truncated.
+    """
+    if response.status == 304 and cached:
+        response.read()
+        posts = within_window(cached['posts'], since, max_items, matcher)
         return {
             'url': url,
             'name': name,
             'success': True,
+            'cache': 'hit',
+            'bytes': 0,
+            'bytes_saved': cached.get('bytes', 0),
             'post_count': len(posts),
             'posts': posts
         }
-    except Exception as e:
-        return {
-            'url': url,
-            'name': name,
-            'success': False,
-            'error': str(e),
-            'posts': []
-        }
 
-def fetch_all_feeds(feeds):
-    """Fetch all feeds concurrently."""
-    results = []
-    all_posts = []
-
-    with ThreadPoolExecutor(max_workers=5) as executor:
-        future_to_feed = {
-            executor.submit(fetch_and_parse_feed, f['url'], f.get('name')): f
-            for f in feeds
+    if parsed:
+        posts, stopped_early, cadence, body_size, truncated = parsed
+    else:
+        body_size = 0
+        truncated = False
+
+        def counted_chunks():
+            nonlocal body_size, truncated
+            try:
+                for chunk in response.iter_chunks():
+                    body_size += len(chunk)
+                    yield chunk
+            except transport.BodyTooLarge:
+                truncated = True
+                raise
+
+        cadence = {}
+        with tracing.span('parse'):
+            posts, stopped_early = parse_feed(counted_chunks(), name or url, url, since,
+                                              max_items, matcher, cadence)
+
+    if use_cache:
+        # Stored even without validators: --due-only serves these posts too.
+        window = {
+            'since': since,
+            'max_items': max_items,
+            'filter': matcher.cache_key if matcher else None,
         }
+        feed_cache.store_entry(url, response.headers.get('ETag'),
+                               response.headers.get('Last-Modified'), body_size, posts, window)
+
+    result = {
+        'url': url,
+        'name': name,
+        'success': True,
+        'cache': 'miss' if use_cache else None,
+        'bytes': body_size,
+        'stopped_early': stopped_early,
+        'post_count': len(posts),
+        'posts': posts,
+        'cadence': cadence,
+    }
+    if truncated:
+        result['truncated'] = True
+    return result
 
-        for future in as_completed(future_to_feed):
-            result = future.result()
-            results.append({
-                'url': result['url'],
-                'name': result.get('name'),
-                'success': result['success'],
-                'post_count': result.get('post_count', 0),
-                'error': result.get('error')
-            })
-            all_posts.extend(result['posts'])
-
-    # Sort by date (newest first)
-    all_posts.sort(key=lambda x: x.get('pub_date', ''), reverse=True)
+def error_result(url, name, error):
+    return {
+        'url': url,
+        'name': name,
+        'success': False,
+        'error': str(error) or type(error).__name__,
+        'posts': []
+    }
 
+def skipped_result(url, name, reason):
+    """Result for a feed whose circuit breaker is open."""
+    return {**error_result(url, name, reason), 'skipped': True}
+
+def not_due_result(url, name, next_due, use_cache, since=None, max_items=None, matcher=None):
+    """
+    Result serving the cached posts of a feed that is not due yet, or None
+    if there is no cache entry for the window (then it is fetched anyway).
+    Without the cache a feed that is not due is skipped with no posts.
+    """
+    if use_cache:
+        cached = load_cached(url, use_cache, since, max_items, matcher)
+        if not cached:
+            return None
+        posts = within_window(cached['posts'], since, max_items, matcher)
+    else:
+        posts = []
     return {
+        'url': url,
+        'name': name,
+        'success': True,
+        'cache': 'not_due',
+        'not_due': True,
+        'next_due': format_utc(next_due),
+        'bytes': 0,
+        'post_count': len(posts),
+        'posts': posts
+    }
+
+def load_cached(url, use_cache, since=None, max_items=None, matcher=None):
+    """Cache entry usable for a conditional GET under the requested window."""
+    if not use_cache:
+        return None
+    cached = feed_cache.load_entry(url)
+    filter_key = matcher.cache_key if matcher else None
+    if cached and feed_cache.covers_window(cached, since, max_items, filter_key):
+        return cached
+    return None
+
+def fetch_and_parse_feed(url, name=None, use_cache=True, timeout=transport.MAX_TIME,
+                         since=None, max_items=None, matcher=None, parse_pool=None,
+                         max_bytes=None):
+    """
+    Fetch a single feed and parse it while the body streams in, or with a
+    parse_pool, download it whole and parse it in a worker process. At most
+    max_bytes of the decoded body are read.
+    """
+    with tracing.source(name or url, 'feed') as scope:
+        try:
+            cached = load_cached(url, use_cache, since, max_items, matcher)
+            response = check_response(transport.request(
+                url, headers=conditional_headers(cached), timeout=timeout, stream=True,
+                max_bytes=max_bytes,
+            ))
+            try:
+                parsed = None
+                if parse_pool and response.status != 304:
+                    future, body_size, truncated = submit_parse(parse_pool, response, url, name,
+                                                                since, max_items, matcher)
+                    with tracing.span('parse'):
+                        parsed = worker_parsed(future.result(), body_size, truncated)
+                result = build_feed_result(url, name, response, cached, use_cache, since,
+                                           max_items, matcher, parsed)
+            finally:
+                # Drops the connection instead of pooling it if parsing stopped early.
+                response.close()
+        except Exception as e:
+            result = error_result(url, name, e)
+    result['timings'] = scope.summary()
+    return result
+
+async def fetch_and_parse_feed_async(client, url, name=None, use_cache=True, timeout=transport.MAX_TIME,
+                                     since=None, max_items=None, matcher=None, parse_pool=None,
+                                     max_bytes=None):
+    """asyncio counterpart of fetch_and_parse_feed; timeout covers the whole fetch."""
+    with tracing.source(name or url, 'feed') as scope:
+        try:
+            cached = load_cached(url, use_cache, since, max_items, matcher)
+            response = check_response(await asyncio.wait_for(
+                client.request(url, headers=conditional_headers(cached), max_bytes=max_bytes),
+                timeout,
+            ))
+            parsed = None
+            if parse_pool and response.status != 304:
+                future, body_size, truncated = submit_parse(parse_pool, response, url, name, since,
+                                                            max_items, matcher)
+                with tracing.span('parse'):
+                    parsed = worker_parsed(await asyncio.wrap_future(future), body_size,
+                                           truncated)
+            result = build_feed_result(url, name, response, cached, use_cache, since, max_items,
+                                       matcher, parsed)
+        except asyncio.TimeoutError:
+            result = error_result(url, name, f"timed out after {timeout}s")
+        except Exception as e:
+            result = error_result(url, name, e)
+    result['timings'] = scope.summary()
+    return result
+
+def feed_summary(result):
+    """Per-feed entry for feed_results (the result without its posts)."""
+    summary = {
+        'url': result['url'],
+        'name': result.get('name'),
+        'success': result['success'],
+        'cache': result.get('cache'),
+        'bytes': result.get('bytes', 0),
+        'post_count': result.get('post_count', 0),
+        'error': result.get('error')
+    }
+    if result.get('stopped_early'):
+        summary['stopped_early'] = True
+    if result.get('truncated'):
+        summary['truncated'] = True
+    if result.get('skipped'):
+        summary['skipped'] = True
+    if result.get('not_due'):
+        summary['not_due'] = True
+        summary['next_due'] = result['next_due']
+    if result.get('bytes_saved'):
+        summary['bytes_saved'] = result['bytes_saved']
+    if result.get('timings'):
+        summary['timings'] = result['timings']
+    return summary
+
+def build_digest(results, merger, use_cache, deduplicator=None):
+    """Assemble the final output from per-feed summaries and the merged posts (newest first)."""
+    all_posts = merger.merged()
+
+    cache_stats = None
+    if use_cache:
+        cache_stats = {
+            'hits': sum(1 for r in results if r['cache'] == 'hit'),
+            'misses': sum(1 for r in results if r['cache'] == 'miss'),
+            'bytes_downloaded': sum(r['bytes'] for r in results),
+            'bytes_saved': sum(r.get('bytes_saved', 0) for r in results),
+        }
+
+    digest = {
         'fetched_at': datetime.now(timezone.utc).isoformat(),
         'feed_results': results,
+        'cache_stats': cache_stats,
         'total_posts': len(all_posts),
         'posts': all_posts
     }
+    skipped = sum(1 for r in results if r.get('skipped'))
+    if skipped:
+        digest['skipped_feeds'] = skipped
+    not_due = sum(1 for r in results if r.get('not_due'))
+    if not_due:
+        digest['not_due_feeds'] = not_due
+    if deduplicator:
+        digest['duplicates_merged'] = deduplicator.duplicates
+    if merger.limit:
+        digest['limit_applied'] = merger.limit
+        digest['total_before_limit'] = merger.count
+    return digest
+
+def health_key(url):
+    return f'feed:{url}'
+
+def collect_result(result, results, merger, on_posts=None, health=None, schedule=None,
+                   deduplicator=None, index=None):
+    """
+    Record a finished feed's outcome and hand its posts to on_posts or
+    merger. With a deduplicator, duplicates are dropped before the merger
+    sees them, so its limit counts unique posts. With a LocalIndex all of
+    the feed's posts are indexed first, whatever the limit drops later.
+    """
+    if health and not result.get('not_due'):
+        health.record_result(health_key(result['url']), result)
+    if schedule:
+        schedule.record_result(result['url'], result)
+    results.append(feed_summary(result))
+    if index:
+        index.ingest(result['posts'], 'feed')
+    if on_posts:
+        on_posts(result['posts'])
+        return
+    posts = result['posts']
+    if deduplicator:
+        posts = [p for p in map(deduplicator.add, posts) if p is not None]
+    merger.add(posts)
+
+def due_or_cached(feed, schedule, use_cache, since=None, max_items=None, matcher=None):
+    """None if the feed should be fetched, else its not_due_result()."""
+    if not schedule or schedule.is_due(feed['url']):
+        return None
+    return not_due_result(feed['url'], feed.get('name'), schedule.next_due(feed['url']),
+                          use_cache, since, max_items, matcher)
+
+def fetch_all_feeds(feeds, use_cache=True, concurrency=5, timeout=transport.MAX_TIME,
+                    since=None, max_items=None, on_posts=None, matcher=None, limit=None,
+                    health=None, schedule=None, executor=None, parse_pool=None,
+                    max_bytes=DEFAULT_MAX_BYTES, deduplicator=None, index=None):
+    """
+    Fetch all feeds concurrently on a thread pool.
+
+    Each feed's posts are merged newest-first as it completes; with `limit`
+    only the newest `limit` posts overall are kept. With a Deduplicator,
+    duplicates are dropped before merging, so `limit` unique posts remain.
+    If on_posts is given it
+    is called with each feed's posts as soon as that feed completes, and
+    posts are handed off instead of collected.
+
+    With a HealthStore, feeds whose circuit breaker is open are skipped,
+    each feed's timeout adapts to its latency (at most `timeout`) and every
+    outcome is recorded. With a FeedSchedule every fetch updates the feed's
+    learned cadence, and under due_only feeds that are not due yet serve
+    their cached posts without a request.
+
+    A long-running caller can pass its own `executor` to reuse one thread
+    pool across calls; `concurrency` is then ignored. With a parse_pool (see
+    start_parse_pool) the threads only fetch and the XML and HTML work runs
+    in worker processes, off the GIL.
+
+    Each feed's body is read up to max_bytes (a feed's own `max_bytes`
+    config entry overrides it; None means no cap) and parsed that far.
+
+    With a LocalIndex every feed's posts are indexed as they arrive, before
+    deduplication and `limit`.
+    """
+    results = []
+    merger = Merger(limit=limit)
+
+    pool = nullcontext(executor) if executor else ThreadPoolExecutor(max_workers=concurrency)
+    with pool as executor:
+        future_to_feed = {}
+        for f in feeds:
+            cached = due_or_cached(f, schedule, use_cache, since, max_items, matcher)
+            if cached:
+                collect_result(cached, results, merger, on_posts, health, schedule,
+                               deduplicator, index)
+                continue
+            key = health_key(f['url'])
+            if health and not health.allow(key):
+                results.append(feed_summary(skipped_result(f['url'], f.get('name'),
+                                                           health.skip_reason(key))))
+                continue
+            feed_timeout = health.timeout_for(key, timeout) if health else timeout
+            future = executor.submit(tracing.queued(fetch_and_parse_feed), f['url'], f.get('name'),
+                                     use_cache, feed_timeout, since, max_items, matcher,
+                                     parse_pool, f.get('max_bytes', max_bytes))
+            future_to_feed[future] = f
+
+        for future in as_completed(future_to_feed):
+            collect_result(future.result(), results, merger, on_posts, health, schedule,
+                           deduplicator, index)
+
+    return build_digest(results, merger, use_cache, deduplicator)
+
+async def fetch_all_feeds_async(feeds, use_cache=True, concurrency=64, per_host=4,
+                                timeout=transport.MAX_TIME, since=None, max_items=None,
+                                on_posts=None, matcher=None, limit=None, health=None,
+                                schedule=None, parse_pool=None, max_bytes=DEFAULT_MAX_BYTES,
+                                deduplicator=None, index=None):
+    """
+    Fetch all feeds on a single asyncio event loop.
+
+    At most `concurrency` requests are in flight overall and at most
+    `per_host` per hostname, so many feeds on one domain (a Substack,
+    GitHub) are not hammered. Results merge (under `limit`, or go to
+    on_posts), health is tracked, the schedule applied and parse_pool,
+    max_bytes, deduplicator and index used as in fetch_all_feeds.
+    """
+    results = []
+    merger = Merger(limit=limit)
+    global_limit = asyncio.Semaphore(concurrency)
+    host_limits = {}
+
+    async def fetch_one(client, feed):
+        tracing.mark_queued()
+        host = urlsplit(feed['url']).hostname or ''
+        host_limit = host_limits.setdefault(host, asyncio.Semaphore(per_host))
+        feed_timeout = health.timeout_for(health_key(feed['url']), timeout) if health else timeout
+        async with host_limit, global_limit:
+            return await fetch_and_parse_feed_async(
+                client, feed['url'], feed.get('name'), use_cache, feed_timeout, since, max_items,
+                matcher, parse_pool, feed.get('max_bytes', max_bytes),
+            )
+
+    to_fetch = []
+    for f in feeds:
+        cached = due_or_cached(f, schedule, use_cache, since, max_items, matcher)
+        if cached:
+            collect_result(cached, results, merger, on_posts, health, schedule, deduplicator,
+                           index)
+            continue
+        key = health_key(f['url'])
+        if health and not health.allow(key):
+            results.append(feed_summary(skipped_result(f['url'], f.get('name'),
+                                                       health.skip_reason(key))))
+        else:
+            to_fetch.append(f)
+
+    async with transport.AsyncClient() as client:
+        tasks = [asyncio.ensure_future(fetch_one(client, f)) for f in to_fetch]
+        for next_done in asyncio.as_completed(tasks):
+            collect_result(await next_done, results, merger, on_posts, health, schedule,
+                           deduplicator, index)
+
+    return build_digest(results, merger, use_cache, deduplicator)
 
 def main():
     parser = argparse.ArgumentParser(description='Fetch multiple RSS/Atom feeds')
     parser.add_argument('config', nargs='?', help='JSON config file with feeds array')
     parser.add_argument('--urls', help='Comma-separated list of feed URLs')
-    parser.add_argument('--filter', help='Comma-separated keywords to filter posts')
+    parser.add_argument('--filter',
+                        help='Comma-separated keywords to filter posts; +term required, -term excluded')
+    parser.add_argument('--filter-file',
+                        help='File of filter terms, one or more per line (# starts a comment line)')
+    parser.add_argument('--word-boundary', action='store_true',
+                        help='Match filter terms as whole words only')
+    parser.add_argument('--no-cache', action='store_true',
+                        help='Disable the conditional-GET feed cache')
+    parser.add_argument('--async', dest='use_async', action='store_true',
+                        help='Fetch on a single asyncio event loop instead of a thread pool')
+    parser.add_argument('--concurrency', type=int,
+                        help='Max concurrent requests (default: 5 threads, 64 with --async)')
+    parser.add_argument('--per-host', type=int, default=4,
+                        help='Max concurrent requests per host with --async (default: 4)')
+    parser.add_argument('--parse-workers', type=int, nargs='?', const=os.cpu_count() or 1,
+                        default=0, metavar='N',
+                        help='Parse feeds in N worker processes (default without N: one per core) '
+                             'instead of on the fetch threads. Bodies are then downloaded whole, '
+                             'so --since and --max-items no longer stop a download early')
+    parser.add_argument('--timeout', type=float, default=transport.MAX_TIME,
+                        help='Longest per-feed timeout in seconds; feeds with a latency history '
+                             'get a tighter one (default: 30)')
+    parser.add_argument('--no-breaker', action='store_true',
+                        help='Also fetch feeds whose circuit breaker is open after repeated failures')
+    parser.add_argument('--due-only', action='store_true',
+                        help='Only request feeds due by their learned publishing cadence; '
+                             'the others serve their cached posts (none under --no-cache)')
+    parser.add_argument('--honor-ttl', action='store_true',
+                        help="With --due-only, never poll a feed more often than its own "
+                             "<ttl> / sy:updatePeriod asks")
+    parser.add_argument('--max-bytes', type=int, default=DEFAULT_MAX_BYTES,
+                        help='Read at most this many (decompressed) bytes per feed and parse the '
+                             'entries within them; 0 for no cap (default: 10 MiB)')
+    parser.add_argument('--since', type=parse_since,
+                        help='Only keep posts newer than this: 36h, 7d, 2w or an ISO date')
+    parser.add_argument('--max-items', type=int,
+                        help='Stop reading each feed after this many posts')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only emit posts not seen in earlier runs, and remember them')
+    parser.add_argument('--no-dedup', action='store_true',
+                        help='Keep duplicate and near-duplicate posts from different feeds')
+    parser.add_argument('--limit', type=int,
+                        help='Only output the newest N posts across all feeds')
+    parser.add_argument('--no-index', action='store_true',
+                        help='Do not add fetched posts to the local search index')
+    parser.add_argument('--min-prescore', type=float,
+                        help='Score posts by references/scoring.md (prescore.py) and only output '
+                             'those scoring at least this, e.g. 4')
+    parser.add_argument('--top-k', type=int,
+                        help='Only output the K best-scoring posts, best first')
+    parser.add_argument('--lexicon',
+                        help='JSON {dimension: {term: score}} merged over the prescore lexicon')
+    parser.add_argument('--format', choices=['json', 'ndjson'], default='json',
+                        help='json: one document at the end; ndjson: stream posts as feeds complete')
+    parser.add_argument('--export-columns', metavar='PATH',
+                        help='Also write the output posts column by column to PATH for analysis '
+                             '(packed arrays; an Arrow file if PATH ends in .arrow and pyarrow '
+                             'is installed)')
+    parser.add_argument('--trace', metavar='OUT_JSON',
+                        help='Write a Chrome trace (chrome://tracing, Perfetto) of the run to this file')
     args = parser.parse_args()
+    if args.trace:
+        tracing.start_trace()
 
     feeds = []
 
@@ -231,21 +780,137 @@ def main():
         print(json.dumps({'error': 'No feeds provided'}), file=sys.stderr)
         sys.exit(1)
 
-    result = fetch_all_feeds(feeds)
-
-    # Apply keyword filter if specified
-    if args.filter:
-        keywords = [k.strip().lower() for k in args.filter.split(',')]
-        filtered_posts = []
-        for post in result['posts']:
-            text = f"{post['title']} {post['description']}".lower()
-            if any(kw in text for kw in keywords):
-                filtered_posts.append(post)
-        result['posts'] = filtered_posts
-        result['total_posts'] = len(filtered_posts)
-        result['filter_applied'] = keywords
-
-    print(json.dumps(result, ensure_ascii=False, indent=2))
+    terms = parse_terms(args.filter) if args.filter else []
+    if args.filter_file:
+        with open(args.filter_file) as f:
+            terms += parse_terms(f.read())
+    matcher = KeywordFilter(terms, args.word_boundary) if terms else None
+    prescoring = args.min_prescore is not None or args.top_k
+    lexicon = load_lexicon(args.lexicon) if prescoring else None
+
+    # JSON mode drops duplicates while merging, before --limit cuts (ndjson in on_posts).
+    merge_deduplicator = None
+    if args.format == 'ndjson':
+        writer = NdjsonWriter()
+        deduplicator = None if args.no_dedup else Deduplicator()
+        seen_store = SeenStore() if args.incremental else None
+        already_seen = 0
+        # The newest N across all feeds are only known once every feed is in.
+        limited = Merger(limit=args.limit) if args.limit else None
+        exported = [] if args.export_columns else None
+        prescorer = PreScorer(lexicon, time.time()) if prescoring else None
+        # The best K are only known once every feed is in.
+        best = Merger(key=by_prescore, limit=args.top_k) if args.top_k else None
+        prescored = 0
+
+        def write(posts):
+            writer.write_many('post', posts)
+            if seen_store:
+                seen_store.mark(posts)
+            if exported is not None:
+                exported.extend(posts)
+
+        def emit(posts):
+            nonlocal already_seen, prescored
+            if seen_store:
+                # Marked as seen when written, so pruned posts can come up again.
+                new_posts = seen_store.unseen(posts)
+                already_seen += len(posts) - len(new_posts)
+                posts = new_posts
+            if prescorer:
+                prescored += len(posts)
+                posts = prescorer.prune(posts, args.min_prescore)
+            (best.add if best else write)(posts)
+
+        def on_posts(posts):
+            if deduplicator:
+                posts = [p for p in map(deduplicator.add, posts) if p is not None]
+            if limited:
+                limited.add(posts)
+            else:
+                emit(posts)
+    else:
+        on_posts = None
+        if not args.no_dedup:
+            merge_deduplicator = Deduplicator()
+
+    # Every fetched post is indexed as it arrives, before dedup and --limit.
+    index = None if args.no_index else LocalIndex()
+    health = HealthStore(breaker=not args.no_breaker)
+    schedule = FeedSchedule(due_only=args.due_only, honor_hints=args.honor_ttl)
+    parse_pool = start_parse_pool(args.parse_workers)
+    with tracing.span('fetch'):
+        if args.use_async:
+            result = asyncio.run(fetch_all_feeds_async(
+                feeds, use_cache=not args.no_cache, concurrency=args.concurrency or 64,
+                per_host=args.per_host, timeout=args.timeout,
+                since=args.since, max_items=args.max_items, on_posts=on_posts, matcher=matcher,
+                limit=args.limit, health=health, schedule=schedule, parse_pool=parse_pool,
+                max_bytes=args.max_bytes or None, deduplicator=merge_deduplicator, index=index,
+            ))
+        else:
+            result = fetch_all_feeds(
+                feeds, use_cache=not args.no_cache, concurrency=args.concurrency or 5,
+                timeout=args.timeout, since=args.since, max_items=args.max_items,
+                on_posts=on_posts, matcher=matcher, limit=args.limit, health=health,
+                schedule=schedule, parse_pool=parse_pool, max_bytes=args.max_bytes or None,
+                deduplicator=merge_deduplicator, index=index,
+            )
+    health.save()
+    schedule.save()
+    if parse_pool:
+        parse_pool.shutdown()
+    if index:
+        index.close()
+
+    if args.format == 'ndjson':
+        if limited:
+            emit(limited.merged())
+            result['limit_applied'] = args.limit
+            result['total_before_limit'] = limited.count
+        if best:
+            write(best.merged())
+        if prescorer:
+            result['prescore'] = {'min': args.min_prescore, 'top_k': args.top_k,
+                                  'kept': writer.count, 'dropped': prescored - writer.count}
+        result['total_posts'] = writer.count
+        if matcher:
+            result['filter_applied'] = matcher.terms
+        if deduplicator:
+            result['duplicates_merged'] = deduplicator.duplicates
+        if seen_store:
+            seen_store.close()
+            result['incremental'] = {'new': writer.count, 'already_seen': already_seen}
+        if exported is not None:
+            with tracing.span('export'):
+                write_columns(exported, args.export_columns)
+            result['columns_exported'] = args.export_columns
+        writer.summary(result)
+        tracing.save_trace(args.trace)
+        return
+
+    if matcher:
+        result['filter_applied'] = matcher.terms
+
+    def prescore(result):
+        with tracing.span('prescore'):
+            apply_prescore(result, args.min_prescore, args.top_k, lexicon)
+
+    if args.incremental:
+        # Only posts that survive the pre-scorer are recorded as seen.
+        with tracing.span('incremental'):
+            apply_incremental(result, prune=prescore if prescoring else None)
+    elif prescoring:
+        prescore(result)
+
+    if args.export_columns:
+        with tracing.span('export'):
+            write_columns(result['posts'], args.export_columns)
+        result['columns_exported'] = args.export_columns
+
+    with tracing.span('output'):
+        print(json.dumps(result, ensure_ascii=False, indent=2, default=to_json))
+    tracing.save_trace(args.trace)
 
 if __name__ == '__main__':
     main()
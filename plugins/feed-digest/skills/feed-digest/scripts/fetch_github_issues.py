@@ -7,6 +7,7 @@ Usage:
     python fetch_github_issues.py --repos "owner/repo1,owner/repo2"
     python fetch_github_issues.py --repos "ruanyf/weekly" --search "Claude"
     python fetch_github_issues.py --repos "ruanyf/weekly" --days 7
+    python fetch_github_issues.py --repos "owner/a,owner/b" --format ndjson
 
 Environment:
     GITHUB_TOKEN: Optional. Increases rate limit from 60 to 5000 req/hour.
@@ -16,79 +17,448 @@ import sys
 import os
 import json
 import argparse
-import subprocess
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
 from datetime import datetime, timezone, timedelta
-from html import unescape
-from urllib.parse import quote
+from urllib.parse import quote, urlsplit, urlunsplit, parse_qsl, urlencode
 import re
 
-
-def strip_html(text):
-    """Remove HTML tags and decode entities."""
-    if not text:
-        return ""
-    text = re.sub(r'<[^>]+>', '', text)
-    return unescape(text).strip()
+import tracing
+import transport
+from dates import format_utc, parse_iso
+from health import HealthStore
+from html_text import strip_html
+from merge import Merger
+from local_index import LocalIndex
+from ndjson_output import NdjsonWriter
+from posts import Post, to_json
+from prescore import PreScorer, apply_prescore, by_prescore, load_lexicon
+from seen_store import SeenStore, apply_incremental
 
 
 def truncate(text, max_len=800):
     """Truncate text to max length."""
     if not text:
         return ""
-    text = strip_html(text)
+    text = strip_html(text, max_len + 1)
     if len(text) <= max_len:
         return text
     return text[:max_len] + "..."
 
 
-def github_api(endpoint, token=None):
-    """Call GitHub API using curl."""
-    url = f"https://api.github.com{endpoint}"
-    cmd = [
-        'curl', '-sS', '-L',
-        '--connect-timeout', '15',
-        '--max-time', '30',
-        '-H', 'Accept: application/vnd.github.v3+json',
-        '-H', 'User-Agent: feed-digest-bot'
-    ]
+class RateLimitError(RuntimeError):
+    """Raised when a request would have to wait longer than max_wait for budget."""
+
+
+class RateLimiter:
+    """
+    Client-side scheduler for GitHub's per-resource rate limits.
+
+    Budgets are tracked per resource ('core', 'search', ...), each with its own
+    X-RateLimit-Remaining / X-RateLimit-Reset and concurrency cap. Before a
+    request, acquire() waits while the resource is paused (Retry-After or an
+    exhausted budget) and, once the budget runs low, spaces calls evenly over
+    the time left until reset. After the response, release() refreshes the
+    budget from its headers.
+    """
+
+    # The search API has a much smaller budget (30/min with a token, 10/min
+    # without) and is the most sensitive to secondary limits.
+    CONCURRENCY = {'core': 8, 'search': 2}
+    # Start pacing when less than this fraction of the budget is left.
+    LOW_WATER = 0.1
+
+    def __init__(self, max_wait=600):
+        self.max_wait = max_wait
+        self._cond = threading.Condition()
+        self._budgets = {}
+
+    def _budget(self, resource):
+        return self._budgets.setdefault(resource, {
+            'limit': None,
+            'remaining': None,
+            'reset': 0.0,
+            'paused_until': 0.0,
+            'in_flight': 0,
+            'last_start': 0.0,
+        })
+
+    def _delay(self, resource, budget, now):
+        """Seconds to wait before the next call on this resource, 0 if none."""
+        if budget['paused_until'] > now:
+            return budget['paused_until'] - now
+        if budget['in_flight'] >= self.CONCURRENCY.get(resource, 4):
+            return None
+        remaining = budget['remaining']
+        if remaining is None or budget['reset'] <= now:
+            return 0
+        available = remaining - budget['in_flight']
+        if available <= 0:
+            return budget['reset'] - now + 1
+        if budget['limit'] and remaining < budget['limit'] * self.LOW_WATER:
+            interval = (budget['reset'] - now) / available
+            return max(0, budget['last_start'] + interval - now)
+        return 0
+
+    def acquire(self, resource):
+        """Block until a call on resource is allowed, then reserve it."""
+        deadline = time.time() + self.max_wait
+        with self._cond:
+            budget = self._budget(resource)
+            while True:
+                now = time.time()
+                delay = self._delay(resource, budget, now)
+                if delay == 0:
+                    break
+                if delay is not None and now + delay > deadline:
+                    raise RateLimitError(
+                        f"GitHub {resource} rate limit: budget resets in {int(delay)}s, "
+                        f"beyond --max-wait {self.max_wait}s"
+                    )
+                # delay None means waiting for an in-flight call to finish.
+                self._cond.wait(delay if delay is not None else max(0.1, deadline - now))
+            budget['in_flight'] += 1
+            budget['last_start'] = time.time()
+
+    def release(self, resource, status=None, headers=None):
+        """Return a reservation and update the budget from response headers."""
+        with self._cond:
+            budget = self._budget(resource)
+            budget['in_flight'] -= 1
+            if headers is not None:
+                self._update(budget, status, headers)
+            self._cond.notify_all()
+
+    def _update(self, budget, status, headers):
+        now = time.time()
+        remaining = headers.get('X-RateLimit-Remaining')
+        reset = headers.get('X-RateLimit-Reset')
+        limit = headers.get('X-RateLimit-Limit')
+        if remaining is not None and reset is not None:
+            remaining, reset = int(remaining), float(reset)
+            if reset > budget['reset'] or budget['remaining'] is None:
+                # New window (or first response): trust the header outright.
+                budget['remaining'], budget['reset'] = remaining, reset
+            else:
+                # Same window, responses may arrive out of order.
+                budget['remaining'] = min(budget['remaining'], remaining)
+            if limit is not None:
+                budget['limit'] = int(limit)
+
+        if status in (403, 429):
+            retry_after = headers.get('Retry-After')
+            if retry_after and retry_after.isdigit():
+                budget['paused_until'] = max(budget['paused_until'], now + int(retry_after))
+            elif budget['remaining'] == 0:
+                budget['paused_until'] = max(budget['paused_until'], budget['reset'] + 1)
+            else:
+                # Secondary limit without Retry-After: GitHub asks for >= 1 minute.
+                budget['paused_until'] = max(budget['paused_until'], now + 60)
+
+    def snapshot(self):
+        """Current budgets, for the output's rate_limit section."""
+        with self._cond:
+            return {
+                resource: {
+                    'limit': b['limit'],
+                    'remaining': b['remaining'],
+                    'reset': datetime.fromtimestamp(b['reset'], timezone.utc).isoformat() if b['reset'] else None,
+                }
+                for resource, b in self._budgets.items()
+            }
+
+
+rate_limiter = RateLimiter()
+
+GITHUB_API = 'https://api.github.com'
+# REST pages fetched per listing (100 issues each); the search API stops at 1000 results.
+MAX_PAGES = 10
+PAGE_CONCURRENCY = 4
+# Repos per GraphQL query; each alias costs roughly one point.
+GRAPHQL_BATCH = 20
+
+# Times a request is retried after a primary/secondary rate-limit response.
+RATE_LIMIT_RETRIES = 3
+
+
+def is_rate_limit_error(error):
+    """Whether a failed fetch means our API budget ran out, which says nothing about the repo."""
+    return isinstance(error, RateLimitError) or 'rate limit' in str(error).lower()
+
+
+def is_rate_limited(status, headers, data):
+    if status == 429:
+        return True
+    if status != 403:
+        return False
+    message = data.get('message', '') if isinstance(data, dict) else ''
+    return (headers.get('X-RateLimit-Remaining') == '0'
+            or headers.get('Retry-After') is not None
+            or 'rate limit' in message.lower())
+
+
+def github_request(endpoint, token=None, body=None, timeout=transport.MAX_TIME):
+    """
+    Call GitHub API over the shared pooled transport.
+
+    endpoint is an API path or a full URL (as found in Link headers); a body
+    makes it a POST. Requests are scheduled through rate_limiter and
+    rate-limited responses are retried after the pause GitHub asks for
+    instead of failing the repo. Returns (data, headers).
+    """
+    url = endpoint if endpoint.startswith(('http://', 'https://')) else f"{GITHUB_API}{endpoint}"
+    path = urlsplit(url).path
+    if path == '/graphql':
+        resource = 'graphql'
+    elif path.startswith('/search/'):
+        resource = 'search'
+    else:
+        resource = 'core'
+    headers = {
+        'Accept': 'application/vnd.github.v3+json',
+        'User-Agent': 'feed-digest-bot',
+    }
     if token:
-        cmd.extend(['-H', f'Authorization: token {token}'])
-    cmd.append(url)
-
-    result = subprocess.run(cmd, capture_output=True, text=True)
-    if result.returncode != 0:
-        raise RuntimeError(f"curl failed: {result.stderr}")
-
-    return json.loads(result.stdout)
-
+        headers['Authorization'] = f'token {token}'
 
-def search_issues(repo, query, token=None):
-    """Search issues in a repo."""
+    for attempt in range(RATE_LIMIT_RETRIES + 1):
+        with tracing.span('rate_limit', resource=resource):
+            rate_limiter.acquire(resource)
+        response = None
+        try:
+            response = transport.request(url, method='POST' if body else 'GET',
+                                         headers=headers, body=body, timeout=timeout)
+            data = response.json()
+        finally:
+            rate_limiter.release(
+                resource,
+                response.status if response else None,
+                response.headers if response else None,
+            )
+        if is_rate_limited(response.status, response.headers, data) and attempt < RATE_LIMIT_RETRIES:
+            continue
+        if response.status >= 400:
+            message = data.get('message', '') if isinstance(data, dict) else ''
+            raise RuntimeError(f"GitHub API {response.status}: {message}")
+        return data, response.headers
+
+
+def github_api(endpoint, token=None, timeout=transport.MAX_TIME):
+    """Call GitHub API and return the decoded JSON body."""
+    return github_request(endpoint, token, timeout=timeout)[0]
+
+
+def parse_link_header(value):
+    """Parse an RFC 8288 Link header into {rel: url}."""
+    links = {}
+    for part in (value or '').split(','):
+        match = re.search(r'<([^>]+)>\s*;\s*rel="?([^";]+)"?', part)
+        if match:
+            links[match.group(2)] = match.group(1)
+    return links
+
+
+def with_page(url, page):
+    """Return url with its page query parameter replaced."""
+    parts = urlsplit(url)
+    query = [(k, v) for k, v in parse_qsl(parts.query) if k != 'page'] + [('page', str(page))]
+    return urlunsplit(parts._replace(query=urlencode(query)))
+
+
+def paginate(endpoint, token=None, max_pages=MAX_PAGES, items_key=None, timeout=transport.MAX_TIME):
+    """
+    Fetch every page of a paginated REST endpoint, up to max_pages.
+    Returns (items, total pages); more pages than max_pages means the items
+    were cut short.
+
+    The first page's Link rel="last" gives the page count, so the remaining
+    pages are fetched concurrently rather than by walking rel="next".
+    """
+    data, headers = github_request(endpoint, token, timeout=timeout)
+    pages = [data]
+    total_pages = 1
+    last = parse_link_header(headers.get('Link')).get('last')
+    if last:
+        total_pages = int(dict(parse_qsl(urlsplit(last).query)).get('page', 1))
+        urls = [with_page(last, page) for page in range(2, min(total_pages, max_pages) + 1)]
+        if urls:
+            with ThreadPoolExecutor(max_workers=min(len(urls), PAGE_CONCURRENCY)) as executor:
+                pages.extend(executor.map(tracing.propagate(lambda u: github_api(u, token, timeout)), urls))
+
+    items = []
+    for page in pages:
+        items.extend(page.get(items_key, []) if items_key else page)
+    return items, total_pages
+
+
+def search_issues(repo, query, token=None, max_pages=MAX_PAGES, timeout=transport.MAX_TIME):
+    """
+    Search issues in a repo, as (issues, total pages) like paginate().
+    Errors propagate, so the repo is reported as failed.
+    """
     # GitHub search API - properly encode the query
     search_query = f"{query} repo:{repo} is:issue"
     encoded_query = quote(search_query, safe='')
-    endpoint = f"/search/issues?q={encoded_query}&sort=created&order=desc&per_page=50"
+    endpoint = f"/search/issues?q={encoded_query}&sort=created&order=desc&per_page=100"
+    return paginate(endpoint, token, max_pages, items_key='items', timeout=timeout)
 
-    try:
-        data = github_api(endpoint, token)
-        return data.get('items', [])
-    except Exception as e:
-        print(f"Search error for {repo}: {e}", file=sys.stderr)
-        return []
 
-
-def list_issues(repo, days=7, token=None):
-    """List recent issues from a repo."""
+def list_issues(repo, days=7, token=None, max_pages=MAX_PAGES, timeout=transport.MAX_TIME):
+    """List recent issues from a repo, as (issues, total pages). Errors propagate as in search_issues."""
     since = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
-    endpoint = f"/repos/{repo}/issues?state=open&sort=created&direction=desc&per_page=100&since={since}"
+    endpoint = (f"/repos/{repo}/issues?state=open&sort=created&direction=desc&per_page=100"
+                f"&since={quote(since, safe='')}")
+
+    data, total_pages = paginate(endpoint, token, max_pages, timeout=timeout)
+    # Filter out pull requests (they also appear in issues endpoint)
+    return [issue for issue in data if 'pull_request' not in issue], total_pages
+
+
+# =============================================================================
+# GraphQL batch mode
+# =============================================================================
+
+GRAPHQL_ISSUE_FIELDS = """
+number title url body createdAt
+author { login }
+comments { totalCount }
+labels(first: 20) { nodes { name } }
+thumbsUp: reactions(content: THUMBS_UP) { totalCount }
+heart: reactions(content: HEART) { totalCount }
+hooray: reactions(content: HOORAY) { totalCount }
+rocket: reactions(content: ROCKET) { totalCount }
+"""
+
+
+def build_graphql_query(count, search=False):
+    """One query with an aliased field (r0, r1, ...) per repo."""
+    if search:
+        params = ', '.join(f'$q{i}: String!' for i in range(count))
+        fields = ''.join(
+            f'r{i}: search(query: $q{i}, type: ISSUE, first: 100) '
+            f'{{ nodes {{ ... on Issue {{ {GRAPHQL_ISSUE_FIELDS} }} }} }}\n'
+            for i in range(count)
+        )
+    else:
+        params = ', '.join(f'$o{i}: String!, $n{i}: String!' for i in range(count)) + ', $since: DateTime!'
+        fields = ''.join(
+            f'r{i}: repository(owner: $o{i}, name: $n{i}) {{ issues(first: 100, states: OPEN, '
+            f'orderBy: {{field: CREATED_AT, direction: DESC}}, filterBy: {{since: $since}}) '
+            f'{{ nodes {{ {GRAPHQL_ISSUE_FIELDS} }} }} }}\n'
+            for i in range(count)
+        )
+    return f'query({params}) {{\n{fields}rateLimit {{ cost remaining resetAt }}\n}}'
+
+
+def graphql_issue_to_rest(node):
+    """Reshape a GraphQL issue node like a REST issue so issue_to_post applies."""
+    return {
+        'number': node.get('number', 0),
+        'title': node.get('title', ''),
+        'html_url': node.get('url', ''),
+        'body': node.get('body', ''),
+        'created_at': node.get('createdAt', ''),
+        'user': {'login': (node.get('author') or {}).get('login', '')},
+        'comments': (node.get('comments') or {}).get('totalCount', 0),
+        'labels': [{'name': label['name']} for label in (node.get('labels') or {}).get('nodes', [])],
+        'reactions': {
+            '+1': node['thumbsUp']['totalCount'],
+            'heart': node['heart']['totalCount'],
+            'hooray': node['hooray']['totalCount'],
+            'rocket': node['rocket']['totalCount'],
+        },
+    }
 
-    try:
-        data = github_api(endpoint, token)
-        # Filter out pull requests (they also appear in issues endpoint)
-        return [issue for issue in data if 'pull_request' not in issue]
-    except Exception as e:
-        print(f"List error for {repo}: {e}", file=sys.stderr)
-        return []
+
+def graphql_fetch_batch(repos, search_query=None, days=7, token=None, timeout=transport.MAX_TIME):
+    """
+    Fetch recent (or matching) issues for a batch of repos in one GraphQL call.
+
+    Returns {repo: issues} and {repo: error message} for aliases that failed.
+    """
+    variables = {}
+    if search_query:
+        for i, repo in enumerate(repos):
+            variables[f'q{i}'] = f"{search_query} repo:{repo} is:issue sort:created-desc"
+    else:
+        for i, repo in enumerate(repos):
+            variables[f'o{i}'], _, variables[f'n{i}'] = repo.partition('/')
+        variables['since'] = (datetime.now(timezone.utc) - timedelta(days=days)).isoformat()
+
+    query = build_graphql_query(len(repos), search=bool(search_query))
+    payload, _ = github_request('/graphql', token, body={'query': query, 'variables': variables},
+                                timeout=timeout)
+    data = payload.get('data') or {}
+    if any(e.get('type') == 'RATE_LIMITED' for e in payload.get('errors', [])):
+        # GraphQL reports an exhausted budget as HTTP 200 with an error.
+        raise RateLimitError('; '.join(e.get('message', '') for e in payload['errors']))
+
+    errors = {}
+    for error in payload.get('errors', []):
+        alias = (error.get('path') or [None])[0]
+        if alias and alias.startswith('r') and alias[1:].isdigit():
+            errors[repos[int(alias[1:])]] = error.get('message', 'GraphQL error')
+    if not data and not errors:
+        message = '; '.join(e.get('message', '') for e in payload.get('errors', [])) or 'empty response'
+        errors = {repo: message for repo in repos}
+
+    issues = {}
+    for i, repo in enumerate(repos):
+        node = data.get(f'r{i}')
+        if node is None:
+            errors.setdefault(repo, 'not found')
+            continue
+        nodes = node['nodes'] if search_query else node['issues']['nodes']
+        issues[repo] = [graphql_issue_to_rest(n) for n in nodes if n]
+    return issues, errors
+
+
+def iter_repos_graphql(repo_configs, search_query=None, days=7, token=None, concurrency=8,
+                       health=None):
+    """
+    GraphQL counterpart of the per-repo REST fetch: GRAPHQL_BATCH repos per
+    request. Yields (result entry, posts) per repo as batches complete.
+    A batch's timeout is the longest adaptive timeout of its repos.
+    """
+    repos = [(r, r) if isinstance(r, str) else (r.get('repo', ''), r.get('name', r.get('repo', '')))
+             for r in repo_configs]
+    repos = [(repo, name) for repo, name in repos if repo]
+    batches = [repos[i:i + GRAPHQL_BATCH] for i in range(0, len(repos), GRAPHQL_BATCH)]
+
+    def run(number, batch):
+        names = [repo for repo, _ in batch]
+        timeout = transport.MAX_TIME
+        if health:
+            timeout = max(health.timeout_for(health_key(repo), timeout) for repo in names)
+        rate_limited = False
+        with tracing.source(f'graphql batch {number}', 'github') as scope:
+            tracing.count('batch_repos', len(batch))
+            try:
+                fetched = graphql_fetch_batch(names, search_query, days, token, timeout)
+            except Exception as e:
+                fetched = ({}, {repo: str(e) for repo in names})
+                rate_limited = is_rate_limit_error(e)
+        return batch, fetched, rate_limited, scope.summary()
+
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = [executor.submit(tracing.queued(run), number, batch)
+                   for number, batch in enumerate(batches)]
+        for future in as_completed(futures):
+            # Repos of a batch share one request, so they share its timings.
+            batch, (issues, errors), rate_limited, timings = future.result()
+            for repo, name in batch:
+                if repo in errors:
+                    entry = {'repo': repo, 'name': name, 'success': False, 'error': errors[repo],
+                             'timings': timings}
+                    if rate_limited:
+                        entry['rate_limited'] = True
+                    yield entry, []
+                    continue
+                repo_issues = issues.get(repo, [])
+                posts = [issue_to_post(issue, name) for issue in repo_issues]
+                yield {'repo': repo, 'name': name, 'success': True, 'issue_count': len(repo_issues),
+                       'timings': timings}, posts
 
 
 def issue_to_post(issue, repo_name):
@@ -103,74 +473,168 @@ def issue_to_post(issue, repo_name):
     ])
 
     labels = [label.get('name', '') for label in issue.get('labels', [])]
-
-    return {
-        'title': issue.get('title', ''),
-        'link': issue.get('html_url', ''),
-        'description': truncate(issue.get('body', '')),
-        'pub_date': issue.get('created_at', ''),
-        'categories': labels,
-        'creator': issue.get('user', {}).get('login', ''),
-        'source': repo_name,
-        'source_url': f"https://github.com/{repo_name}",
+    created_at = issue.get('created_at') or ''
+    timestamp = parse_iso(created_at)
+
+    return Post(
+        title=issue.get('title', ''),
+        link=issue.get('html_url', ''),
+        description=truncate(issue.get('body', '')),
+        pub_date=format_utc(timestamp, created_at),
+        timestamp=timestamp,
+        categories=labels,
+        creator=issue.get('user', {}).get('login', ''),
+        source=repo_name,
+        source_url=f"https://github.com/{repo_name}",
         # GitHub-specific fields for scoring
-        'reactions': reaction_count,
-        'comments': issue.get('comments', 0),
-        'issue_number': issue.get('number', 0),
-    }
+        extra={
+            'reactions': reaction_count,
+            'comments': issue.get('comments', 0),
+            'issue_number': issue.get('number', 0),
+        },
+    )
 
 
-def fetch_all_repos(repos, search_query=None, days=7, token=None):
-    """Fetch issues from all configured repos."""
-    all_posts = []
-    results = []
+def repo_id(repo_config):
+    """owner/repo of a repo config entry (a string or {'repo': ..., 'name': ...})."""
+    return repo_config if isinstance(repo_config, str) else repo_config.get('repo', '')
 
-    for repo_config in repos:
-        if isinstance(repo_config, str):
-            repo = repo_config
-            name = repo_config
-        else:
-            repo = repo_config.get('repo', '')
-            name = repo_config.get('name', repo)
 
-        if not repo:
-            continue
+def health_key(repo):
+    return f'github:{repo}'
+
 
+def fetch_repo(repo_config, search_query=None, days=7, token=None, max_pages=MAX_PAGES,
+               timeout=transport.MAX_TIME):
+    """Fetch one repo's issues. Returns (result entry, posts) or None if unnamed."""
+    if isinstance(repo_config, str):
+        repo = repo_config
+        name = repo_config
+    else:
+        repo = repo_config.get('repo', '')
+        name = repo_config.get('name', repo)
+
+    if not repo:
+        return None
+
+    with tracing.source(name, 'github') as scope:
         try:
             if search_query:
-                issues = search_issues(repo, search_query, token)
+                issues, total_pages = search_issues(repo, search_query, token, max_pages, timeout)
             else:
-                issues = list_issues(repo, days, token)
+                issues, total_pages = list_issues(repo, days, token, max_pages, timeout)
 
-            posts = [issue_to_post(issue, name) for issue in issues]
-            all_posts.extend(posts)
-
-            results.append({
+            with tracing.span('build'):
+                posts = [issue_to_post(issue, name) for issue in issues]
+            tracing.count('items', len(issues))
+            entry = {
                 'repo': repo,
                 'name': name,
                 'success': True,
                 'issue_count': len(issues),
-            })
+            }
+            if total_pages > max_pages:
+                # Only the newest max_pages pages were fetched.
+                entry['truncated'] = True
+                entry['total_pages'] = total_pages
         except Exception as e:
-            results.append({
+            entry = {
                 'repo': repo,
                 'name': name,
                 'success': False,
                 'error': str(e),
-            })
+            }
+            if is_rate_limit_error(e):
+                entry['rate_limited'] = True
+            posts = []
+    entry['timings'] = scope.summary()
+    return entry, posts
+
+
+def iter_repos_rest(repos, search_query=None, days=7, token=None, concurrency=8, max_pages=MAX_PAGES,
+                    health=None):
+    """Fetch repos over REST in parallel, yielding (result entry, posts) as each completes."""
+    with ThreadPoolExecutor(max_workers=concurrency) as executor:
+        futures = []
+        for r in repos:
+            timeout = transport.MAX_TIME
+            if health:
+                timeout = health.timeout_for(health_key(repo_id(r)), timeout)
+            futures.append(executor.submit(tracing.queued(fetch_repo), r, search_query, days, token,
+                                           max_pages, timeout))
+        for future in as_completed(futures):
+            item = future.result()
+            if item is not None:
+                yield item
+
+
+def issue_sort_key(post):
+    """Newest first, then most reactions."""
+    return (post.get('timestamp') or 0, post.get('reactions', 0))
+
+
+def fetch_all_repos(repos, search_query=None, days=7, token=None, concurrency=8,
+                    max_pages=MAX_PAGES, graphql=False, on_posts=None, limit=None, health=None,
+                    index=None):
+    """
+    Fetch issues from all configured repos concurrently, within rate limits.
+
+    With graphql=True repos are fetched GRAPHQL_BATCH at a time through
+    aliased GraphQL queries (token required), up to 100 issues per repo.
+    Repos' issues are merged newest-first as they arrive, keeping only the
+    top `limit` if given. If on_posts is given it receives each repo's posts
+    as soon as they arrive, and posts are handed off instead of collected.
+
+    With a HealthStore, repos whose circuit breaker is open are skipped,
+    timeouts adapt to each repo's latency and outcomes are recorded
+    (rate-limit failures excepted). With a LocalIndex every repo's posts are
+    indexed as they arrive, before `limit`.
+    """
+    merger = Merger(key=issue_sort_key, limit=limit)
+    results = []
 
-    # Sort by date (newest first), then by reactions
-    all_posts.sort(key=lambda x: (x.get('pub_date', ''), x.get('reactions', 0)), reverse=True)
+    if health:
+        to_fetch = []
+        for r in repos:
+            key = health_key(repo_id(r))
+            if health.allow(key):
+                to_fetch.append(r)
+                continue
+            name = r if isinstance(r, str) else r.get('name', repo_id(r))
+            results.append({'repo': repo_id(r), 'name': name, 'success': False,
+                            'skipped': True, 'error': health.skip_reason(key)})
+        repos = to_fetch
+
+    if graphql:
+        fetched = iter_repos_graphql(repos, search_query, days, token, concurrency, health)
+    else:
+        fetched = iter_repos_rest(repos, search_query, days, token, concurrency, max_pages, health)
+    for result, posts in fetched:
+        results.append(result)
+        if health and not result.get('rate_limited'):
+            health.record_result(health_key(result['repo']), result)
+        if index:
+            index.ingest(posts, 'github')
+        if on_posts:
+            on_posts(posts)
+        else:
+            merger.add(posts)
 
-    return {
+    all_posts = merger.merged()
+    output = {
         'fetched_at': datetime.now(timezone.utc).isoformat(),
         'mode': 'search' if search_query else 'digest',
         'search_query': search_query,
         'days': days if not search_query else None,
         'repo_results': results,
+        'rate_limit': rate_limiter.snapshot(),
         'total_posts': len(all_posts),
         'posts': all_posts,
     }
+    if limit:
+        output['limit_applied'] = limit
+        output['total_before_limit'] = merger.count
+    return output
 
 
 def main():
@@ -179,7 +643,36 @@ def main():
     parser.add_argument('--search', help='Search query (optional)')
     parser.add_argument('--days', type=int, default=7, help='Days to look back (default: 7)')
     parser.add_argument('--token', help='GitHub token (or use GITHUB_TOKEN env)')
+    parser.add_argument('--concurrency', type=int, default=8,
+                        help='Repos fetched in parallel (default: 8)')
+    parser.add_argument('--max-wait', type=int, default=600,
+                        help='Longest pause in seconds for rate-limit budget before giving up (default: 600)')
+    parser.add_argument('--no-breaker', action='store_true',
+                        help='Also fetch repos whose circuit breaker is open after repeated failures')
+    parser.add_argument('--max-pages', type=int, default=MAX_PAGES,
+                        help=f'Max REST pages (100 issues each) per repo (default: {MAX_PAGES})')
+    parser.add_argument('--graphql', action='store_true',
+                        help='Batch repos into GraphQL queries (requires a token)')
+    parser.add_argument('--incremental', action='store_true',
+                        help='Only emit issues not seen in earlier runs, and remember them')
+    parser.add_argument('--limit', type=int,
+                        help='Only output the newest N issues across all repos')
+    parser.add_argument('--no-index', action='store_true',
+                        help='Do not add fetched issues to the local search index')
+    parser.add_argument('--min-prescore', type=float,
+                        help='Score issues by references/scoring.md (prescore.py) and only output '
+                             'those scoring at least this, e.g. 4')
+    parser.add_argument('--top-k', type=int,
+                        help='Only output the K best-scoring issues, best first')
+    parser.add_argument('--lexicon',
+                        help='JSON {dimension: {term: score}} merged over the prescore lexicon')
+    parser.add_argument('--format', choices=['json', 'ndjson'], default='json',
+                        help='json: one document at the end; ndjson: stream issues as repos complete')
+    parser.add_argument('--trace', metavar='OUT_JSON',
+                        help='Write a Chrome trace (chrome://tracing, Perfetto) of the run to this file')
     args = parser.parse_args()
+    if args.trace:
+        tracing.start_trace()
 
     # Parse repos
     repos = [r.strip() for r in args.repos.split(',') if r.strip()]
@@ -191,8 +684,88 @@ def main():
         print(json.dumps({'error': 'No repos provided'}), file=sys.stderr)
         sys.exit(1)
 
-    result = fetch_all_repos(repos, args.search, args.days, token)
-    print(json.dumps(result, ensure_ascii=False, indent=2))
+    if args.graphql and not token:
+        print(json.dumps({'error': 'GraphQL mode requires --token or GITHUB_TOKEN'}), file=sys.stderr)
+        sys.exit(1)
+
+    rate_limiter.max_wait = args.max_wait
+    prescoring = args.min_prescore is not None or args.top_k
+    lexicon = load_lexicon(args.lexicon) if prescoring else None
+
+    if args.format == 'ndjson':
+        writer = NdjsonWriter()
+        seen_store = SeenStore() if args.incremental else None
+        already_seen = 0
+        # The top N across all repos are only known once every repo is in.
+        limited = Merger(key=issue_sort_key, limit=args.limit) if args.limit else None
+        prescorer = PreScorer(lexicon, time.time()) if prescoring else None
+        best = Merger(key=by_prescore, limit=args.top_k) if args.top_k else None
+        prescored = 0
+
+        def write(posts):
+            writer.write_many('post', posts)
+            if seen_store:
+                seen_store.mark(posts)
+
+        def emit(posts):
+            nonlocal already_seen, prescored
+            if seen_store:
+                # Marked as seen when written, so pruned posts can come up again.
+                new_posts = seen_store.unseen(posts)
+                already_seen += len(posts) - len(new_posts)
+                posts = new_posts
+            if prescorer:
+                prescored += len(posts)
+                posts = prescorer.prune(posts, args.min_prescore)
+            (best.add if best else write)(posts)
+
+        def on_posts(posts):
+            (limited.add if limited else emit)(posts)
+    else:
+        on_posts = None
+
+    # Every fetched post is indexed as it arrives, before --limit.
+    index = None if args.no_index else LocalIndex()
+    health = HealthStore(breaker=not args.no_breaker)
+    with tracing.span('fetch'):
+        result = fetch_all_repos(repos, args.search, args.days, token, args.concurrency,
+                                 args.max_pages, args.graphql, on_posts, args.limit, health,
+                                 index)
+    health.save()
+    if index:
+        index.close()
+
+    if args.format == 'ndjson':
+        if limited:
+            emit(limited.merged())
+            result['limit_applied'] = args.limit
+            result['total_before_limit'] = limited.count
+        if best:
+            write(best.merged())
+        if prescorer:
+            result['prescore'] = {'min': args.min_prescore, 'top_k': args.top_k,
+                                  'kept': writer.count, 'dropped': prescored - writer.count}
+        result['total_posts'] = writer.count
+        if seen_store:
+            seen_store.close()
+            result['incremental'] = {'new': writer.count, 'already_seen': already_seen}
+        writer.summary(result)
+        tracing.save_trace(args.trace)
+        return
+
+    def prescore(result):
+        with tracing.span('prescore'):
+            apply_prescore(result, args.min_prescore, args.top_k, lexicon)
+
+    if args.incremental:
+        # Only posts that survive the pre-scorer are recorded as seen.
+        with tracing.span('incremental'):
+            apply_incremental(result, prune=prescore if prescoring else None)
+    elif prescoring:
+        prescore(result)
+    with tracing.span('output'):
+        print(json.dumps(result, ensure_ascii=False, indent=2, default=to_json))
+    tracing.save_trace(args.trace)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,52 @@
+"""
+Reciprocal rank fusion for deep_search.py results.
+
+Sources score on incomparable scales (Tavily relevance in 0-1, HN points in
+the hundreds, Elasticsearch _score from SOV2EX), so raw scores are not
+compared at all. Each result only contributes its rank within its own
+source:
+
+    fused_score = sum over sources listing it of  weight(source) / (RRF_K + rank)
+
+A result that several sources returned (folded together by dedup, the
+others kept as `alternates`) collects a contribution from each of them.
+"""
+
+import heapq
+
+# Standard RRF damping constant: flattens the gap between the top ranks.
+RRF_K = 60
+
+
+def assign_ranks(items):
+    """Record each item's 1-based position in its source's own ordering."""
+    for rank, item in enumerate(items, 1):
+        item['rank'] = rank
+    return items
+
+
+def fuse(results, weight_of, k=RRF_K, top_k=None):
+    """
+    Set fused_score on every result and return them best-first.
+
+    weight_of maps a `source` value to its weight. All contributions are
+    laid out as flat parallel lists and summed in one pass, so the cost is
+    linear in results + alternates.
+    """
+    owners, sources, ranks = [], [], []
+    for i, result in enumerate(results):
+        for entry in (result, *result.get('alternates', ())):
+            owners.append(i)
+            sources.append(entry.get('source'))
+            ranks.append(entry.get('rank') or 1)
+
+    weights = {source: weight_of(source) for source in set(sources)}
+    fused = [0.0] * len(results)
+    for owner, source, rank in zip(owners, sources, ranks):
+        fused[owner] += weights[source] / (k + rank)
+
+    for result, score in zip(results, fused):
+        result['fused_score'] = round(score, 6)
+    if top_k:
+        return heapq.nlargest(top_k, results, key=lambda r: r['fused_score'])
+    return sorted(results, key=lambda r: r['fused_score'], reverse=True)
@@ -0,0 +1,151 @@
+"""
+Per-source health records: circuit breaker and adaptive timeouts.
+
+Every feed, GitHub repo and search source has a record of its consecutive
+failures, last success / failure and smoothed latency. After
+FAILURE_THRESHOLD consecutive failures its circuit opens and the source is
+skipped until a backoff has passed (BASE_BACKOFF, doubled for every further
+failure, at most MAX_BACKOFF). The next run then probes it once with a short
+timeout: a success closes the circuit, a failure reopens it for longer.
+
+Timeouts follow each source's own latency the way TCP's retransmission
+timeout does: smoothed latency plus four mean deviations, kept between
+MIN_TIMEOUT and the caller's timeout. Only successful fetches feed the
+average, so timeouts cannot inflate it.
+
+Keys are '<kind>:<id>' ('feed:<url>', 'github:<owner/repo>',
+'search:<adapter>|<site>'). Each run rewrites only the records it touched,
+so the scripts can share the file.
+
+Location: <cache dir>/health.json
+"""
+
+import os
+import json
+import time
+import threading
+from datetime import datetime, timezone
+
+from feed_cache import CACHE_DIR, write_json_atomic
+
+FAILURE_THRESHOLD = 3
+BASE_BACKOFF = 3600
+MAX_BACKOFF = 2 * 86400
+# Timeout of the single request that probes a source whose backoff is over.
+PROBE_TIMEOUT = 10
+MIN_TIMEOUT = 5
+# Smoothing gains for latency and its deviation (RFC 6298).
+ALPHA = 1 / 8
+BETA = 1 / 4
+# Successful samples needed before the timeout adapts.
+MIN_SAMPLES = 3
+# Records untouched for this long are dropped.
+RETENTION_DAYS = 90
+
+
+def format_time(ts):
+    return datetime.fromtimestamp(ts, timezone.utc).strftime('%Y-%m-%dT%H:%M:%SZ')
+
+
+class HealthStore:
+    """
+    Health records keyed by source. With breaker=False open circuits are
+    not enforced (everything is fetched) but outcomes are still recorded.
+    record() and save() may be called from several threads.
+    """
+
+    def __init__(self, path=None, breaker=True):
+        self.path = path or os.path.join(CACHE_DIR, 'health.json')
+        self.breaker = breaker
+        self.records = self._load()
+        self._touched = set()
+        self._lock = threading.Lock()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def state(self, key, now=None):
+        """'closed', 'open' (skip it) or 'half-open' (probe it)."""
+        record = self.records.get(key)
+        if not record or record['failures'] < FAILURE_THRESHOLD:
+            return 'closed'
+        if (now or time.time()) < record.get('retry_at', 0):
+            return 'open'
+        return 'half-open'
+
+    def allow(self, key):
+        return not self.breaker or self.state(key) != 'open'
+
+    def skip_reason(self, key):
+        record = self.records[key]
+        return (f"circuit open after {record['failures']} consecutive failures "
+                f"(last: {record.get('last_error') or 'unknown'}); "
+                f"next probe after {format_time(record['retry_at'])}")
+
+    def timeout_for(self, key, cap):
+        """
+        Timeout in seconds for the next request to key, at most cap. Callers
+        pass it to transport as the deadline of the whole request, connect
+        included, so a probe gives up within PROBE_TIMEOUT.
+        """
+        record = self.records.get(key) or {}
+        timeout = cap
+        if record.get('samples', 0) >= MIN_SAMPLES:
+            adaptive = record['latency'] + 4 * record['deviation']
+            timeout = min(cap, max(MIN_TIMEOUT, adaptive))
+        if self.state(key) == 'half-open':
+            timeout = min(timeout, PROBE_TIMEOUT)
+        return timeout
+
+    def record(self, key, success, seconds=None, error=None):
+        """Record one fetch outcome; seconds is its latency."""
+        with self._lock:
+            now = time.time()
+            record = self.records.setdefault(key, {'failures': 0, 'samples': 0})
+            record['updated'] = now
+            if success:
+                record['failures'] = 0
+                record['last_success'] = now
+                record.pop('retry_at', None)
+                if seconds is not None:
+                    if record['samples']:
+                        error_s = seconds - record['latency']
+                        record['latency'] += ALPHA * error_s
+                        record['deviation'] += BETA * (abs(error_s) - record['deviation'])
+                    else:
+                        record['latency'] = seconds
+                        record['deviation'] = seconds / 2
+                    record['latency'] = round(record['latency'], 4)
+                    record['deviation'] = round(record['deviation'], 4)
+                    record['samples'] += 1
+            else:
+                record['failures'] += 1
+                record['last_failure'] = now
+                record['last_error'] = str(error or 'failed')[:200]
+                if record['failures'] >= FAILURE_THRESHOLD:
+                    backoff = BASE_BACKOFF * 2 ** (record['failures'] - FAILURE_THRESHOLD)
+                    record['retry_at'] = now + min(MAX_BACKOFF, backoff)
+            self._touched.add(key)
+
+    def record_result(self, key, result):
+        """record() from a result entry carrying success, error and timings."""
+        total_ms = (result.get('timings') or {}).get('total_ms')
+        self.record(key, result.get('success'),
+                    total_ms / 1000 if total_ms is not None else None, result.get('error'))
+
+    def save(self):
+        """Write the touched records over the current file contents."""
+        with self._lock:
+            if not self._touched:
+                return
+            records = self._load()
+            for key in self._touched:
+                records[key] = self.records[key]
+            cutoff = time.time() - RETENTION_DAYS * 86400
+            records = {k: v for k, v in records.items() if v.get('updated', 0) >= cutoff}
+            write_json_atomic(self.path, records)
+            self._touched.clear()
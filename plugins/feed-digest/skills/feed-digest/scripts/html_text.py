@@ -0,0 +1,66 @@
+"""
+HTML to plain text with a character budget.
+
+Posts keep only the first few hundred characters of a description, while
+full-content feeds can carry megabytes of HTML per entry. strip_html() with
+a limit walks the markup lazily and stops as soon as the budget is filled,
+instead of rewriting and unescaping the whole document only to slice it.
+"""
+
+import re
+from html import unescape
+
+TAG = re.compile(r'<[^>]+>')
+# Text runs are unescaped in slices of this many characters.
+TEXT_SLICE = 4096
+# Longest entity name looked for at a slice boundary.
+MAX_ENTITY = 32
+
+
+def _unescaped_slices(html_text, start, end):
+    while start < end:
+        stop = min(end, start + TEXT_SLICE)
+        if stop < end:
+            # Do not cut an entity in two.
+            amp = html_text.rfind('&', max(start + 1, stop - MAX_ENTITY), stop)
+            if amp != -1 and ';' not in html_text[amp:stop]:
+                stop = amp
+        yield unescape(html_text[start:stop])
+        start = stop
+
+
+def text_pieces(html_text):
+    """Unescaped text between tags, in document order, produced lazily."""
+    position = 0
+    for match in TAG.finditer(html_text):
+        yield from _unescaped_slices(html_text, position, match.start())
+        position = match.end()
+    yield from _unescaped_slices(html_text, position, len(html_text))
+
+
+def strip_html(html_text, limit=None):
+    """
+    Remove HTML tags and decode entities. With a limit the result equals
+    strip_html(html_text)[:limit], but the markup past it is never touched.
+    """
+    if not html_text:
+        return ""
+    if limit is None:
+        return unescape(TAG.sub('', html_text)).strip()
+
+    pieces = []
+    size = 0
+    for piece in text_pieces(html_text):
+        if not pieces:
+            piece = piece.lstrip()
+            if not piece:
+                continue
+        pieces.append(piece)
+        size += len(piece)
+        if size > limit:
+            text = ''.join(pieces)
+            # Only trailing whitespace past the limit would still be stripped.
+            if len(text.rstrip()) > limit:
+                return text[:limit]
+            pieces = [text]
+    return ''.join(pieces).rstrip()
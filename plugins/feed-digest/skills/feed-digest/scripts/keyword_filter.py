@@ -0,0 +1,126 @@
+"""
+Compiled keyword filter for fetch_feeds.py --filter.
+
+Filter syntax: comma-separated terms, matched case-insensitively against a
+post's title and description.
+
+    AI,Claude        plain terms: at least one must appear (if any are given)
+    +python          required: must appear
+    -crypto          excluded: must not appear
+
+All terms are merged into one trie and compiled into a single regular
+expression, so each post is scanned once, in C, however many terms the list
+has; matches are only inspected in Python (boundaries, term bookkeeping).
+With word_boundary=True a term only matches as a whole word: "ai" matches
+"AI model" but not "said". Boundaries are only enforced between ASCII
+letters/digits (a term's edge and its neighbour), since CJK text has no
+spaces between words: "ai" also matches "用AI工具".
+"""
+
+import re
+
+
+def parse_terms(spec):
+    """Split a --filter / --filter-file value into lowercased terms."""
+    terms = []
+    for line in spec.splitlines():
+        if line.lstrip().startswith('#'):
+            continue
+        terms.extend(t.strip().lower() for t in line.split(','))
+    return [t for t in terms if t.strip('+-')]
+
+
+def _trie_regex(node):
+    """Regex source for a trie node; longer terms are preferred (greedy)."""
+    branches = [re.escape(ch) + _trie_regex(child) for ch, child in sorted(node.items()) if ch]
+    if not branches:
+        return ''
+    body = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+    if '' in node:
+        return '(?:' + body + ')?'
+    return body
+
+
+def _is_word_char(ch):
+    return ch.isalnum() or ch == '_'
+
+
+def _needs_boundary(ch):
+    return ch.isascii() and _is_word_char(ch)
+
+
+class KeywordFilter:
+    """A compiled include / require / exclude term list."""
+
+    def __init__(self, terms, word_boundary=False):
+        self.terms = list(terms)
+        self.word_boundary = word_boundary
+        self.any_of, self.required, self.excluded = set(), set(), set()
+        for term in self.terms:
+            if term.startswith('+'):
+                self.required.add(term[1:])
+            elif term.startswith('-'):
+                self.excluded.add(term[1:])
+            else:
+                self.any_of.add(term)
+
+        words = self.any_of | self.required | self.excluded
+        trie = {}
+        for word in words:
+            node = trie
+            for ch in word:
+                node = node.setdefault(ch, {})
+            node[''] = True
+        # Zero-width lookahead so overlapping terms at every offset are seen.
+        self._pattern = re.compile('(?=(' + _trie_regex(trie) + '))') if words else None
+        # A match is the longest term at its offset; shorter terms that are
+        # its prefixes matched there too.
+        self._prefixes = {
+            word: [word[:k] for k in range(1, len(word) + 1) if word[:k] in words]
+            for word in words
+        }
+
+    @property
+    def cache_key(self):
+        """Stable description of the filter, stored with cached posts."""
+        key = ','.join(sorted(self.terms))
+        return key + ('|word' if self.word_boundary else '')
+
+    def _iter_found(self, text):
+        if self._pattern is None or not text:
+            return
+        text = text.lower()
+        check = self.word_boundary
+        for match in self._pattern.finditer(text):
+            start = match.start()
+            for word in self._prefixes[match.group(1)]:
+                if check:
+                    end = start + len(word)
+                    if _needs_boundary(word[0]) and start > 0 and _needs_boundary(text[start - 1]):
+                        continue
+                    if _needs_boundary(word[-1]) and end < len(text) and _needs_boundary(text[end]):
+                        continue
+                yield word
+
+    def found(self, text):
+        """Set of terms (without +/-) that occur in text."""
+        return set(self._iter_found(text))
+
+    def matches(self, *texts):
+        """Whether a post with these text fields passes the filter."""
+        missing = set(self.required)
+        need_any = bool(self.any_of)
+        # Stop scanning as soon as the outcome can no longer change.
+        for word in self._iter_found('\n'.join(t for t in texts if t)):
+            if word in self.excluded:
+                return False
+            missing.discard(word)
+            if word in self.any_of:
+                need_any = False
+            if not (missing or need_any or self.excluded):
+                return True
+        return not (missing or need_any)
+
+    def filter_posts(self, posts, fields=('title', 'description')):
+        """Posts (dicts) that pass the filter."""
+        return [p for p in posts if self.matches(*(p.get(f) for f in fields))]
@@ -0,0 +1,60 @@
+"""
+Rolling latency history per search source, for hedged requests.
+
+The last HISTORY_SIZE response times of each source are kept in a small JSON
+file; deep_search.py --hedge sends a duplicate request when a source has
+been running longer than its historical p95.
+
+Location: <cache dir>/latency.json
+"""
+
+import os
+import json
+import threading
+
+from feed_cache import CACHE_DIR, write_json_atomic
+
+HISTORY_SIZE = 50
+# Fewer samples than this give no usable p95.
+MIN_SAMPLES = 5
+
+
+def percentile(samples, fraction):
+    """Nearest-rank percentile of a non-empty list."""
+    ordered = sorted(samples)
+    index = min(len(ordered) - 1, max(0, round(fraction * len(ordered)) - 1))
+    return ordered[index]
+
+
+class LatencyHistory:
+    """Response times in seconds, keyed by source. Safe to share between threads."""
+
+    def __init__(self, path=None):
+        self.path = path or os.path.join(CACHE_DIR, 'latency.json')
+        try:
+            with open(self.path) as f:
+                self.samples = json.load(f)
+        except (OSError, ValueError):
+            self.samples = {}
+        self._dirty = False
+        self._lock = threading.Lock()
+
+    def record(self, key, seconds):
+        with self._lock:
+            history = self.samples.setdefault(key, [])
+            history.append(round(seconds, 3))
+            del history[:-HISTORY_SIZE]
+            self._dirty = True
+
+    def p95(self, key):
+        """The source's 95th percentile latency, or None without enough history."""
+        history = self.samples.get(key)
+        if not history or len(history) < MIN_SAMPLES:
+            return None
+        return percentile(history, 0.95)
+
+    def save(self):
+        with self._lock:
+            if self._dirty:
+                write_json_atomic(self.path, self.samples)
+                self._dirty = False
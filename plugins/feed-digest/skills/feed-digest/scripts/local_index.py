@@ -0,0 +1,174 @@
+"""
+Local full-text index of every post fetch_feeds.py / fetch_github_issues.py
+have produced, searchable offline (deep_search.py's `local` adapter).
+
+Posts live in an SQLite table keyed by their normalized link (see
+seen_store.post_key) with an FTS5 index over title, description and source,
+kept in sync by triggers. Re-ingesting an unchanged post is a no-op, so
+feeding every run's output back in costs little and the index grows
+incrementally.
+
+The trigram tokenizer (SQLite 3.34+) gives substring matching that works
+for CJK text as well as English; older SQLite falls back to unicode61.
+Trigram matching needs terms of at least three characters, so shorter terms
+only narrow the results of longer ones.
+
+Location: <cache dir>/index.db
+"""
+
+import os
+import re
+import sqlite3
+
+from dedup import STOPWORDS
+from feed_cache import CACHE_DIR
+from seen_store import post_key
+
+DEFAULT_PATH = os.path.join(CACHE_DIR, 'index.db')
+# Descriptions are stored truncated, like the posts themselves.
+DESCRIPTION_LIMIT = 800
+
+SCHEMA = '''
+CREATE TABLE IF NOT EXISTS posts (
+    id INTEGER PRIMARY KEY,
+    key TEXT UNIQUE NOT NULL,
+    kind TEXT,
+    title TEXT,
+    description TEXT,
+    link TEXT,
+    source TEXT,
+    source_url TEXT,
+    pub_date TEXT,
+    timestamp REAL
+);
+CREATE INDEX IF NOT EXISTS posts_timestamp ON posts (timestamp);
+CREATE TRIGGER IF NOT EXISTS posts_ai AFTER INSERT ON posts BEGIN
+    INSERT INTO posts_fts (rowid, title, description, source)
+    VALUES (new.id, new.title, new.description, new.source);
+END;
+CREATE TRIGGER IF NOT EXISTS posts_ad AFTER DELETE ON posts BEGIN
+    INSERT INTO posts_fts (posts_fts, rowid, title, description, source)
+    VALUES ('delete', old.id, old.title, old.description, old.source);
+END;
+CREATE TRIGGER IF NOT EXISTS posts_au AFTER UPDATE ON posts BEGIN
+    INSERT INTO posts_fts (posts_fts, rowid, title, description, source)
+    VALUES ('delete', old.id, old.title, old.description, old.source);
+    INSERT INTO posts_fts (rowid, title, description, source)
+    VALUES (new.id, new.title, new.description, new.source);
+END;
+'''
+
+UPSERT = '''
+INSERT INTO posts (key, kind, title, description, link, source, source_url, pub_date, timestamp)
+VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+ON CONFLICT (key) DO UPDATE SET
+    title = excluded.title, description = excluded.description, link = excluded.link,
+    source = excluded.source, source_url = excluded.source_url,
+    pub_date = excluded.pub_date, timestamp = excluded.timestamp
+WHERE title IS NOT excluded.title OR description IS NOT excluded.description
+    OR pub_date IS NOT excluded.pub_date
+'''
+
+
+def has_trigram():
+    conn = sqlite3.connect(':memory:')
+    try:
+        conn.execute("CREATE VIRTUAL TABLE t USING fts5(x, tokenize='trigram')")
+        return True
+    except sqlite3.OperationalError:
+        return False
+    finally:
+        conn.close()
+
+
+def query_terms(query):
+    """Lowercased search terms of a free-text query, minus stopwords."""
+    return [t for t in re.findall(r'\w+', query.lower()) if t not in STOPWORDS]
+
+
+def fts_quote(term):
+    return '"' + term.replace('"', '""') + '"'
+
+
+class LocalIndex:
+    """The post index. Use as a context manager."""
+
+    def __init__(self, path=None):
+        path = path or DEFAULT_PATH
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        tokenizer = 'trigram' if has_trigram() else 'unicode61'
+        self.conn.execute(
+            'CREATE VIRTUAL TABLE IF NOT EXISTS posts_fts USING fts5('
+            f"title, description, source, content='posts', content_rowid='id', tokenize='{tokenizer}'"
+            ')'
+        )
+        self.conn.executescript(SCHEMA)
+        self.trigram = 'trigram' in self.conn.execute(
+            "SELECT sql FROM sqlite_master WHERE name = 'posts_fts'"
+        ).fetchone()[0]
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def ingest(self, posts, kind='feed'):
+        """Add or refresh posts; unchanged ones are left alone."""
+        rows = [
+            (
+                post_key(p), kind, p.get('title', ''),
+                (p.get('description') or '')[:DESCRIPTION_LIMIT],
+                p.get('link', ''), p.get('source', ''), p.get('source_url', ''),
+                p.get('pub_date', ''), p.get('timestamp'),
+            )
+            for p in posts
+        ]
+        with self.conn:
+            self.conn.executemany(UPSERT, rows)
+        return len(rows)
+
+    def count(self):
+        return self.conn.execute('SELECT COUNT(*) FROM posts').fetchone()[0]
+
+    def search(self, query, limit=20):
+        """
+        Posts matching any query term, best bm25 match first.
+
+        Returns dicts with title, link, description, source, source_url,
+        pub_date, timestamp, kind and score (higher is better).
+        """
+        terms = query_terms(query)
+        min_len = 3 if self.trigram else 1
+        long_terms = [t for t in terms if len(t) >= min_len]
+        short_terms = [t for t in terms if len(t) < min_len]
+        columns = ('p.title, p.link, p.description, p.source, p.source_url, '
+                   'p.pub_date, p.timestamp, p.kind')
+
+        if long_terms:
+            sql = (f'SELECT {columns}, -bm25(posts_fts, 4.0, 1.0, 0.5) AS score '
+                   'FROM posts_fts JOIN posts p ON p.id = posts_fts.rowid '
+                   'WHERE posts_fts MATCH ?')
+            params = [' OR '.join(fts_quote(t) for t in long_terms)]
+            order = 'score DESC'
+        elif short_terms:
+            # Nothing the tokenizer can look up: scan, newest first.
+            sql = f'SELECT {columns}, 0.0 AS score FROM posts p WHERE 1'
+            params = []
+            order = 'p.timestamp DESC'
+        else:
+            return []
+        for term in short_terms:
+            sql += ' AND (p.title LIKE ? OR p.description LIKE ?)'
+            params += [f'%{term}%'] * 2
+        sql += f' ORDER BY {order} LIMIT ?'
+        params.append(limit)
+
+        keys = ('title', 'link', 'description', 'source', 'source_url',
+                'pub_date', 'timestamp', 'kind', 'score')
+        return [dict(zip(keys, row)) for row in self.conn.execute(sql, params)]
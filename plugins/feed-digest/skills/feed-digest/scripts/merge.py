@@ -0,0 +1,63 @@
+"""
+Merging per-source result streams into one ranked list.
+
+Each source's items are sorted on their own (sources already arrive close to
+newest-first, so this is cheap) and the streams are combined with a k-way
+heap merge instead of concatenating everything and sorting it again.
+
+With a limit, only the best `limit` items are kept, in a bounded heap, so
+memory is O(limit) however many items the sources return; a sorted stream
+is abandoned as soon as its next item cannot beat the current cut-off.
+"""
+
+import heapq
+
+from dates import post_timestamp
+
+
+def by_timestamp(post):
+    """Sort key: newest first (posts without a date last)."""
+    return post_timestamp(post) or 0
+
+
+class Merger:
+    """Collects sorted streams with add(), then returns the merged ranking."""
+
+    def __init__(self, key=by_timestamp, limit=None):
+        self.key = key
+        self.limit = limit
+        self.count = 0
+        self._streams = []
+        # Bounded min-heap of (key, -seq, item): the root is the worst kept
+        # item, and among equal keys the one that arrived last.
+        self._heap = []
+        self._seq = 0
+
+    def add(self, items):
+        """Add one source's items (any order)."""
+        self.count += len(items)
+        stream = sorted(items, key=self.key, reverse=True)
+        if not self.limit:
+            if stream:
+                self._streams.append(stream)
+            return
+        heap = self._heap
+        for item in stream:
+            key = self.key(item)
+            self._seq += 1
+            if len(heap) < self.limit:
+                heapq.heappush(heap, (key, -self._seq, item))
+            elif key > heap[0][0]:
+                heapq.heapreplace(heap, (key, -self._seq, item))
+            else:
+                # The rest of this stream ranks lower still.
+                break
+
+    def __iter__(self):
+        """Items best-first."""
+        if self.limit:
+            return (item for _, _, item in sorted(self._heap, reverse=True))
+        return heapq.merge(*self._streams, key=self.key, reverse=True)
+
+    def merged(self):
+        return list(self)
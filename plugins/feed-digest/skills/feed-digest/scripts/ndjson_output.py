@@ -0,0 +1,47 @@
+"""
+NDJSON streaming output shared by the fetch scripts (--format ndjson).
+
+Instead of one indented document printed after the slowest source finishes,
+every post/result is written as a compact JSON line as soon as its source
+completes, followed by a single trailer line with the per-source stats:
+
+    {"record": "post", "title": "...", ...}
+    {"record": "post", "title": "...", ...}
+    {"record": "summary", "feed_results": [...], "total_posts": 2, ...}
+
+Records stream in completion order, not sorted.
+"""
+
+import sys
+import json
+import threading
+
+
+class NdjsonWriter:
+    """Thread-safe writer of one JSON object per line, flushed per batch."""
+
+    def __init__(self, stream=None):
+        self.stream = stream or sys.stdout
+        self.count = 0
+        self._lock = threading.Lock()
+
+    def _line(self, record_type, record):
+        return json.dumps({'record': record_type, **record}, ensure_ascii=False,
+                          separators=(',', ':'), default=str) + '\n'
+
+    def write_many(self, record_type, records):
+        """Write a batch of records of one type and flush."""
+        lines = ''.join(self._line(record_type, r) for r in records)
+        with self._lock:
+            self.stream.write(lines)
+            self.stream.flush()
+            if record_type != 'summary':
+                self.count += len(records)
+
+    def write(self, record_type, record):
+        self.write_many(record_type, [record])
+
+    def summary(self, result, drop=('posts',)):
+        """Write the trailer: the normal JSON result minus the streamed lists."""
+        trailer = {k: v for k, v in result.items() if k not in drop}
+        self.write('summary', trailer)
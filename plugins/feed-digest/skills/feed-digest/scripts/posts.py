@@ -0,0 +1,134 @@
+"""
+Compact post records shared by fetch_feeds.py and fetch_github_issues.py.
+
+A post used to be a dict with 9-12 string keys; with tens of thousands of
+them in memory (a large digest, the daemon's journal) the per-dict overhead
+dominates. Post keeps the standard fields in __slots__ and anything else
+(GitHub's reactions/comments, dedup's alternates) in a small `extra` dict
+created only when needed. The strings that repeat across posts (source,
+source_url, creator) are interned, so posts from one feed share one copy,
+and empty category lists share one empty tuple.
+
+Post implements the mapping interface (post['title'], post.get(...),
+{**post}, `in`), so code written against dicts keeps working; JSON output
+goes through to_json (json.dumps(..., default=to_json)).
+"""
+
+import sys
+from collections.abc import MutableMapping
+
+from dates import post_timestamp
+
+FIELDS = ('title', 'link', 'description', 'pub_date', 'timestamp', 'categories', 'creator',
+          'source', 'source_url')
+_FIELD_SET = frozenset(FIELDS)
+# Few distinct values, repeated across many posts.
+INTERNED = ('creator', 'source', 'source_url')
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+class Post(MutableMapping):
+    """A post: the standard fields as slots plus optional extra keys."""
+
+    __slots__ = FIELDS + ('extra',)
+
+    def __init__(self, title='', link='', description='', pub_date='', timestamp=None,
+                 categories=(), creator='', source='', source_url='', extra=None):
+        self.title = title
+        self.link = link
+        self.description = description
+        self.pub_date = pub_date
+        self.timestamp = timestamp
+        self.categories = tuple(categories) if categories else ()
+        self.creator = _intern(creator)
+        self.source = _intern(source)
+        self.source_url = _intern(source_url)
+        self.extra = extra or None
+
+    @classmethod
+    def from_dict(cls, data):
+        """Post from a dict (a cached or older record); unknown keys go to extra."""
+        if isinstance(data, Post):
+            return data
+        extra = {k: v for k, v in data.items() if k not in _FIELD_SET}
+        return cls(data.get('title', ''), data.get('link', ''), data.get('description', ''),
+                   data.get('pub_date', ''), post_timestamp(data), data.get('categories'),
+                   data.get('creator', ''), data.get('source', ''), data.get('source_url', ''),
+                   extra)
+
+    def to_dict(self):
+        data = {
+            'title': self.title,
+            'link': self.link,
+            'description': self.description,
+            'pub_date': self.pub_date,
+            'timestamp': self.timestamp,
+            'categories': list(self.categories),
+            'creator': self.creator,
+            'source': self.source,
+            'source_url': self.source_url,
+        }
+        if self.extra:
+            data.update(self.extra)
+        return data
+
+    def copy(self):
+        return Post(self.title, self.link, self.description, self.pub_date, self.timestamp,
+                    self.categories, self.creator, self.source, self.source_url,
+                    dict(self.extra) if self.extra else None)
+
+    # Mapping interface; get() and __contains__ are on the hot paths.
+
+    def __getitem__(self, key):
+        if key in _FIELD_SET:
+            return getattr(self, key)
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def get(self, key, default=None):
+        if key in _FIELD_SET:
+            return getattr(self, key)
+        if self.extra:
+            return self.extra.get(key, default)
+        return default
+
+    def __setitem__(self, key, value):
+        if key in _FIELD_SET:
+            setattr(self, key, _intern(value) if key in INTERNED else value)
+        elif self.extra is None:
+            self.extra = {key: value}
+        else:
+            self.extra[key] = value
+
+    def __delitem__(self, key):
+        if key in _FIELD_SET or not self.extra or key not in self.extra:
+            raise KeyError(key)
+        del self.extra[key]
+
+    def __contains__(self, key):
+        return key in _FIELD_SET or bool(self.extra and key in self.extra)
+
+    def __iter__(self):
+        yield from FIELDS
+        if self.extra:
+            yield from self.extra
+
+    def __len__(self):
+        return len(FIELDS) + (len(self.extra) if self.extra else 0)
+
+    def keys(self):
+        return FIELDS + tuple(self.extra) if self.extra else FIELDS
+
+    def __repr__(self):
+        return f'Post({self.to_dict()!r})'
+
+
+def to_json(value):
+    """json.dumps default= hook for Post values."""
+    if isinstance(value, Post):
+        return value.to_dict()
+    raise TypeError(f'Object of type {type(value).__name__} is not JSON serializable')
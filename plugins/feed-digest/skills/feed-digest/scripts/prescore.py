@@ -0,0 +1,321 @@
+#!/usr/bin/env python3
+"""
+Deterministic pre-scorer for references/scoring.md.
+
+Scores every post on the four dimensions of scoring.md (1-10 each) from
+what is in the post itself, and combines them with the same weights:
+
+    prescore = value*0.4 + timeliness*0.3 + relevance*0.2 + readability*0.1
+
+    value        lexicon (release/tutorial/analysis vs ads/spam), engagement
+                 (GitHub reactions + comments, Hacker News points + comments,
+                 on a log scale), whether there is a description at all
+    timeliness   age at the time of the fetch: about 8 when just published,
+                 7 at a day, 5 at a week, 3 at a month, 1 after three months;
+                 "breaking" lexicon terms raise posts of the last 3 days
+    relevance    best lexicon match (AI/dev 9-10, tech 7-8, life 3-4), 5 if
+                 none matches
+    readability  title length and clickbait heuristics, description length
+
+It is a cheap first pass so that only likely candidates (score >= 4 under
+scoring.md) are handed to the model for the real scoring; it errs on the
+side of keeping posts. Each post's text is scanned once for the terms of
+all dimensions (see Lexicon), then every dimension is computed column by
+column over the whole batch.
+
+The lexicon is a JSON object {dimension: {term: score}} merged over the
+defaults below, so a file only needs the terms it adds or overrides:
+
+    {"relevance": {"kubernetes": 9, "足球": 3}, "value": {"周报": 7}}
+
+Usage:
+    python prescore.py digest.json --min-prescore 4
+    python fetch_feeds.py feeds.json | python prescore.py --top-k 50
+"""
+
+import sys
+import json
+import math
+import re
+import argparse
+import time
+from array import array
+
+from dates import DateParser, parse_iso, post_timestamp
+from merge import Merger
+from posts import to_json
+
+WEIGHTS = {'value': 0.4, 'timeliness': 0.3, 'relevance': 0.2, 'readability': 0.1}
+DEFAULT_MIN_PRESCORE = 4.0
+
+DEFAULT_LEXICON = {
+    'relevance': {
+        'ai': 10, 'llm': 10, 'gpt': 10, 'claude': 10, 'openai': 10, 'anthropic': 10,
+        '大模型': 10, '人工智能': 10, '机器学习': 10, 'machine learning': 10, 'agent': 9,
+        'python': 9, 'rust': 9, 'golang': 9, 'javascript': 9, 'typescript': 9, 'java': 9,
+        'linux': 9, 'kernel': 9, 'compiler': 9, 'database': 9, 'github': 9, 'api': 9,
+        'programming': 9, 'developer': 9, '编程': 9, '开发': 9, '代码': 9, '数据库': 9,
+        'docker': 9, 'kubernetes': 9, 'devops': 9, 'framework': 9, 'library': 9,
+        'cloud': 8, 'server': 8, 'vps': 8, '服务器': 8, '云': 7, 'security': 8, '安全': 7,
+        'startup': 7, 'tech': 7, '科技': 7, '互联网': 7, 'hardware': 7, '硬件': 7,
+        'cpu': 7, 'gpu': 8, '芯片': 7, 'apple': 7, 'android': 7, 'iphone': 7, '手机': 6,
+        '游戏': 4, '电影': 3, '美食': 3, '旅游': 3, '娱乐': 3, '八卦': 2, '明星': 2,
+    },
+    'value': {
+        'release': 9, 'released': 9, 'launch': 8, '发布': 9, '开源': 9, 'open source': 9,
+        'open-source': 9, 'tutorial': 9, '教程': 9, 'guide': 8, '指南': 8,
+        'deep dive': 9, '深度': 8, 'analysis': 8, '分析': 8, 'benchmark': 8, '评测': 8,
+        'postmortem': 9, '复盘': 8, 'introducing': 8, 'announcing': 8, 'how we': 8,
+        '实践': 8, '经验': 7, 'show hn': 8, '方案': 7, '原创': 8,
+        '求助': 4, '请问': 4, '求推荐': 4, '转载': 4, '转发': 3,
+        '广告': 1, '推广': 2, '抽奖': 2, '优惠码': 2, '优惠': 3, '代购': 2, '出售': 3,
+        '收购': 3, '水贴': 1, '签到': 1, 'giveaway': 2, 'sponsored': 2, 'promo': 2,
+    },
+    'timeliness': {
+        'breaking': 10, '突发': 10, '紧急': 9, 'urgent': 9, '重大更新': 9, '限时': 9,
+        'security advisory': 9, 'cve': 9, '漏洞': 9, 'zero-day': 10, '0day': 10,
+        'outage': 9, '宕机': 9, 'deprecated': 8, '停止服务': 9,
+    },
+    'clickbait': {
+        '震惊': 1, '竟然': 1, '居然': 1, '万万没想到': 1, '不看后悔': 1, '必看': 1,
+        '速看': 1, '太强了': 1, "you won't believe": 1, 'shocking': 1, 'mind-blowing': 1,
+        'this one trick': 1,
+    },
+}
+
+# Age (hours) -> timeliness, interpolated linearly between the points.
+AGE_POINTS = ((0, 8.0), (24, 7.0), (7 * 24, 5.0), (30 * 24, 3.0), (90 * 24, 1.0))
+UNDATED_TIMELINESS = 4.0
+BREAKING_WINDOW = 3 * 86400
+# Engagement adds up to ENGAGEMENT_CAP points: +1.5 at ~10, +3 at ~100.
+ENGAGEMENT_CAP = 3.0
+ENGAGEMENT_SCALE = 1.5
+
+WORD = re.compile(r'[a-z0-9_]+')
+NOT_LATIN_LETTER = re.compile(r'[^A-Za-z]')
+# Latin terms made of words joined by spaces, hyphens or apostrophes.
+LATIN_TERM = re.compile(r"[a-z0-9_]+(?:[ '-][a-z0-9_]+)*")
+
+
+class Lexicon:
+    """
+    The terms of every dimension, matched against a text in one pass.
+
+    A text is split into Latin words once; one-word terms are then a set
+    intersection and multi-word terms ("open source") are confirmed with a
+    regex only when their first word occurs. Latin terms therefore match
+    whole words only ("ai" does not match "said"). Other terms (CJK, or
+    Latin with symbols such as "c++") match as substrings.
+    """
+
+    def __init__(self, lexicon):
+        self.scores = {}
+        for dim, terms in lexicon.items():
+            for term, score in terms.items():
+                self.scores.setdefault(term.lower(), []).append((dim, score))
+        self._words = set()
+        self._phrases = []
+        # Substring terms by first character, so only plausible ones are searched for.
+        self._substrings = {}
+        for term in self.scores:
+            if not LATIN_TERM.fullmatch(term):
+                self._substrings.setdefault(term[0], []).append(term)
+                continue
+            words = WORD.findall(term)
+            if len(words) == 1:
+                self._words.add(term)
+            else:
+                # re.ASCII: \b only sees Latin letters, digits and _ as word characters.
+                pattern = re.compile(r'\b' + r'\W+'.join(words) + r'\b', re.ASCII)
+                self._phrases.append((term, words[0], pattern))
+
+    def scan(self, text):
+        """{dimension: [scores of the distinct terms found in text]}."""
+        text = text.lower()
+        words = set(WORD.findall(text))
+        terms = words & self._words
+        terms.update(term for term, first, pattern in self._phrases
+                     if first in words and pattern.search(text))
+        terms.update(term for first in self._substrings.keys() & set(text)
+                     for term in self._substrings[first] if term in text)
+        found = {}
+        for term in terms:
+            for dim, score in self.scores[term]:
+                found.setdefault(dim, []).append(score)
+        return found
+
+
+def load_lexicon(path=None):
+    """The default lexicon, with the {dimension: {term: score}} file at path merged over it."""
+    lexicon = {dim: dict(terms) for dim, terms in DEFAULT_LEXICON.items()}
+    if path:
+        with open(path) as f:
+            custom = json.load(f)
+        for dim, terms in custom.items():
+            lexicon.setdefault(dim, {}).update(
+                {term.lower(): float(score) for term, score in terms.items()})
+    return lexicon
+
+
+def _interpolate(x, points):
+    if x <= points[0][0]:
+        return points[0][1]
+    for (x0, y0), (x1, y1) in zip(points, points[1:]):
+        if x <= x1:
+            return y0 + (y1 - y0) * (x - x0) / (x1 - x0)
+    return points[-1][1]
+
+
+def _clamp(column):
+    return array('d', (min(10.0, max(1.0, v)) for v in column))
+
+
+def engagement(post):
+    """Reactions, comments and (Hacker News) points of a post."""
+    total = (post.get('reactions') or 0) + (post.get('comments') or 0) + \
+        (post.get('num_comments') or 0)
+    if post.get('source_type') == 'hackernews':
+        total += post.get('score') or 0
+    return total
+
+
+class PreScorer:
+    """Scores batches of posts (fetch_feeds / fetch_github_issues / deep_search items)."""
+
+    def __init__(self, lexicon=None, now=None):
+        self.lexicon = lexicon or load_lexicon()
+        self.now = now
+        self._lexicon = Lexicon(self.lexicon)
+
+    def dimensions(self, posts):
+        """{dimension: array of 1-10 scores}, one entry per post."""
+        now = self.now or time.time()
+        titles = [p.get('title') or '' for p in posts]
+        descriptions = [p.get('description') or p.get('content') or '' for p in posts]
+        scanned = [self._lexicon.scan(f'{t}\n{d}') for t, d in zip(titles, descriptions)]
+
+        def column(dim):
+            return [found.get(dim, ()) for found in scanned]
+
+        # Search results carry published_date in whatever format the engine uses.
+        date_parser = DateParser()
+        timestamps = [post_timestamp(p) if 'timestamp' in p or 'pub_date' in p
+                      else date_parser(p.get('published_date')) for p in posts]
+
+        value = array('d')
+        for hits, post, description in zip(column('value'), posts,
+                                           descriptions):
+            score = (max(hits) if max(hits) >= 5 else min(hits)) if hits else 5.0
+            score += min(ENGAGEMENT_CAP, ENGAGEMENT_SCALE * math.log10(1 + engagement(post)))
+            if not description:
+                score -= 1
+            value.append(score)
+
+        timeliness = array('d')
+        for hits, ts in zip(column('timeliness'), timestamps):
+            if ts is None:
+                score = UNDATED_TIMELINESS
+            else:
+                age = max(0.0, now - ts)
+                score = _interpolate(age / 3600, AGE_POINTS)
+                if hits and age <= BREAKING_WINDOW:
+                    score = max(score, max(hits))
+            timeliness.append(score)
+
+        relevance = array('d', (max(hits) if hits else 5.0
+                                for hits in column('relevance')))
+
+        readability = array('d')
+        for hits, title, description in zip(column('clickbait'), titles,
+                                            descriptions):
+            length = len(title.strip())
+            if hits or '!!' in title or '！！' in title or '??' in title:
+                score = 3.0
+            elif length < 6 or length > 150:
+                score = 5.0
+            elif not description:
+                score = 6.0
+            elif len(description) >= 80:
+                score = 9.0
+            else:
+                score = 8.0
+            letters = NOT_LATIN_LETTER.sub('', title)
+            if len(letters) > 10 and letters.isupper():
+                score = min(score, 4.0)
+            readability.append(score)
+
+        return {'value': _clamp(value), 'timeliness': _clamp(timeliness),
+                'relevance': _clamp(relevance), 'readability': _clamp(readability)}
+
+    def scores(self, posts):
+        """Weighted 10-point prescore per post, rounded to one decimal."""
+        dims = self.dimensions(posts)
+        wv, wt, wr, wd = (WEIGHTS[dim] for dim in ('value', 'timeliness', 'relevance', 'readability'))
+        return [round(v * wv + t * wt + r * wr + d * wd, 1)
+                for v, t, r, d in zip(dims['value'], dims['timeliness'], dims['relevance'],
+                                      dims['readability'])]
+
+    def prune(self, posts, min_score=None):
+        """Set post['prescore'] on every post and return those scoring at least min_score."""
+        scores = self.scores(posts)
+        for post, score in zip(posts, scores):
+            post['prescore'] = score
+        if min_score is None:
+            return list(posts)
+        return [p for p in posts if p['prescore'] >= min_score]
+
+
+def by_prescore(post):
+    """Merger key: highest prescore first, newer first among equals."""
+    return (post.get('prescore') or 0, post_timestamp(post) or 0)
+
+
+def apply_prescore(result, min_score=None, top_k=None, lexicon=None, key='posts'):
+    """
+    Score result[key] in place and keep the posts scoring at least
+    min_score, or the top_k best of them (then best first).
+    """
+    posts = result.get(key) or []
+    # Ages are measured from the fetch, so re-scoring a saved result gives the same scores.
+    fetched_at = result.get('fetched_at') or result.get('searched_at') or ''
+    scorer = PreScorer(lexicon, parse_iso(fetched_at))
+    kept = scorer.prune(posts, min_score)
+    if top_k:
+        merger = Merger(key=by_prescore, limit=top_k)
+        merger.add(kept)
+        kept = merger.merged()
+    result[key] = kept
+    if 'total_posts' in result:
+        result['total_posts'] = len(kept)
+    result['prescore'] = {
+        'min': min_score,
+        'top_k': top_k,
+        'kept': len(kept),
+        'dropped': len(posts) - len(kept),
+    }
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Pre-score fetch_feeds / fetch_github_issues / deep_search JSON output '
+                    'by references/scoring.md and drop unlikely candidates')
+    parser.add_argument('input', nargs='?', help='JSON output to score (default: stdin)')
+    parser.add_argument('--min-prescore', type=float, default=DEFAULT_MIN_PRESCORE,
+                        help=f'Drop posts scoring below this (default: {DEFAULT_MIN_PRESCORE:g})')
+    parser.add_argument('--top-k', type=int, help='Keep only the K best-scoring posts')
+    parser.add_argument('--lexicon', help='JSON {dimension: {term: score}} merged over the defaults')
+    args = parser.parse_args()
+
+    if args.input:
+        with open(args.input) as f:
+            result = json.load(f)
+    else:
+        result = json.load(sys.stdin)
+    key = 'posts' if 'posts' in result else 'all_results'
+    apply_prescore(result, args.min_prescore, args.top_k, load_lexicon(args.lexicon), key)
+    print(json.dumps(result, ensure_ascii=False, indent=2, default=to_json))
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,149 @@
+"""
+Per-feed polling schedule learned from each feed's publishing cadence.
+
+Every successful fetch records the publish timestamps of the feed's
+entries (the last TIMESTAMPS_KEPT distinct ones). The cadence is the median
+gap between them, and the feed is next due half a cadence after the fetch
+(so a feed is polled about twice per post), kept between MIN_INTERVAL and
+MAX_INTERVAL. Feeds without a known cadence are always due.
+
+A feed's own <ttl> (RSS 2.0) or sy:updatePeriod / sy:updateFrequency hint
+asks clients not to poll more often than that; with honor_hints=True the
+interval is at least the hint (still at most MAX_INTERVAL). Intervals are
+worked out when a feed is checked, so the flag applies to past fetches too.
+
+Failed fetches change nothing here: the feed stays due and health.py
+decides when to retry it.
+
+Location: <cache dir>/schedule.json
+"""
+
+import os
+import json
+import time
+from statistics import median
+
+from feed_cache import CACHE_DIR, write_json_atomic
+
+MIN_INTERVAL = 30 * 60
+MAX_INTERVAL = 24 * 3600
+# Poll this many times per typical gap between posts.
+POLLS_PER_POST = 2
+TIMESTAMPS_KEPT = 20
+# Schedules of feeds not fetched for this long are dropped.
+RETENTION_DAYS = 90
+
+SY_NS = '{http://purl.org/rss/1.0/modules/syndication/}'
+UPDATE_PERIODS = {
+    'hourly': 3600,
+    'daily': 86400,
+    'weekly': 7 * 86400,
+    'monthly': 30 * 86400,
+    'yearly': 365 * 86400,
+}
+
+
+def ttl_seconds(text):
+    """RSS <ttl> (minutes) in seconds, or None."""
+    try:
+        minutes = int((text or '').strip())
+    except ValueError:
+        return None
+    return minutes * 60 if minutes > 0 else None
+
+
+def update_period_seconds(period, frequency=None):
+    """sy:updatePeriod / sy:updateFrequency as seconds between updates, or None."""
+    seconds = UPDATE_PERIODS.get((period or '').strip().lower())
+    if not seconds:
+        return None
+    try:
+        frequency = max(1, int((frequency or '1').strip()))
+    except ValueError:
+        frequency = 1
+    return seconds // frequency
+
+
+def cadence(timestamps):
+    """Median gap in seconds between distinct publish times, or None."""
+    ordered = sorted(set(timestamps))
+    gaps = [b - a for a, b in zip(ordered, ordered[1:])]
+    return median(gaps) if gaps else None
+
+
+class FeedSchedule:
+    """
+    Next-due times per feed URL. With due_only=True feeds that are not due
+    yet are reported as such by is_due(); otherwise every feed is due but
+    schedules are still learned.
+    """
+
+    def __init__(self, path=None, due_only=False, honor_hints=False):
+        self.path = path or os.path.join(CACHE_DIR, 'schedule.json')
+        self.due_only = due_only
+        self.honor_hints = honor_hints
+        self.feeds = self._load()
+        self._touched = set()
+
+    def _load(self):
+        try:
+            with open(self.path) as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return {}
+
+    def next_due(self, url):
+        """Epoch time the feed is next due, or None if it has never been fetched."""
+        record = self.feeds.get(url)
+        if not record:
+            return None
+        return record['last_fetch'] + self.interval(record)
+
+    def is_due(self, url, now=None):
+        if not self.due_only:
+            return True
+        next_due = self.next_due(url)
+        return next_due is None or (now or time.time()) >= next_due
+
+    def interval(self, record):
+        gap = cadence(record.get('timestamps', []))
+        if gap is None:
+            return MIN_INTERVAL
+        interval = gap / POLLS_PER_POST
+        if self.honor_hints and record.get('hint'):
+            interval = max(interval, record['hint'])
+        return min(MAX_INTERVAL, max(MIN_INTERVAL, interval))
+
+    def record(self, url, timestamps=(), hint=None, now=None):
+        """Record a successful fetch that saw entries published at timestamps."""
+        now = now or time.time()
+        record = self.feeds.setdefault(url, {})
+        seen = set(record.get('timestamps', [])) | {t for t in timestamps if t}
+        record['timestamps'] = sorted(seen)[-TIMESTAMPS_KEPT:]
+        if hint:
+            record['hint'] = hint
+        record['last_fetch'] = now
+        self._touched.add(url)
+
+    def record_result(self, url, result):
+        """record() from a successful fetch result (a not-due result is no fetch)."""
+        if not result.get('success') or result.get('not_due'):
+            return
+        cadence = result.get('cadence') or {}
+        timestamps = cadence.get('timestamps')
+        if timestamps is None:
+            # 304: the cached posts are all we know about.
+            timestamps = [p.get('timestamp') for p in result['posts']]
+        self.record(url, timestamps, cadence.get('hint'))
+
+    def save(self):
+        """Write the touched schedules over the current file contents."""
+        if not self._touched:
+            return
+        feeds = self._load()
+        for url in self._touched:
+            feeds[url] = self.feeds[url]
+        cutoff = time.time() - RETENTION_DAYS * 86400
+        feeds = {k: v for k, v in feeds.items() if v.get('last_fetch', 0) >= cutoff}
+        write_json_atomic(self.path, feeds)
+        self._touched.clear()
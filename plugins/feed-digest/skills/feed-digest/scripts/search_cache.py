@@ -0,0 +1,120 @@
+"""
+On-disk TTL cache for deep_search.py adapter responses.
+
+Entries are keyed by (adapter, site, normalized query, max_results) and
+expire after a per-adapter TTL: paid engines (Tavily, Exa) are kept longer
+than fast-moving forum searches. The store is bounded to MAX_BYTES of
+payload; when it grows past that the least recently used entries are
+evicted. Only successful responses are stored.
+
+Location: <cache dir>/search.db
+"""
+
+import os
+import json
+import time
+import sqlite3
+import hashlib
+import threading
+
+from feed_cache import CACHE_DIR
+
+# Seconds a cached response stays valid, per adapter.
+DEFAULT_TTLS = {
+    'tavily': 6 * 3600,
+    'exa': 6 * 3600,
+    'discourse': 1800,
+    'hackernews': 900,
+    'v2ex': 1800,
+}
+DEFAULT_TTL = 1800
+MAX_BYTES = 32 * 1024 * 1024
+
+
+def normalize_query(query):
+    """Case- and whitespace-insensitive form of a query."""
+    return ' '.join(query.lower().split())
+
+
+def cache_key(adapter, query, max_results=None, site=''):
+    raw = json.dumps([adapter, site, normalize_query(query), max_results])
+    return hashlib.sha1(raw.encode('utf-8')).hexdigest()
+
+
+class SearchCache:
+    """
+    SQLite-backed response cache. Use as a context manager; one instance
+    may be shared between threads.
+
+    With refresh=True lookups always miss but fresh responses are still
+    stored, so the next run can use them.
+    """
+
+    def __init__(self, path=None, ttls=None, max_bytes=MAX_BYTES, refresh=False):
+        path = path or os.path.join(CACHE_DIR, 'search.db')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.ttls = {**DEFAULT_TTLS, **(ttls or {})}
+        self.max_bytes = max_bytes
+        self.refresh = refresh
+        self.conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._lock = threading.Lock()
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS responses ('
+            ' key TEXT PRIMARY KEY, adapter TEXT, stored_at REAL, last_used REAL,'
+            ' size INTEGER, payload TEXT'
+            ') WITHOUT ROWID'
+        )
+        self.conn.execute('CREATE INDEX IF NOT EXISTS responses_lru ON responses (last_used)')
+        self.conn.execute('DELETE FROM responses WHERE stored_at < ?',
+                          (time.time() - max(self.ttls.values()),))
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def get(self, adapter, query, max_results=None, site=''):
+        """Cached response, or None if missing, expired or refreshing."""
+        if self.refresh:
+            return None
+        key = cache_key(adapter, query, max_results, site)
+        with self._lock:
+            row = self.conn.execute(
+                'SELECT stored_at, payload FROM responses WHERE key = ?', (key,)
+            ).fetchone()
+            now = time.time()
+            if not row or now - row[0] > self.ttls.get(adapter, DEFAULT_TTL):
+                return None
+            with self.conn:
+                self.conn.execute('UPDATE responses SET last_used = ? WHERE key = ?', (now, key))
+        return json.loads(row[1])
+
+    def put(self, adapter, query, max_results, response, site=''):
+        """Store a response and evict least recently used entries over max_bytes."""
+        key = cache_key(adapter, query, max_results, site)
+        payload = json.dumps(response, ensure_ascii=False)
+        now = time.time()
+        with self._lock, self.conn:
+            self.conn.execute(
+                'INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?, ?)',
+                (key, adapter, now, now, len(payload), payload),
+            )
+            self._evict()
+
+    def _evict(self):
+        total = self.conn.execute('SELECT COALESCE(SUM(size), 0) FROM responses').fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        doomed = []
+        for key, size in self.conn.execute('SELECT key, size FROM responses ORDER BY last_used'):
+            doomed.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        self.conn.executemany('DELETE FROM responses WHERE key = ?', doomed)
@@ -0,0 +1,148 @@
+"""
+SQLite store of posts that have already been emitted, for --incremental runs.
+
+Posts are keyed by their normalized link: scheme, "www." prefix, default
+ports, fragments, trailing slashes and tracking parameters are ignored, so
+the same article reached through slightly different URLs counts once. Posts
+without a link fall back to source + title.
+
+Location: <cache dir>/seen.db
+"""
+
+import os
+import sqlite3
+import time
+from urllib.parse import urlsplit, parse_qsl, urlencode
+
+from feed_cache import CACHE_DIR
+
+TRACKING_PARAM_PREFIXES = ('utm_',)
+TRACKING_PARAMS = {
+    'fbclid', 'gclid', 'dclid', 'yclid', 'msclkid', 'igshid',
+    'mc_cid', 'mc_eid', '_hsenc', '_hsmi', 'ref_src', 'spm',
+}
+# Keys not seen again within this many days are dropped on open.
+RETENTION_DAYS = 180
+# SQLite's default limit on bound parameters is 999.
+QUERY_BATCH = 500
+
+
+def normalize_url(url):
+    """Canonical form of a URL for identity comparisons (not for fetching)."""
+    if not url:
+        return ''
+    parts = urlsplit(url.strip())
+    host = (parts.hostname or '').lower()
+    if host.startswith('www.'):
+        host = host[4:]
+    if parts.port and parts.port not in (80, 443):
+        host = f'{host}:{parts.port}'
+    path = parts.path.rstrip('/') or '/'
+    query = [
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if k.lower() not in TRACKING_PARAMS and not k.lower().startswith(TRACKING_PARAM_PREFIXES)
+    ]
+    query.sort()
+    normalized = f'{host}{path}'
+    if query:
+        normalized += '?' + urlencode(query)
+    return normalized
+
+
+def post_key(post):
+    """Identity key for a post."""
+    key = normalize_url(post.get('link'))
+    if key:
+        return key
+    return f"{post.get('source', '')}\x00{post.get('title', '')}"
+
+
+class SeenStore:
+    """Set of post keys persisted in SQLite. Use as a context manager."""
+
+    def __init__(self, path=None):
+        path = path or os.path.join(CACHE_DIR, 'seen.db')
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30)
+        self.conn.execute(
+            'CREATE TABLE IF NOT EXISTS seen ('
+            ' key TEXT PRIMARY KEY, source TEXT, first_seen REAL, last_seen REAL'
+            ') WITHOUT ROWID'
+        )
+        self.conn.execute('DELETE FROM seen WHERE last_seen < ?',
+                          (time.time() - RETENTION_DAYS * 86400,))
+        self.conn.commit()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    def close(self):
+        self.conn.close()
+
+    def _known(self, keys):
+        known = set()
+        for i in range(0, len(keys), QUERY_BATCH):
+            batch = keys[i:i + QUERY_BATCH]
+            placeholders = ','.join('?' * len(batch))
+            rows = self.conn.execute(f'SELECT key FROM seen WHERE key IN ({placeholders})', batch)
+            known.update(row[0] for row in rows)
+        return known
+
+    def unseen(self, posts):
+        """
+        Return the posts whose keys have not been seen before, without
+        recording them (see mark()).
+
+        Already-known keys get their last_seen refreshed so they are not
+        expired while a feed still carries them.
+        """
+        keyed = [(post_key(p), p) for p in posts]
+        known = self._known(list({k for k, _ in keyed}))
+        now = time.time()
+
+        new_posts = []
+        new_keys = set()
+        for key, post in keyed:
+            if key in known or key in new_keys:
+                continue
+            new_keys.add(key)
+            new_posts.append(post)
+
+        with self.conn:
+            self.conn.executemany('UPDATE seen SET last_seen = ? WHERE key = ?',
+                                  ((now, k) for k in known))
+        return new_posts
+
+    def mark(self, posts):
+        """Record posts as seen."""
+        now = time.time()
+        rows = {post_key(p): p.get('source', '') for p in posts}
+        with self.conn:
+            self.conn.executemany('INSERT OR IGNORE INTO seen VALUES (?, ?, ?, ?)',
+                                  ((key, source, now, now) for key, source in rows.items()))
+
+
+def apply_incremental(result, path=None, prune=None):
+    """
+    Reduce a fetch result to posts not seen in earlier runs, in place.
+
+    prune, if given, is then called with the result and may drop more
+    posts. Only the posts it keeps are recorded as seen, so the ones it
+    drops can still come up in a later run.
+    """
+    posts = result['posts']
+    with SeenStore(path) as store:
+        new_posts = store.unseen(posts)
+        result['posts'] = new_posts
+        result['total_posts'] = len(new_posts)
+        if prune:
+            prune(result)
+        store.mark(result['posts'])
+    result['incremental'] = {
+        'new': len(new_posts),
+        'already_seen': len(posts) - len(new_posts),
+    }
+    return result
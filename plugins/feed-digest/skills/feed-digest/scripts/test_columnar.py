@@ -0,0 +1,50 @@
+"""Tests for columnar.py: write_columns / read_columns round trips."""
+
+import pytest
+
+import columnar
+from columnar import read_columns, write_columns
+from posts import Post
+
+POSTS = [
+    Post('Rust 1.80', 'https://example.com/rust', 'LazyCell', '2024-06-01T12:00:00+00:00',
+         1717243200, ['release', 'rust'], 'alice', 'Rust Blog',
+         'https://blog.rust-lang.org/feed.xml'),
+    {'title': '开源大模型发布', 'link': 'https://example.com/llm', 'description': '',
+     'pub_date': 'yesterday', 'timestamp': None, 'categories': [], 'creator': '',
+     'source': '科技日报', 'source_url': 'https://example.com/feed.xml'},
+    Post('Rust 1.81', 'https://example.com/rust-181', None, '', 1719835200, ('rust',), 'alice',
+         'Rust Blog', 'https://blog.rust-lang.org/feed.xml'),
+]
+
+
+def test_round_trip(tmp_path):
+    path = str(tmp_path / 'posts.cols')
+    assert write_columns(iter(POSTS), path) == 3
+    columns = read_columns(path)
+    assert columns['timestamp'] == [1717243200, None, 1719835200]
+    assert columns['title'] == ['Rust 1.80', '开源大模型发布', 'Rust 1.81']
+    assert columns['description'] == ['LazyCell', '', '']
+    assert columns['pub_date'] == ['2024-06-01T12:00:00+00:00', 'yesterday', '']
+    assert columns['source'] == ['Rust Blog', '科技日报', 'Rust Blog']
+    assert columns['creator'] == ['alice', '', 'alice']
+    assert columns['categories'] == [['release', 'rust'], [], ['rust']]
+
+
+def test_empty(tmp_path):
+    path = str(tmp_path / 'empty.cols')
+    assert write_columns([], path) == 0
+    assert read_columns(path)['title'] == []
+
+
+def test_rejects_other_files(tmp_path):
+    path = tmp_path / 'not.cols'
+    path.write_bytes(b'{"posts": []}')
+    with pytest.raises(ValueError):
+        read_columns(str(path))
+
+
+def test_arrow_needs_pyarrow(tmp_path, monkeypatch):
+    monkeypatch.setattr(columnar, 'pyarrow', None)
+    with pytest.raises(RuntimeError):
+        write_columns(POSTS, str(tmp_path / 'posts.arrow'))
@@ -0,0 +1,97 @@
+"""Tests for daemon.py: the HTTP endpoints over a refreshed digest."""
+
+import json
+import threading
+import time
+from argparse import Namespace
+from http.server import ThreadingHTTPServer
+
+import pytest
+
+import transport
+from conftest import rss
+from daemon import Daemon, Handler
+
+NOW = int(time.time())
+ITEMS = [(f'Release {i} notes', NOW - i * 3600) for i in range(3)]
+
+
+@pytest.fixture
+def daemon(tmp_path, feed_server):
+    config = tmp_path / 'feeds.json'
+    url = feed_server.add('/feed.xml', rss(ITEMS))
+    config.write_text(json.dumps({'feeds': [{'url': url, 'name': 'Releases'}]}))
+    args = Namespace(config=str(config), search_config=None, parse_workers=0, concurrency=2,
+                     honor_ttl=False, since=None, max_items=None, no_index=True,
+                     interval=300, verbose=False)
+    daemon = Daemon(args)
+    daemon.feeds.get()
+    server = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    server.daemon_threads = True
+    server.owner = daemon
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    daemon.url = f'http://127.0.0.1:{server.server_port}'
+    daemon.feed_server = feed_server
+    yield daemon
+    server.shutdown()
+    server.server_close()
+    daemon.executor.shutdown()
+    daemon.search_cache.close()
+
+
+def call(daemon, path, method='GET'):
+    response = transport.request(daemon.url + path, method=method)
+    return response.status, response.json()
+
+
+def test_digest_waits_for_first_refresh(daemon):
+    assert call(daemon, '/digest')[0] == 503
+    assert call(daemon, '/since?cursor=0')[0] == 503
+
+
+def test_digest(daemon):
+    daemon.refresh(None)
+    status, digest = call(daemon, '/digest')
+    assert status == 200
+    assert [p['title'] for p in digest['posts']] == [title for title, _ in ITEMS]
+    assert digest['refreshed_at']
+
+    assert call(daemon, '/digest?limit=1')[1]['total_posts'] == 1
+    filtered = call(daemon, '/digest?filter=%2B1')[1]
+    assert [p['title'] for p in filtered['posts']] == ['Release 1 notes']
+
+
+def test_since_announces_new_posts_once(daemon):
+    daemon.refresh(None)
+    first = call(daemon, '/since?cursor=0')[1]
+    assert first['count'] == 3
+    assert [p['title'] for p in first['posts']] == [title for title, _ in reversed(ITEMS)]
+    assert call(daemon, f"/since?cursor={first['cursor']}")[1]['count'] == 0
+
+    daemon.feed_server.add('/feed.xml', rss([('Release new notes', NOW)] + ITEMS))
+    daemon.fetch_all = True
+    daemon.refresh(None)
+    later = call(daemon, f"/since?cursor={first['cursor']}")[1]
+    assert [p['title'] for p in later['posts']] == ['Release new notes']
+
+    paged = call(daemon, '/since?cursor=0&limit=2')[1]
+    assert paged['count'] == 2 and paged['more']
+
+
+def test_health_and_refresh(daemon):
+    daemon.refresh(None)
+    status, health = call(daemon, '/health')
+    assert status == 200
+    assert health['status'] == 'ok'
+    assert health['total_posts'] == 3
+    assert [(f['name'], f['state']) for f in health['feeds']] == [('Releases', 'closed')]
+    assert health['feeds'][0]['next_due']
+
+    status, body = call(daemon, '/refresh?all=1', method='POST')
+    assert (status, body) == (202, {'refresh': 'all'})
+    assert daemon.wake.is_set() and daemon.fetch_all
+
+
+def test_bad_requests(daemon):
+    assert call(daemon, '/search')[0] == 400
+    assert call(daemon, '/nope')[0] == 404
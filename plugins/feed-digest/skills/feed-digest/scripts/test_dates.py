@@ -0,0 +1,87 @@
+"""Tests for dates.py: RFC 822 / ISO 8601 parsing and range checks."""
+
+from xml.etree.ElementTree import fromstring
+
+import pytest
+
+from dates import DateParser, format_utc, parse_iso, parse_rfc822, parse_timestamp, post_timestamp
+from fetch_feeds import rss_item_to_post
+
+NOON = 1717243200  # 2024-06-01T12:00:00Z
+
+
+@pytest.mark.parametrize('value', [
+    '2024-06-01T12:00:00Z',
+    '2024-06-01T12:00:00.123Z',
+    '2024-06-01 12:00:00+00:00',
+    '2024-06-01T14:00:00+02:00',
+    '2024-06-01T07:00:00-0500',
+    'Sat, 01 Jun 2024 12:00:00 GMT',
+    'Sat, 01 Jun 2024 12:00:00 +0000',
+    'Sat, 01 Jun 2024 08:00:00 EDT',
+    '1 June 2024 12:00 UT',
+    'Sat, 01 Jun 24 12:00:00 GMT',
+])
+def test_formats(value):
+    assert parse_timestamp(value) == NOON
+
+
+def test_date_only_is_midnight_utc():
+    assert parse_iso('2024-06-01') == NOON - 12 * 3600
+
+
+@pytest.mark.parametrize('value', [
+    '',
+    'yesterday',
+    '2024-13-01T00:00:00Z',
+    '2024-02-30T00:00:00Z',
+    '2023-02-29',
+    '2024-06-31',
+    '2024-06-01T24:00:00Z',
+    '2024-06-01T12:60:00Z',
+    '2024-06-01T12:00:61Z',
+    'Fri, 31 Apr 2024 10:00:00 GMT',
+    'Sat, 01 Jun 2024 25:00:00 GMT',
+    '0000-06-01T00:00:00Z',
+    '0001-01-01T00:00:00+01:00',
+    '9999-12-31T23:00:00-01:00',
+])
+def test_invalid_dates(value):
+    assert parse_timestamp(value) is None
+
+
+def test_leap_day_and_leap_second():
+    assert parse_iso('2024-02-29T00:00:00Z') == parse_iso('2024-02-28T00:00:00Z') + 86400
+    assert parse_iso('2016-12-31T23:59:60Z') == parse_iso('2016-12-31T23:59:59Z')
+
+
+def test_parser_remembers_format():
+    parser = DateParser()
+    assert parser('2024-06-01T12:00:00Z') == NOON
+    assert parser._parsers[0] is parse_iso
+    assert parser('Sat, 01 Jun 2024 12:00:00 GMT') == NOON
+    assert parser._parsers[0] is parse_rfc822
+
+
+def test_format_utc_round_trip():
+    assert format_utc(NOON) == '2024-06-01T12:00:00+00:00'
+    assert parse_iso(format_utc(NOON)) == NOON
+
+
+def test_format_utc_out_of_range():
+    assert format_utc(10 ** 12) is None
+    assert format_utc(None, 'raw') == 'raw'
+    assert format_utc(-10 ** 12, 'raw') == 'raw'
+
+
+def test_out_of_range_date_does_not_fail_feed():
+    item = fromstring('<item><title>Old</title><pubDate>0001-01-01T00:00:00+01:00</pubDate></item>')
+    post, timestamp = rss_item_to_post(item, 'Feed', 'https://example.com/feed')
+    assert timestamp is None
+    assert post['pub_date'] == '0001-01-01T00:00:00+01:00'
+
+
+def test_post_timestamp():
+    assert post_timestamp({'timestamp': NOON, 'pub_date': 'garbage'}) == NOON
+    assert post_timestamp({'timestamp': None, 'pub_date': '2024-06-01T12:00:00Z'}) is None
+    assert post_timestamp({'pub_date': '2024-06-01T12:00:00Z'}) == NOON
@@ -0,0 +1,78 @@
+"""Tests for dedup.py: canonical URLs, SimHash near-duplicates and streaming use."""
+
+from dedup import Deduplicator, dedupe, simhash, tokenize
+
+TEXT = ('Rust 1.80 released with lazy cell, exclusive ranges in patterns '
+        'and a faster compiler for large workspaces')
+
+
+def post(link, title=TEXT, description='', source='a'):
+    return {'link': link, 'title': title, 'description': description, 'source': source}
+
+
+def test_tokenize():
+    assert tokenize('The Rust compiler is fast') == ['rust', 'compiler', 'fast']
+    assert tokenize('大模型发布') == ['大模', '模型', '型发', '发布']
+
+
+def test_simhash_is_stable_and_close_for_similar_text():
+    a = simhash(tokenize(TEXT))
+    b = simhash(tokenize(TEXT + ' today'))
+    c = simhash(tokenize('Kubernetes deprecates the dockershim runtime in favour of containerd'))
+    assert a == simhash(tokenize(TEXT))
+    assert bin(a ^ b).count('1') < bin(a ^ c).count('1')
+
+
+def test_same_url_variants():
+    posts = [
+        post('https://example.com/post/1', 'One'),
+        post('http://www.example.com/post/1/?utm_source=rss', 'One again', source='b'),
+        post('https://example.com/post/2', 'Two'),
+    ]
+    unique = dedupe(posts)
+    assert [p['link'] for p in unique] == ['https://example.com/post/1', 'https://example.com/post/2']
+    assert unique[0]['alternates'] == [
+        {'link': 'http://www.example.com/post/1/?utm_source=rss', 'source': 'b'},
+    ]
+
+
+def test_near_duplicate_text():
+    posts = [
+        post('https://a.example/rust-180', TEXT),
+        post('https://b.example/news/rust', TEXT + ' today', source='b'),
+        post('https://c.example/k8s', 'Kubernetes deprecates the dockershim runtime in favour of containerd'),
+    ]
+    unique = dedupe(posts)
+    assert len(unique) == 2
+    assert unique[0]['alternates'][0]['source'] == 'b'
+
+
+def test_same_source_templated_posts_are_kept():
+    body = ('This week in the project: new releases of the parser and the scheduler, two '
+            'conference talks on incremental compilation, a long read on garbage collectors, '
+            'benchmark results for the storage engine, community meetup notes and the usual links')
+    posts = [
+        post('https://a.example/weekly/41', 'Issue 41', body),
+        post('https://a.example/weekly/42', 'Issue 42', body),
+        post('https://b.example/mirror/42', 'Issue 42', body, source='b'),
+    ]
+    unique = dedupe(posts)
+    assert [p['link'] for p in unique] == ['https://a.example/weekly/41', 'https://a.example/weekly/42']
+    assert [a for p in unique for a in p.get('alternates', [])] == [
+        {'link': 'https://b.example/mirror/42', 'source': 'b'},
+    ]
+
+
+def test_short_titles_are_not_merged():
+    posts = [post('https://a.example/1', 'Weekly update'), post('https://b.example/2', 'Weekly update')]
+    assert len(dedupe(posts)) == 2
+
+
+def test_streaming_counts_duplicates_and_keeps_input():
+    deduplicator = Deduplicator()
+    first = post('https://a.example/1')
+    assert deduplicator.add(first) is not None
+    assert deduplicator.add(post('https://a.example/1#comments')) is None
+    assert deduplicator.add(post('https://b.example/other', TEXT + ' today', source='b')) is None
+    assert deduplicator.duplicates == 2
+    assert 'alternates' not in first
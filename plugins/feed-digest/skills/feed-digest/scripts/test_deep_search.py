@@ -0,0 +1,77 @@
+"""Tests for deep_search.py: the overall deadline and hedged requests."""
+
+import threading
+import time
+
+import deep_search
+from deep_search import deep_search as search
+from latency import LatencyHistory, MIN_SAMPLES
+
+CONFIG = {'sites': [{'type': 'hackernews'}, {'type': 'v2ex'}]}
+
+
+def answer(site, title):
+    return {'site': site, 'success': True, 'result_count': 1,
+            'results': [{'title': title, 'url': f'https://example.com/{site}',
+                         'content': '', 'source': site}]}
+
+
+def test_deadline_returns_what_has_arrived(monkeypatch):
+    release = threading.Event()
+
+    def slow(query, timeout=None, **kwargs):
+        release.wait(5)
+        return answer('v2ex', 'Late')
+
+    monkeypatch.setattr(deep_search, 'search_hackernews',
+                        lambda query, timeout=None, **kwargs: answer('hackernews', 'Fast'))
+    monkeypatch.setattr(deep_search, 'search_v2ex', slow)
+
+    started = time.monotonic()
+    results = search('rust', CONFIG, deadline=0.3)
+    release.set()
+    assert time.monotonic() - started < 2
+    assert [r['title'] for r in results['all_results']] == ['Fast']
+    sites = {s['site']: s for s in results['sites']}
+    assert sites['hackernews']['success']
+    assert sites['https://v2ex.com']['timed_out']
+
+
+def test_hedge_sends_a_duplicate_past_p95(monkeypatch, tmp_path):
+    latency = LatencyHistory(str(tmp_path / 'latency.json'))
+    for _ in range(MIN_SAMPLES):
+        latency.record('hackernews|', 0.05)
+    calls = []
+    release = threading.Event()
+
+    def stuck_once(query, timeout=None, **kwargs):
+        calls.append(time.monotonic())
+        if len(calls) == 1:
+            release.wait(5)
+            return answer('hackernews', 'First')
+        return answer('hackernews', 'Hedged')
+
+    monkeypatch.setattr(deep_search, 'search_hackernews', stuck_once)
+    started = time.monotonic()
+    results = search('rust', {'sites': [{'type': 'hackernews'}]}, deadline=3, hedge=True,
+                     latency=latency)
+    release.set()
+    assert time.monotonic() - started < 2
+    assert len(calls) == 2
+    assert [r['title'] for r in results['all_results']] == ['Hedged']
+    assert results['sites'][0]['hedged']
+
+
+def test_no_hedge_without_history(monkeypatch, tmp_path):
+    calls = []
+
+    def slow(query, timeout=None, **kwargs):
+        calls.append(1)
+        time.sleep(0.2)
+        return answer('hackernews', 'Only')
+
+    monkeypatch.setattr(deep_search, 'search_hackernews', slow)
+    results = search('rust', {'sites': [{'type': 'hackernews'}]}, deadline=3, hedge=True,
+                     latency=LatencyHistory(str(tmp_path / 'latency.json')))
+    assert len(calls) == 1
+    assert 'hedged' not in results['sites'][0]
@@ -0,0 +1,62 @@
+"""Tests for feed_cache.py and the conditional GET in fetch_feeds.py."""
+
+import time
+
+import feed_cache
+from conftest import rss
+from fetch_feeds import fetch_and_parse_feed
+
+NOW = int(time.time())
+ITEMS = [(f'Post {i}', NOW - i * 3600) for i in range(5)]
+
+
+def test_store_and_load(cache_dir):
+    url = 'https://example.com/feed.xml'
+    feed_cache.store_entry(url, '"v1"', None, 123, [{'title': 'a'}])
+    entry = feed_cache.load_entry(url)
+    assert entry['etag'] == '"v1"'
+    assert entry['posts'] == [{'title': 'a'}]
+    assert feed_cache.load_entry('https://example.com/other.xml') is None
+
+
+def test_covers_window():
+    full = {'window': {'since': None, 'max_items': None, 'filter': None}}
+    assert feed_cache.covers_window(full, since_ts=NOW, max_items=3, filter_key='ai')
+
+    recent = {'window': {'since': NOW - 86400, 'max_items': None, 'filter': None}}
+    assert feed_cache.covers_window(recent, since_ts=NOW)
+    assert not feed_cache.covers_window(recent, since_ts=NOW - 7 * 86400)
+    assert not feed_cache.covers_window(recent)
+
+    capped = {'window': {'since': None, 'max_items': 2, 'filter': None}}
+    assert feed_cache.covers_window(capped, max_items=2)
+    assert not feed_cache.covers_window(capped, max_items=5)
+    assert not feed_cache.covers_window(capped)
+
+    filtered = {'window': {'since': None, 'max_items': None, 'filter': 'ai'}}
+    assert feed_cache.covers_window(filtered, filter_key='ai')
+    assert not feed_cache.covers_window(filtered)
+
+
+def test_304_reuses_cached_posts(cache_dir, feed_server):
+    url = feed_server.add('/feed.xml', rss(ITEMS), etag='"v1"')
+
+    first = fetch_and_parse_feed(url)
+    assert first['cache'] == 'miss'
+    assert first['post_count'] == 5
+
+    second = fetch_and_parse_feed(url)
+    assert second['cache'] == 'hit'
+    assert second['bytes'] == 0
+    assert [p['title'] for p in second['posts']] == [p['title'] for p in first['posts']]
+    assert feed_server.conditional['/feed.xml'] == 1
+
+
+def test_narrower_cached_window_is_refetched(cache_dir, feed_server):
+    url = feed_server.add('/feed.xml', rss(ITEMS), etag='"v1"')
+
+    assert fetch_and_parse_feed(url, max_items=2)['post_count'] == 2
+    wider = fetch_and_parse_feed(url)
+    assert wider['cache'] == 'miss'
+    assert wider['post_count'] == 5
+    assert feed_server.conditional['/feed.xml'] == 0
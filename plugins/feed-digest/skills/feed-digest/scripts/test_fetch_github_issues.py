@@ -0,0 +1,193 @@
+"""Tests for fetch_github_issues.py: the rate limiter, REST pagination, rate-limited repos."""
+
+import threading
+import time
+from urllib.parse import parse_qsl, urlsplit
+
+import pytest
+
+import fetch_github_issues
+from local_index import LocalIndex
+from fetch_github_issues import (RateLimiter, RateLimitError, fetch_all_repos, fetch_repo,
+                                 health_key, is_rate_limited, paginate, parse_link_header, with_page)
+from health import FAILURE_THRESHOLD, HealthStore
+
+REPOS = ['octo/one', 'octo/two']
+API = 'https://api.github.com/repos/octo/one/issues'
+
+
+def budget_headers(remaining, reset, limit=5000):
+    return {'X-RateLimit-Remaining': str(remaining), 'X-RateLimit-Reset': str(int(reset)),
+            'X-RateLimit-Limit': str(limit)}
+
+
+def test_exhausted_budget_beyond_max_wait_raises():
+    limiter = RateLimiter(max_wait=5)
+    limiter.acquire('core')
+    limiter.release('core', 200, budget_headers(0, time.time() + 3600))
+    with pytest.raises(RateLimitError):
+        limiter.acquire('core')
+    assert limiter.snapshot()['core']['remaining'] == 0
+
+
+def test_retry_after_pauses_the_resource_only():
+    limiter = RateLimiter(max_wait=5)
+    limiter.acquire('search')
+    limiter.release('search', 403, {'Retry-After': '120'})
+    with pytest.raises(RateLimitError):
+        limiter.acquire('search')
+    limiter.acquire('core')
+    limiter.release('core')
+
+
+def test_out_of_order_responses_keep_lowest_remaining():
+    limiter = RateLimiter()
+    reset = time.time() + 3600
+    for remaining in (4000, 4100, 3900):
+        limiter.acquire('core')
+        limiter.release('core', 200, budget_headers(remaining, reset))
+    assert limiter.snapshot()['core']['remaining'] == 3900
+    # A new window resets the budget.
+    limiter.acquire('core')
+    limiter.release('core', 200, budget_headers(4999, reset + 3600))
+    assert limiter.snapshot()['core']['remaining'] == 4999
+
+
+def test_concurrency_cap_per_resource():
+    limiter = RateLimiter(max_wait=5)
+    for _ in range(RateLimiter.CONCURRENCY['search']):
+        limiter.acquire('search')
+    acquired = threading.Event()
+
+    def third():
+        limiter.acquire('search')
+        acquired.set()
+    threading.Thread(target=third, daemon=True).start()
+    assert not acquired.wait(0.2)
+    limiter.release('search')
+    assert acquired.wait(2)
+
+
+def test_is_rate_limited():
+    assert is_rate_limited(429, {}, {})
+    assert is_rate_limited(403, {'X-RateLimit-Remaining': '0'}, {})
+    assert is_rate_limited(403, {}, {'message': 'You have exceeded a secondary rate limit'})
+    assert not is_rate_limited(403, {}, {'message': 'Resource not accessible by integration'})
+    assert not is_rate_limited(404, {'X-RateLimit-Remaining': '0'}, {})
+
+
+def paged_api(monkeypatch, total_pages, per_page=2):
+    """Serve total_pages pages of issues with a Link header; returns the pages requested."""
+    requested = []
+
+    def github_request(endpoint, token=None, body=None, timeout=None):
+        page = int(dict(parse_qsl(urlsplit(endpoint).query)).get('page', 1))
+        requested.append(page)
+        issues = [{'number': page * 100 + i, 'title': f'Issue {page}.{i}',
+                   'created_at': '2024-06-01T12:00:00Z'} for i in range(per_page)]
+        headers = {}
+        if total_pages > 1:
+            headers['Link'] = (f'<{with_page(API + "?state=open", page + 1)}>; rel="next", '
+                               f'<{with_page(API + "?state=open", total_pages)}>; rel="last"')
+        return issues, headers
+    monkeypatch.setattr(fetch_github_issues, 'github_request', github_request)
+    return requested
+
+
+def test_parse_link_header():
+    value = ('<https://api.github.com/x?page=2>; rel="next", '
+             '<https://api.github.com/x?page=5>; rel="last"')
+    assert parse_link_header(value) == {'next': 'https://api.github.com/x?page=2',
+                                        'last': 'https://api.github.com/x?page=5'}
+    assert parse_link_header(None) == {}
+
+
+def test_with_page():
+    assert with_page(API + '?state=open&page=3', 7) == API + '?state=open&page=7'
+    assert with_page(API, 2) == API + '?page=2'
+
+
+def test_paginate_fetches_every_page(monkeypatch):
+    requested = paged_api(monkeypatch, total_pages=3)
+    items, total_pages = paginate('/repos/octo/one/issues?state=open', max_pages=10)
+    assert total_pages == 3
+    assert sorted(requested) == [1, 2, 3]
+    assert [i['number'] for i in items] == [100, 101, 200, 201, 300, 301]
+
+
+def test_paginate_stops_at_max_pages(monkeypatch):
+    requested = paged_api(monkeypatch, total_pages=5)
+    items, total_pages = paginate('/repos/octo/one/issues?state=open', max_pages=2)
+    assert total_pages == 5
+    assert sorted(requested) == [1, 2]
+    assert len(items) == 4
+
+
+def test_fetch_repo_reports_truncation(monkeypatch):
+    paged_api(monkeypatch, total_pages=5)
+    entry, posts = fetch_repo('octo/one', max_pages=2)
+    assert entry['success'] and entry['truncated']
+    assert entry['total_pages'] == 5
+    assert len(posts) == 4
+
+    paged_api(monkeypatch, total_pages=2)
+    entry, _ = fetch_repo('octo/one', max_pages=2)
+    assert 'truncated' not in entry
+
+
+@pytest.fixture
+def health(tmp_path):
+    return HealthStore(str(tmp_path / 'health.json'))
+
+
+def assert_rate_limited_only(health, results):
+    assert all(r['rate_limited'] and not r['success'] for r in results)
+    for repo in REPOS:
+        assert health.state(health_key(repo)) == 'closed'
+        assert health.records.get(health_key(repo), {}).get('failures', 0) == 0
+
+
+def test_repos_are_indexed_before_limit(monkeypatch, tmp_path):
+    paged_api(monkeypatch, total_pages=3)
+    with LocalIndex(str(tmp_path / 'index.db')) as index:
+        result = fetch_all_repos(['octo/one'], limit=2, index=index)
+        assert result['total_posts'] == 2
+        assert index.count() == 6
+
+
+@pytest.mark.parametrize('response', [
+    ({'errors': [{'type': 'RATE_LIMITED', 'message': 'API rate limit exceeded'}]}, {}),
+    fetch_github_issues.RateLimitError('GitHub API rate limit exhausted'),
+])
+def test_graphql_rate_limit_does_not_open_breaker(monkeypatch, health, response):
+    def github_request(*args, **kwargs):
+        if isinstance(response, Exception):
+            raise response
+        return response
+    monkeypatch.setattr(fetch_github_issues, 'github_request', github_request)
+
+    for _ in range(FAILURE_THRESHOLD):
+        results = fetch_all_repos(REPOS, token='t', graphql=True, health=health)['repo_results']
+        assert_rate_limited_only(health, results)
+
+
+def test_rest_rate_limit_does_not_open_breaker(monkeypatch, health):
+    def github_request(*args, **kwargs):
+        raise fetch_github_issues.RateLimitError('GitHub API rate limit exhausted')
+    monkeypatch.setattr(fetch_github_issues, 'github_request', github_request)
+
+    for _ in range(FAILURE_THRESHOLD):
+        results = fetch_all_repos(REPOS, token='t', health=health)['repo_results']
+        assert_rate_limited_only(health, results)
+
+
+def test_graphql_repo_error_is_recorded(monkeypatch, health):
+    payload = {'data': {'r0': None, 'r1': {'issues': {'nodes': []}}},
+               'errors': [{'path': ['r0'], 'message': 'Could not resolve to a Repository'}]}
+    monkeypatch.setattr(fetch_github_issues, 'github_request', lambda *a, **k: (payload, {}))
+
+    results = fetch_all_repos(REPOS, token='t', graphql=True, health=health)['repo_results']
+    failed = [r for r in results if not r['success']]
+    assert [r['repo'] for r in failed] == ['octo/one']
+    assert 'rate_limited' not in failed[0]
+    assert health.records[health_key('octo/one')]['failures'] == 1
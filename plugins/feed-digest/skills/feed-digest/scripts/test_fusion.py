@@ -0,0 +1,46 @@
+"""Tests for fusion.py: reciprocal rank fusion of deep_search results."""
+
+from dedup import Deduplicator
+from fusion import RRF_K, assign_ranks, fuse
+
+
+def result(url, source, title=None):
+    return {'url': url, 'title': title or url, 'content': '', 'source': source}
+
+
+def merged(*source_lists):
+    """Rank each source's list and fold duplicates, as deep_search does."""
+    deduplicator = Deduplicator(url_key='url', text_keys=('title', 'content'),
+                                alternate_keys=('source', 'rank'))
+    unique = []
+    for items in source_lists:
+        unique.extend(r for r in map(deduplicator.add, assign_ranks(items)) if r is not None)
+    return unique
+
+
+def test_result_from_two_sources_ranks_first():
+    results = merged(
+        [result('https://a.example/1', 'tavily'), result('https://both.example/x', 'tavily')],
+        [result('https://b.example/1', 'hackernews'),
+         result('https://both.example/x/', 'hackernews')],
+    )
+    fused = fuse(results, lambda source: 1.0)
+    assert fused[0]['url'] == 'https://both.example/x'
+    assert fused[0]['fused_score'] == round(2 / (RRF_K + 2), 6)
+    assert {r['url'] for r in fused[1:]} == {'https://a.example/1', 'https://b.example/1'}
+
+
+def test_weights_and_top_k():
+    results = merged([result('https://a.example/1', 'tavily')],
+                     [result('https://b.example/1', 'v2ex')])
+    weights = {'tavily': 0.5, 'v2ex': 1.0}
+    fused = fuse(results, weights.get, top_k=1)
+    assert [r['url'] for r in fused] == ['https://b.example/1']
+
+
+def test_raw_scores_are_ignored():
+    results = merged([dict(result('https://a.example/1', 'hackernews'), score=900),
+                      dict(result('https://a.example/2', 'hackernews'), score=5000)])
+    assert [r['url'] for r in fuse(results, lambda source: 1.0)] == [
+        'https://a.example/1', 'https://a.example/2',
+    ]
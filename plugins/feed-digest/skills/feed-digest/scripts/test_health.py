@@ -0,0 +1,97 @@
+"""Tests for health.py: breaker states, adaptive timeouts and probe deadlines."""
+
+import socket
+import threading
+import time
+
+import pytest
+
+import health
+import transport
+from fetch_feeds import fetch_all_feeds, health_key
+from health import HealthStore
+
+
+def half_open_store(tmp_path, key):
+    """A store whose circuit for key has opened and whose backoff is over."""
+    store = HealthStore(path=str(tmp_path / 'health.json'))
+    for _ in range(health.FAILURE_THRESHOLD):
+        store.record(key, False, error='boom')
+    store.records[key]['retry_at'] = time.time() - 1
+    return store
+
+
+@pytest.fixture
+def unresponsive(monkeypatch):
+    """
+    Local endpoints that never answer. 'connect' has a full accept queue,
+    so connecting hangs; 'response' accepts and then stays silent.
+    """
+    monkeypatch.setattr(transport, 'proxy_for', lambda url: None)
+    backlog = socket.socket()
+    backlog.bind(('127.0.0.1', 0))
+    backlog.listen(0)
+    filler = socket.create_connection(backlog.getsockname())
+
+    silent = socket.socket()
+    silent.bind(('127.0.0.1', 0))
+    silent.listen(8)
+    accepted = []
+
+    def accept():
+        try:
+            while True:
+                accepted.append(silent.accept()[0])
+        except OSError:
+            pass
+
+    threading.Thread(target=accept, daemon=True).start()
+    yield {
+        'connect': 'http://127.0.0.1:%d/feed.xml' % backlog.getsockname()[1],
+        'response': 'http://127.0.0.1:%d/feed.xml' % silent.getsockname()[1],
+    }
+    for sock in [filler, backlog, silent] + accepted:
+        sock.close()
+
+
+def test_breaker_opens_after_threshold(tmp_path):
+    store = HealthStore(path=str(tmp_path / 'health.json'))
+    for _ in range(health.FAILURE_THRESHOLD - 1):
+        store.record('feed:x', False)
+    assert store.state('feed:x') == 'closed'
+    store.record('feed:x', False)
+    assert store.state('feed:x') == 'open'
+    assert not store.allow('feed:x')
+    store.records['feed:x']['retry_at'] = time.time() - 1
+    assert store.state('feed:x') == 'half-open'
+    store.record('feed:x', True, 0.2)
+    assert store.state('feed:x') == 'closed'
+
+
+def test_timeout_adapts_to_latency(tmp_path):
+    store = HealthStore(path=str(tmp_path / 'health.json'))
+    assert store.timeout_for('feed:x', 30) == 30
+    for _ in range(health.MIN_SAMPLES):
+        store.record('feed:x', True, 0.1)
+    assert store.timeout_for('feed:x', 30) == health.MIN_TIMEOUT
+    assert store.timeout_for('feed:x', 2) == 2
+
+
+def test_half_open_uses_probe_timeout(tmp_path):
+    store = half_open_store(tmp_path, 'feed:x')
+    assert store.timeout_for('feed:x', 30) == health.PROBE_TIMEOUT
+
+
+@pytest.mark.parametrize('stage', ['connect', 'response'])
+def test_probe_gives_up_within_probe_timeout(tmp_path, monkeypatch, unresponsive, stage):
+    monkeypatch.setattr(health, 'PROBE_TIMEOUT', 0.5)
+    url = unresponsive[stage]
+    store = half_open_store(tmp_path, health_key(url))
+
+    started = time.monotonic()
+    digest = fetch_all_feeds([{'url': url}], use_cache=False, timeout=30, health=store)
+    elapsed = time.monotonic() - started
+
+    assert elapsed < health.PROBE_TIMEOUT + 0.5
+    assert not digest['feed_results'][0]['success']
+    assert store.records[health_key(url)]['failures'] == health.FAILURE_THRESHOLD + 1
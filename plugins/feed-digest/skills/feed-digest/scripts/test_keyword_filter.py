@@ -0,0 +1,68 @@
+"""Tests for keyword_filter.py: term syntax, trie matching and word boundaries."""
+
+from keyword_filter import KeywordFilter, parse_terms
+
+
+def test_parse_terms():
+    spec = 'AI, Claude\n# comment, ignored\n+python,-crypto, ,+\n'
+    assert parse_terms(spec) == ['ai', 'claude', '+python', '-crypto']
+
+
+def test_any_of():
+    kf = KeywordFilter(['rust', 'go'])
+    assert kf.matches('Rust 1.80 released')
+    assert kf.matches('', 'Why we rewrote it in Go')
+    assert not kf.matches('Python 3.13', 'free-threaded build')
+
+
+def test_required_and_excluded():
+    kf = KeywordFilter(['+python', '-crypto', 'async', 'typing'])
+    assert kf.matches('Python async tips')
+    assert not kf.matches('Async tips')
+    assert not kf.matches('Python async crypto bot')
+    assert not kf.matches('Python packaging')
+
+
+def test_only_excluded():
+    kf = KeywordFilter(['-sponsored'])
+    assert kf.matches('Release notes')
+    assert not kf.matches('SPONSORED: buy now')
+
+
+def test_overlapping_terms():
+    kf = KeywordFilter(['llm', 'llmops', 'ops'])
+    assert kf.found('LLMOps in practice') == {'llm', 'llmops', 'ops'}
+
+
+def test_word_boundary():
+    loose = KeywordFilter(['ai'])
+    strict = KeywordFilter(['ai'], word_boundary=True)
+    assert loose.matches('He said so')
+    assert not strict.matches('He said so')
+    assert strict.matches('AI model launch')
+    assert strict.matches('ai-native tooling')
+
+
+def test_cjk_terms_ignore_boundaries():
+    kf = KeywordFilter(['大模型'], word_boundary=True)
+    assert kf.matches('开源大模型发布')
+
+
+def test_latin_terms_next_to_cjk():
+    kf = KeywordFilter(['ai'], word_boundary=True)
+    assert kf.matches('使用AI工具提升效率')
+    assert kf.matches('AI工具')
+    assert kf.matches('用AI')
+    assert not kf.matches('用AIX工具')
+
+
+def test_filter_posts_and_cache_key():
+    kf = KeywordFilter(['rust', '+release'])
+    posts = [
+        {'title': 'Rust release', 'description': ''},
+        {'title': 'Rust blog', 'description': 'no news'},
+        {'title': 'Go', 'description': 'Rust release candidate'},
+    ]
+    assert [p['title'] for p in kf.filter_posts(posts)] == ['Rust release', 'Go']
+    assert kf.cache_key == '+release,rust'
+    assert KeywordFilter(['rust'], word_boundary=True).cache_key == 'rust|word'
@@ -0,0 +1,62 @@
+"""Tests for local_index.py: ingest, full-text queries and indexing before --limit."""
+
+import time
+
+import pytest
+
+from conftest import rss
+from fetch_feeds import fetch_all_feeds
+from local_index import LocalIndex
+
+NOW = int(time.time())
+POSTS = [
+    {'title': 'Rust 1.80 released', 'link': 'https://example.com/rust',
+     'description': 'LazyCell and exclusive range patterns', 'source': 'Rust Blog',
+     'timestamp': NOW},
+    {'title': 'Python 3.13 beta', 'link': 'https://example.com/python',
+     'description': 'An experimental JIT compiler', 'source': 'Python Insider',
+     'timestamp': NOW - 60},
+    {'title': '开源大模型发布', 'link': 'https://example.com/llm',
+     'description': '支持长上下文推理', 'source': '科技日报', 'timestamp': NOW - 120},
+]
+
+
+@pytest.fixture
+def index(tmp_path):
+    with LocalIndex(str(tmp_path / 'index.db')) as index:
+        index.ingest(POSTS)
+        yield index
+
+
+def test_query_ranks_title_matches(index):
+    hits = index.search('compiler released')
+    assert {h['link'] for h in hits} == {'https://example.com/rust', 'https://example.com/python'}
+    assert index.search('rust')[0]['title'] == 'Rust 1.80 released'
+    assert index.search('haskell') == []
+    assert index.search('the of') == []
+
+
+def test_cjk_substring(index):
+    if not index.trigram:
+        pytest.skip('SQLite without the trigram tokenizer')
+    assert [h['link'] for h in index.search('大模型')] == ['https://example.com/llm']
+
+
+def test_reingest_updates_in_place(index):
+    assert index.count() == 3
+    index.ingest(POSTS)
+    assert index.count() == 3
+    index.ingest([{**POSTS[0], 'link': 'https://www.example.com/rust/?utm_source=rss',
+                   'title': 'Rust 1.80.1 released'}])
+    assert index.count() == 3
+    assert index.search('rust')[0]['title'] == 'Rust 1.80.1 released'
+    assert index.search('lazycell')[0]['title'] == 'Rust 1.80.1 released'
+
+
+def test_feeds_are_indexed_before_limit(cache_dir, feed_server, tmp_path):
+    items = [(f'Post number {i}', NOW - i * 3600) for i in range(5)]
+    feeds = [{'url': feed_server.add('/feed.xml', rss(items)), 'name': 'Feed'}]
+    with LocalIndex(str(tmp_path / 'index.db')) as index:
+        digest = fetch_all_feeds(feeds, limit=2, index=index)
+        assert digest['total_posts'] == 2
+        assert index.count() == 5
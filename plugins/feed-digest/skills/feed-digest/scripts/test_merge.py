@@ -0,0 +1,49 @@
+"""Tests for merge.py: k-way merge and the bounded top-N heap."""
+
+import random
+
+from merge import Merger
+
+
+def posts(*timestamps, source='a'):
+    return [{'title': f'{source}{ts}', 'timestamp': ts, 'source': source} for ts in timestamps]
+
+
+def test_merges_streams_newest_first():
+    merger = Merger()
+    merger.add(posts(3, 9, 1, source='a'))
+    merger.add(posts(8, 2, source='b'))
+    merger.add([])
+    assert [p['timestamp'] for p in merger.merged()] == [9, 8, 3, 2, 1]
+    assert merger.count == 5
+
+
+def test_undated_posts_last():
+    merger = Merger()
+    merger.add([{'title': 'undated', 'timestamp': None}] + posts(5))
+    assert [p['title'] for p in merger.merged()] == ['a5', 'undated']
+
+
+def test_limit_keeps_best():
+    rng = random.Random(7)
+    streams = [posts(*rng.sample(range(1000), 50), source=str(i)) for i in range(10)]
+    merger = Merger(limit=25)
+    for stream in streams:
+        merger.add(stream)
+    expected = sorted((p['timestamp'] for s in streams for p in s), reverse=True)[:25]
+    assert [p['timestamp'] for p in merger.merged()] == expected
+    assert merger.count == 500
+
+
+def test_limit_ties_keep_earliest():
+    merger = Merger(limit=2)
+    merger.add(posts(5, source='a'))
+    merger.add(posts(5, source='b'))
+    merger.add(posts(5, source='c'))
+    assert [p['source'] for p in merger.merged()] == ['a', 'b']
+
+
+def test_custom_key():
+    merger = Merger(key=lambda p: p['score'], limit=2)
+    merger.add([{'score': 1}, {'score': 4}, {'score': 3}])
+    assert [p['score'] for p in merger.merged()] == [4, 3]
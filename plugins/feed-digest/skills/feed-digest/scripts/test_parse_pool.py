@@ -0,0 +1,53 @@
+"""Tests for --parse-workers: parsing in worker processes matches parsing on the fetch threads."""
+
+import asyncio
+import time
+
+import pytest
+
+from conftest import rss
+from fetch_feeds import fetch_all_feeds, fetch_all_feeds_async, start_parse_pool
+from keyword_filter import KeywordFilter
+
+NOW = int(time.time())
+ITEMS = [(f'{topic} update {i}', NOW - i * 3600)
+         for i, topic in enumerate(['Rust', 'Python', 'Go', 'Rust', 'Zig'] * 4)]
+
+
+@pytest.fixture(scope='module')
+def parse_pool():
+    pool = start_parse_pool(2)
+    yield pool
+    pool.shutdown()
+
+
+def comparable(digest):
+    posts = [dict(p) for p in digest['posts']]
+    feeds = [{k: r.get(k) for k in ('url', 'success', 'post_count', 'truncated', 'stopped_early')}
+             for r in digest['feed_results']]
+    return posts, sorted(feeds, key=lambda r: r['url'])
+
+
+@pytest.mark.parametrize('window', [
+    {},
+    {'max_items': 5},
+    {'since': NOW - 6 * 3600},
+    {'matcher': KeywordFilter(['rust'])},
+    {'max_bytes': 1200},
+])
+@pytest.mark.parametrize('use_async', [False, True])
+def test_parse_pool_matches_threads(feed_server, parse_pool, window, use_async):
+    feeds = [{'url': feed_server.add(f'/feed{i}.xml', rss(ITEMS[i::2], extra='<ttl>60</ttl>')),
+              'name': f'Feed {i}'} for i in range(2)]
+
+    def run(pool):
+        if use_async:
+            return asyncio.run(fetch_all_feeds_async(feeds, use_cache=False, parse_pool=pool,
+                                                     **window))
+        return fetch_all_feeds(feeds, use_cache=False, parse_pool=pool, **window)
+
+    inline, pooled = run(None), run(parse_pool)
+    assert inline['total_posts'] > 0
+    if 'max_bytes' in window:
+        assert all(r.get('truncated') for r in inline['feed_results'])
+    assert comparable(pooled) == comparable(inline)
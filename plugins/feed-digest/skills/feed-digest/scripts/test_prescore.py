@@ -0,0 +1,95 @@
+"""Tests for prescore.py: lexicon matching, dimensions and the keep thresholds."""
+
+import json
+
+import pytest
+
+from dates import format_utc
+from prescore import DEFAULT_MIN_PRESCORE, Lexicon, PreScorer, apply_prescore, load_lexicon
+
+NOW = 1717243200  # 2024-06-01T12:00:00Z
+DAY = 86400
+
+GOOD = {'title': 'Anthropic released a new Claude model for developers',
+        'description': 'A deep dive into the release: benchmarks, pricing and what changed '
+                       'for agent builders compared to the previous generation.',
+        'timestamp': NOW - 3600}
+AVERAGE = {'title': 'Notes from a weekend trip', 'description': 'Photos and a short diary.',
+           'timestamp': NOW - 10 * DAY}
+SPAM = {'title': '震惊！明星八卦竟然这样', 'description': '', 'timestamp': NOW - 120 * DAY}
+
+
+def fresh(*posts):
+    return [dict(p) for p in posts]
+
+
+def test_lexicon_matching():
+    lexicon = Lexicon({'relevance': {'ai': 10, 'open source': 9, '大模型': 10, 'c++': 8}})
+    assert lexicon.scan('AI weekly') == {'relevance': [10]}
+    assert lexicon.scan('he said so') == {}
+    assert lexicon.scan('an open source compiler') == {'relevance': [9]}
+    assert lexicon.scan('开源大模型发布') == {'relevance': [10]}
+    assert lexicon.scan('modern c++ tips') == {'relevance': [8]}
+
+
+def test_dimensions():
+    scorer = PreScorer(now=NOW)
+    dims = scorer.dimensions(fresh(GOOD, SPAM))
+    assert dims['relevance'][0] == 10
+    assert dims['timeliness'][0] > 7.9
+    # No value terms (5) and no description (-1).
+    assert dims['value'][1] == 4
+    assert dims['timeliness'][1] == 1
+    assert dims['readability'][1] == 3
+
+
+def test_timeliness_curve_and_breaking_news():
+    scorer = PreScorer(now=NOW)
+    day_old = {'title': 'Changelog', 'description': 'x', 'timestamp': NOW - DAY}
+    breaking = {'title': 'Zero-day in the kernel', 'description': 'x',
+                'timestamp': NOW - 2 * DAY}
+    undated = {'title': 'Changelog', 'description': 'x', 'pub_date': 'sometime'}
+    assert list(scorer.dimensions([day_old, breaking, undated])['timeliness']) == [7.0, 10.0, 4.0]
+
+
+def test_engagement_raises_value():
+    scorer = PreScorer(now=NOW)
+    quiet = {'title': 'Question about lifetimes', 'description': 'x', 'timestamp': NOW}
+    busy = {**quiet, 'reactions': 80, 'comments': 19}
+    quiet_value, busy_value = scorer.dimensions([quiet, busy])['value']
+    assert busy_value == pytest.approx(quiet_value + 3.0)
+
+
+def test_min_prescore_threshold():
+    result = {'fetched_at': format_utc(NOW), 'total_posts': 3, 'posts': fresh(GOOD, AVERAGE, SPAM)}
+    apply_prescore(result, DEFAULT_MIN_PRESCORE)
+    assert [p['title'] for p in result['posts']] == [GOOD['title'], AVERAGE['title']]
+    assert result['posts'][0]['prescore'] > 8
+    assert result['prescore'] == {'min': DEFAULT_MIN_PRESCORE, 'top_k': None,
+                                  'kept': 2, 'dropped': 1}
+    assert result['total_posts'] == 2
+
+
+def test_top_k_keeps_best_first():
+    result = {'fetched_at': format_utc(NOW), 'posts': fresh(SPAM, AVERAGE, GOOD)}
+    apply_prescore(result, top_k=2)
+    assert [p['title'] for p in result['posts']] == [GOOD['title'], AVERAGE['title']]
+    assert result['prescore']['dropped'] == 1
+
+
+def test_scores_are_relative_to_fetch_time():
+    posts = fresh(GOOD)
+    apply_prescore({'fetched_at': format_utc(NOW), 'posts': posts})
+    later = fresh(GOOD)
+    apply_prescore({'fetched_at': format_utc(NOW + 60 * DAY), 'posts': later})
+    assert later[0]['prescore'] < posts[0]['prescore']
+
+
+def test_custom_lexicon(tmp_path):
+    path = tmp_path / 'lexicon.json'
+    path.write_text(json.dumps({'relevance': {'Weekend': 9}}))
+    lexicon = load_lexicon(str(path))
+    assert lexicon['relevance']['weekend'] == 9
+    assert lexicon['relevance']['ai'] == 10
+    dims = PreScorer(lexicon, NOW).dimensions(fresh(AVERAGE))
+    assert dims['relevance'][0] == 9
@@ -0,0 +1,110 @@
+"""Tests for schedule.py and the --due-only path in fetch_feeds.py."""
+
+import time
+
+import pytest
+
+from conftest import rss
+from fetch_feeds import fetch_all_feeds
+from schedule import MAX_INTERVAL, MIN_INTERVAL, FeedSchedule, cadence, ttl_seconds, update_period_seconds
+
+NOW = int(time.time())
+HOURLY = [(f'Post {i}', NOW - i * 3600) for i in range(5)]
+DAILY = [(f'Post {i}', NOW - i * 86400) for i in range(5)]
+
+
+def test_cadence():
+    assert cadence([300, 100, 200, 200]) == 100
+    assert cadence([100]) is None
+
+
+def test_hints():
+    assert ttl_seconds(' 60 ') == 3600
+    assert ttl_seconds('0') is None
+    assert update_period_seconds('daily', '2') == 43200
+    assert update_period_seconds('sometimes') is None
+
+
+def test_interval_is_half_the_cadence_within_bounds(tmp_path):
+    schedule = FeedSchedule(str(tmp_path / 'schedule.json'), due_only=True)
+    schedule.record('a', [NOW - i * 4 * 3600 for i in range(5)], now=NOW)
+    assert schedule.next_due('a') == NOW + 2 * 3600
+    assert not schedule.is_due('a', now=NOW + 3600)
+    assert schedule.is_due('a', now=NOW + 2 * 3600)
+
+    schedule.record('fast', [NOW - i * 60 for i in range(5)], now=NOW)
+    assert schedule.next_due('fast') == NOW + MIN_INTERVAL
+    schedule.record('slow', [NOW - i * 30 * 86400 for i in range(5)], now=NOW)
+    assert schedule.next_due('slow') == NOW + MAX_INTERVAL
+
+    assert schedule.next_due('never') is None
+    assert schedule.is_due('never')
+
+
+def test_hint_only_applies_when_honored(tmp_path):
+    timestamps = [NOW - i * 3600 for i in range(5)]
+    loose = FeedSchedule(str(tmp_path / 'a.json'))
+    loose.record('a', timestamps, hint=6 * 3600, now=NOW)
+    strict = FeedSchedule(str(tmp_path / 'b.json'), honor_hints=True)
+    strict.record('a', timestamps, hint=6 * 3600, now=NOW)
+    assert loose.next_due('a') == NOW + MIN_INTERVAL
+    assert strict.next_due('a') == NOW + 6 * 3600
+
+
+def test_everything_is_due_without_due_only(tmp_path):
+    schedule = FeedSchedule(str(tmp_path / 'schedule.json'))
+    schedule.record('a', [NOW - i * 86400 for i in range(5)], now=NOW)
+    assert schedule.is_due('a', now=NOW)
+
+
+def test_failures_and_not_due_results_are_not_fetches(tmp_path):
+    schedule = FeedSchedule(str(tmp_path / 'schedule.json'))
+    schedule.record_result('a', {'success': False, 'posts': []})
+    schedule.record_result('a', {'success': True, 'not_due': True, 'posts': []})
+    assert schedule.next_due('a') is None
+
+
+def test_save_merges_with_file(tmp_path):
+    path = str(tmp_path / 'schedule.json')
+    first, second = FeedSchedule(path), FeedSchedule(path)
+    first.record('a', [NOW], now=NOW)
+    second.record('b', [NOW], now=NOW)
+    first.save()
+    second.save()
+    assert set(FeedSchedule(path).feeds) == {'a', 'b'}
+
+
+@pytest.mark.parametrize('etag', ['"v1"', None])
+def test_due_only_serves_cached_posts(cache_dir, feed_server, tmp_path, etag):
+    feeds = [{'url': feed_server.add('/feed.xml', rss(DAILY), etag=etag), 'name': 'Daily'}]
+    schedule = FeedSchedule(str(tmp_path / 'schedule.json'), due_only=True)
+
+    first = fetch_all_feeds(feeds, schedule=schedule)
+    assert first['total_posts'] == 5
+    second = fetch_all_feeds(feeds, schedule=schedule)
+    assert second['not_due_feeds'] == 1
+    assert second['total_posts'] == 5
+    assert second['feed_results'][0]['cache'] == 'not_due'
+    assert feed_server.hits['/feed.xml'] == 1
+
+
+def test_due_only_without_cache_skips_feeds_not_due(feed_server, tmp_path):
+    feeds = [{'url': feed_server.add('/feed.xml', rss(DAILY)), 'name': 'Daily'}]
+    schedule = FeedSchedule(str(tmp_path / 'schedule.json'), due_only=True)
+
+    fetch_all_feeds(feeds, use_cache=False, schedule=schedule)
+    second = fetch_all_feeds(feeds, use_cache=False, schedule=schedule)
+    assert second['not_due_feeds'] == 1
+    assert second['total_posts'] == 0
+    assert feed_server.hits['/feed.xml'] == 1
+
+
+def test_due_feeds_are_fetched(cache_dir, feed_server, tmp_path):
+    feeds = [{'url': feed_server.add('/feed.xml', rss(HOURLY)), 'name': 'Hourly'}]
+    schedule = FeedSchedule(str(tmp_path / 'schedule.json'), due_only=True)
+
+    fetch_all_feeds(feeds, schedule=schedule)
+    schedule.feeds[feeds[0]['url']]['last_fetch'] -= MIN_INTERVAL
+    again = fetch_all_feeds(feeds, schedule=schedule)
+    assert 'not_due_feeds' not in again
+    assert feed_server.hits['/feed.xml'] == 2
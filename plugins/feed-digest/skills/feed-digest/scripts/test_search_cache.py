@@ -0,0 +1,61 @@
+"""Tests for search_cache.py: TTLs, --refresh and LRU eviction."""
+
+import time
+
+import pytest
+
+from search_cache import DEFAULT_TTLS, SearchCache
+
+RESPONSE = {'results': [{'title': 'Rust 1.80', 'url': 'https://example.com/rust'}]}
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [time.time()]
+    monkeypatch.setattr(time, 'time', lambda: now[0])
+    return now
+
+
+def test_hit_within_ttl_and_miss_after(tmp_path, clock):
+    with SearchCache(str(tmp_path / 'search.db')) as cache:
+        cache.put('hackernews', 'Rust  Release', 10, RESPONSE)
+        assert cache.get('hackernews', 'rust release', 10) == RESPONSE
+        assert cache.get('hackernews', 'rust release', 20) is None
+        assert cache.get('hackernews', 'rust release', 10, site='lobste.rs') is None
+
+        clock[0] += DEFAULT_TTLS['hackernews'] + 1
+        assert cache.get('hackernews', 'rust release', 10) is None
+
+
+def test_ttl_is_per_adapter(tmp_path, clock):
+    with SearchCache(str(tmp_path / 'search.db'), ttls={'exa': 60}) as cache:
+        cache.put('exa', 'rust', 10, RESPONSE)
+        cache.put('tavily', 'rust', 10, RESPONSE)
+        clock[0] += 120
+        assert cache.get('exa', 'rust', 10) is None
+        assert cache.get('tavily', 'rust', 10) == RESPONSE
+
+
+def test_refresh_misses_but_stores(tmp_path):
+    path = str(tmp_path / 'search.db')
+    with SearchCache(path) as cache:
+        cache.put('exa', 'rust', 10, {'results': []})
+    with SearchCache(path, refresh=True) as cache:
+        assert cache.get('exa', 'rust', 10) is None
+        cache.put('exa', 'rust', 10, RESPONSE)
+    with SearchCache(path) as cache:
+        assert cache.get('exa', 'rust', 10) == RESPONSE
+
+
+def test_least_recently_used_is_evicted(tmp_path, clock):
+    size = len('{"n": 0}')
+    with SearchCache(str(tmp_path / 'search.db'), max_bytes=2 * size) as cache:
+        for n in range(2):
+            cache.put('exa', f'q{n}', 10, {'n': n})
+            clock[0] += 1
+        assert cache.get('exa', 'q0', 10) == {'n': 0}
+        clock[0] += 1
+        cache.put('exa', 'q2', 10, {'n': 2})
+        assert cache.get('exa', 'q1', 10) is None
+        assert cache.get('exa', 'q0', 10) == {'n': 0}
+        assert cache.get('exa', 'q2', 10) == {'n': 2}
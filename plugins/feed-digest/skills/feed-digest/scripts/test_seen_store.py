@@ -0,0 +1,59 @@
+"""Tests for seen_store.py: URL normalization and --incremental runs."""
+
+from seen_store import SeenStore, apply_incremental, normalize_url, post_key
+
+
+def post(link, title='Post', source='Feed'):
+    return {'link': link, 'title': title, 'source': source}
+
+
+def test_normalize_url():
+    canonical = normalize_url('https://example.com/a/b')
+    assert normalize_url('http://www.Example.com:80/a/b/#top') == canonical
+    assert normalize_url('https://example.com/a/b?utm_source=rss&fbclid=x') == canonical
+    assert normalize_url('https://example.com/a?y=2&x=1') == 'example.com/a?x=1&y=2'
+    assert normalize_url('https://example.com:8443/a') != normalize_url('https://example.com/a')
+    assert normalize_url(None) == ''
+
+
+def test_post_key_falls_back_to_source_and_title():
+    assert post_key(post('')) == 'Feed\x00Post'
+    assert post_key(post('https://example.com/x')) == 'example.com/x'
+
+
+def test_unseen_does_not_record(tmp_path):
+    path = str(tmp_path / 'seen.db')
+    posts = [post('https://example.com/1'), post('https://www.example.com/1/'),
+             post('https://example.com/2')]
+    with SeenStore(path) as store:
+        assert store.unseen(posts) == [posts[0], posts[2]]
+        assert store.unseen(posts) == [posts[0], posts[2]]
+        store.mark(posts[:1])
+        assert store.unseen(posts) == [posts[2]]
+    with SeenStore(path) as store:
+        assert store.unseen(posts) == [posts[2]]
+
+
+def test_apply_incremental(tmp_path):
+    path = str(tmp_path / 'seen.db')
+    first = {'posts': [post('https://example.com/1'), post('https://example.com/2')]}
+    apply_incremental(first, path)
+    assert first['incremental'] == {'new': 2, 'already_seen': 0}
+
+    second = {'posts': [post('https://example.com/2'), post('https://example.com/3')]}
+    apply_incremental(second, path)
+    assert [p['link'] for p in second['posts']] == ['https://example.com/3']
+    assert second['total_posts'] == 1
+    assert second['incremental'] == {'new': 1, 'already_seen': 1}
+
+
+def test_pruned_posts_stay_unseen(tmp_path):
+    path = str(tmp_path / 'seen.db')
+    posts = [post('https://example.com/1'), post('https://example.com/2')]
+
+    def keep_first(result):
+        result['posts'] = result['posts'][:1]
+
+    apply_incremental({'posts': list(posts)}, path, prune=keep_first)
+    later = apply_incremental({'posts': list(posts)}, path)
+    assert [p['link'] for p in later['posts']] == ['https://example.com/2']
@@ -0,0 +1,164 @@
+"""Tests for transport.py: streamed chunks, gzip decoding, max_bytes, pooling and redirects."""
+
+import asyncio
+import gzip
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+import pytest
+
+import transport
+from transport import BodyTooLarge, Response
+
+PLAIN = bytes(range(256)) * 1024                 # 256 KiB
+BOMB = gzip.compress(b'\0' * (8 * 1024 * 1024))  # 8 MiB of zeros, ~8 KiB on the wire
+
+
+class Handler(BaseHTTPRequestHandler):
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        if self.path == '/gzip':
+            body, headers = BOMB, {'Content-Encoding': 'gzip'}
+        else:
+            body, headers = PLAIN, {}
+        self.send_response(200)
+        for name, value in headers.items():
+            self.send_header(name, value)
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def server(monkeypatch):
+    monkeypatch.setattr(transport, 'proxy_for', lambda url: None)
+    httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+    httpd.daemon_threads = True
+    threading.Thread(target=httpd.serve_forever, daemon=True).start()
+    yield f'http://127.0.0.1:{httpd.server_port}'
+    transport.close_all()
+    httpd.shutdown()
+    httpd.server_close()
+
+
+def idle_connections():
+    return sum(len(idle) for idle in transport._pool.values())
+
+
+def test_iter_chunks_streams_whole_body(server):
+    response = transport.request(f'{server}/plain', stream=True)
+    chunks = list(response.iter_chunks(chunk_size=16 * 1024))
+    assert b''.join(chunks) == PLAIN
+    assert max(map(len, chunks)) <= 16 * 1024
+    assert idle_connections() == 1
+
+
+def test_gzip_is_decoded_in_bounded_chunks(server):
+    response = transport.request(f'{server}/gzip', stream=True)
+    total = 0
+    for chunk in response.iter_chunks(chunk_size=64 * 1024):
+        assert len(chunk) <= 64 * 1024
+        total += len(chunk)
+    assert total == 8 * 1024 * 1024
+
+
+@pytest.mark.parametrize('path', ['/plain', '/gzip'])
+def test_max_bytes_stops_reading(server, path):
+    response = transport.request(f'{server}{path}', stream=True, max_bytes=100_000)
+    received = []
+    with pytest.raises(BodyTooLarge):
+        for chunk in response.iter_chunks():
+            received.append(chunk)
+    assert sum(map(len, received)) == 100_000
+    assert response.truncated
+    # A connection left mid-body is dropped, not pooled.
+    assert idle_connections() == 0
+
+
+def test_max_bytes_with_eager_read(server):
+    with pytest.raises(BodyTooLarge):
+        transport.request(f'{server}/plain', max_bytes=1000)
+    assert len(transport.request(f'{server}/plain', max_bytes=len(PLAIN)).body) == len(PLAIN)
+
+
+def test_buffered_body_respects_max_bytes():
+    response = Response('https://example.com/', 200, {}, body=b'x' * 10, max_bytes=4)
+    with pytest.raises(BodyTooLarge):
+        list(response.iter_chunks())
+    assert response.truncated
+    assert b''.join(Response('https://example.com/', 200, {}, body=b'abc').iter_chunks()) == b'abc'
+
+
+class RedirectHandler(BaseHTTPRequestHandler):
+    """/to?<url> redirects to url; every path records the headers it got."""
+    protocol_version = 'HTTP/1.1'
+
+    def do_GET(self):
+        self.server.seen.append(dict(self.headers))
+        if self.path.startswith('/to?'):
+            self.send_response(302)
+            self.send_header('Location', self.path[len('/to?'):])
+            self.send_header('Content-Length', '0')
+            self.end_headers()
+            return
+        self.send_response(200)
+        self.send_header('Content-Length', '2')
+        self.end_headers()
+        self.wfile.write(b'ok')
+
+    def log_message(self, format, *args):
+        pass
+
+
+@pytest.fixture
+def hosts(monkeypatch):
+    """Two servers on different loopback addresses, so on different hosts."""
+    monkeypatch.setattr(transport, 'proxy_for', lambda url: None)
+    servers = []
+    for address in ('127.0.0.1', '127.0.0.2'):
+        httpd = ThreadingHTTPServer((address, 0), RedirectHandler)
+        httpd.daemon_threads = True
+        httpd.seen = []
+        threading.Thread(target=httpd.serve_forever, daemon=True).start()
+        servers.append(httpd)
+    yield [(f'http://{s.server_address[0]}:{s.server_port}', s.seen) for s in servers]
+    transport.close_all()
+    for httpd in servers:
+        httpd.shutdown()
+        httpd.server_close()
+
+
+SECRETS = {'Authorization': 'token SECRET', 'X-API-Key': 'KEY', 'Cookie': 'session=1'}
+
+
+def fetch_sync(url):
+    return transport.request(url, headers=SECRETS).body
+
+
+def fetch_async(url):
+    async def run():
+        async with transport.AsyncClient() as client:
+            return (await client.request(url, headers=SECRETS)).body
+    return asyncio.run(run())
+
+
+@pytest.mark.parametrize('fetch', [fetch_sync, fetch_async])
+def test_cross_host_redirect_drops_credentials(hosts, fetch):
+    (origin, origin_seen), (other, other_seen) = hosts
+    assert fetch(f'{origin}/to?{other}/landing') == b'ok'
+    assert origin_seen[0]['Authorization'] == 'token SECRET'
+    assert other_seen, 'redirect was not followed'
+    for name in SECRETS:
+        assert name not in other_seen[0]
+
+
+@pytest.mark.parametrize('fetch', [fetch_sync, fetch_async])
+def test_same_host_redirect_keeps_credentials(hosts, fetch):
+    (origin, origin_seen), _ = hosts
+    assert fetch(f'{origin}/to?/landing') == b'ok'
+    assert origin_seen[1]['Authorization'] == 'token SECRET'
+    assert origin_seen[1]['X-API-Key'] == 'KEY'
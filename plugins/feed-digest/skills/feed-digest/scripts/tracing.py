@@ -0,0 +1,253 @@
+"""
+Per-source timing breakdown and Chrome trace output.
+
+Each fetched source (a feed, a GitHub repo, a search engine or site) runs in
+a source() scope that adds up the time spent in each phase:
+
+    queue     waiting for a worker thread or concurrency slot
+    dns       name resolution (cache misses only)
+    connect   TCP connect (with asyncio this includes the TLS handshake)
+    tls       TLS handshake
+    ttfb      request sent until the response headers arrived
+    download  reading and decompressing the body
+    parse     XML / JSON parsing
+    dates     date normalization
+    build     building posts from parsed entries
+
+Phases are exclusive: time in a nested phase (download while a streaming
+parse pulls chunks) is not counted again in the enclosing one. The summary
+also has total_ms (from leaving the queue to done) and counters such as
+bytes and items, and lands in the source's feed_results / repo_results /
+engines / sites entry as `timings`.
+
+With start_trace() every span is also recorded as a Chrome trace event
+(one track per source, top-level stages on the `main` track); save_trace()
+writes a file viewable in chrome://tracing or https://ui.perfetto.dev.
+"""
+
+import os
+import json
+import threading
+import time
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+PHASES = ('queue', 'dns', 'connect', 'tls', 'ttfb', 'download', 'parse', 'dates', 'build')
+
+_scope = ContextVar('tracing_scope', default=None)
+# Open spans of this thread/task; each frame collects time spent in nested spans.
+_stack = ContextVar('tracing_stack', default=None)
+_queued_at = ContextVar('tracing_queued_at', default=None)
+_trace = None
+
+
+class Trace:
+    """Chrome trace events (JSON object format) of one run."""
+
+    def __init__(self):
+        self.origin = time.perf_counter()
+        self.pid = os.getpid()
+        self.events = []
+        self._lock = threading.Lock()
+        self._tracks = 0
+        self.track('main')
+
+    def track(self, name):
+        """Allocate a new track (a `thread` in the viewer) and return its id."""
+        with self._lock:
+            tid = self._tracks
+            self._tracks += 1
+            self.events.append({'name': 'thread_name', 'ph': 'M', 'pid': self.pid, 'tid': tid,
+                                'args': {'name': name}})
+            self.events.append({'name': 'thread_sort_index', 'ph': 'M', 'pid': self.pid,
+                                'tid': tid, 'args': {'sort_index': tid}})
+        return tid
+
+    def complete(self, name, category, start, end, tid, args=None):
+        event = {
+            'name': name,
+            'cat': category,
+            'ph': 'X',
+            'ts': round((start - self.origin) * 1e6, 1),
+            'dur': round((end - start) * 1e6, 1),
+            'pid': self.pid,
+            'tid': tid,
+        }
+        if args:
+            event['args'] = args
+        with self._lock:
+            self.events.append(event)
+
+    def save(self, path):
+        with open(path, 'w', encoding='utf-8') as f:
+            json.dump({'traceEvents': self.events, 'displayTimeUnit': 'ms'}, f, ensure_ascii=False)
+
+
+class Source:
+    """Phase times (seconds) and counters of one source."""
+
+    def __init__(self, label, kind):
+        self.label = label
+        self.kind = kind
+        self.phases = {}
+        self.counts = {}
+        self.total = None
+        self.tid = _trace.track(f'{kind}: {label}') if _trace else 0
+        self._lock = threading.Lock()
+
+    def add(self, phase, seconds):
+        with self._lock:
+            self.phases[phase] = self.phases.get(phase, 0.0) + seconds
+
+    def count(self, name, n):
+        with self._lock:
+            self.counts[name] = self.counts.get(name, 0) + n
+
+    def summary(self):
+        """Milliseconds per phase (in PHASES order) plus counters."""
+        summary = {}
+        if self.total is not None:
+            summary['total_ms'] = round(self.total * 1000, 1)
+        ordered = [p for p in PHASES if p in self.phases]
+        ordered += sorted(set(self.phases) - set(PHASES))
+        for phase in ordered:
+            summary[f'{phase}_ms'] = round(self.phases[phase] * 1000, 1)
+        summary.update(self.counts)
+        return summary
+
+
+def start_trace():
+    """Record Chrome trace events from now on."""
+    global _trace
+    _trace = Trace()
+    return _trace
+
+
+def save_trace(path):
+    """Write the trace started by start_trace() to path (no-op if none)."""
+    if _trace is not None:
+        _trace.save(path)
+
+
+def _account(phase, inclusive, exclusive):
+    scope = _scope.get()
+    if scope is not None:
+        scope.add(phase, exclusive)
+    stack = _stack.get()
+    if stack:
+        stack[-1][0] += inclusive
+
+
+def add(phase, seconds):
+    """Count time measured by the caller towards phase of the current source."""
+    _account(phase, seconds, seconds)
+
+
+def count(name, n=1):
+    """Add n to a counter (bytes, items, ...) of the current source."""
+    scope = _scope.get()
+    if scope is not None:
+        scope.count(name, n)
+
+
+def merge(phases, counts=None):
+    """
+    Add phase times (seconds) and counters measured elsewhere, such as in a
+    worker process, to the current source as if they were measured here.
+    """
+    for phase, seconds in phases.items():
+        add(phase, seconds)
+    for name, n in (counts or {}).items():
+        count(name, n)
+
+
+@contextmanager
+def span(phase, **args):
+    """Time a block as `phase` of the current source (or a `main` track stage)."""
+    stack = _stack.get()
+    if stack is None:
+        stack = []
+        _stack.set(stack)
+    frame = [0.0]
+    stack.append(frame)
+    start = time.perf_counter()
+    try:
+        yield
+    finally:
+        end = time.perf_counter()
+        stack.pop()
+        _account(phase, end - start, end - start - frame[0])
+        if _trace is not None:
+            scope = _scope.get()
+            _trace.complete(phase, scope.kind if scope else 'run', start, end,
+                            scope.tid if scope else 0, args)
+
+
+@contextmanager
+def source(label, kind):
+    """
+    Scope in which spans count towards one source; yields its Source.
+
+    Time since the enclosing queued() / mark_queued() call is recorded as
+    the queue phase.
+    """
+    scope = Source(label, kind)
+    start = time.perf_counter()
+    queued_at = _queued_at.get()
+    if queued_at is not None:
+        scope.add('queue', start - queued_at)
+        if _trace is not None:
+            _trace.complete('queue', kind, queued_at, start, scope.tid)
+    tokens = (_scope.set(scope), _stack.set([]), _queued_at.set(None))
+    try:
+        yield scope
+    finally:
+        end = time.perf_counter()
+        scope.total = end - start
+        for var, token in zip((_scope, _stack, _queued_at), tokens):
+            var.reset(token)
+        if _trace is not None:
+            _trace.complete(label, kind, start, end, scope.tid, scope.summary())
+
+
+def queued(function):
+    """Wrap function for a thread pool so its source() records the queue wait."""
+    submitted = time.perf_counter()
+
+    def run(*args, **kwargs):
+        token = _queued_at.set(submitted)
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _queued_at.reset(token)
+    return run
+
+
+def mark_queued():
+    """asyncio counterpart of queued(): call when the task is created."""
+    _queued_at.set(time.perf_counter())
+
+
+def propagate(function):
+    """Wrap function to run on another thread inside the caller's source."""
+    scope = _scope.get()
+
+    def run(*args, **kwargs):
+        tokens = (_scope.set(scope), _stack.set([]))
+        try:
+            return function(*args, **kwargs)
+        finally:
+            _scope.reset(tokens[0])
+            _stack.reset(tokens[1])
+    return run
+
+
+def traced(label, kind, function):
+    """Wrap a function returning a result dict to run as a source with `timings`."""
+    def run(*args, **kwargs):
+        with source(label, kind) as scope:
+            result = function(*args, **kwargs)
+        if isinstance(result, dict):
+            result['timings'] = scope.summary()
+        return result
+    return run
@@ -0,0 +1,740 @@
+"""
+Shared HTTP transport for the feed-digest scripts.
+
+Replaces one curl subprocess per request with in-process connections:
+- keep-alive connections pooled per (scheme, host, port, proxy)
+- gzip/deflate transfer compression, decoded incrementally in bounded
+  pieces, with an optional cap on the decoded body size (max_bytes)
+- DNS results cached for DNS_TTL seconds
+- proxies from http_proxy/https_proxy/all_proxy/no_proxy (and the OS proxy
+  settings on macOS/Windows), same as curl. TUN-mode proxies need nothing.
+  SOCKS proxies are not supported by the stdlib, so those requests fall back
+  to curl.
+"""
+
+import asyncio
+import json
+import socket
+import ssl
+import re
+import subprocess
+import tempfile
+import threading
+import time
+import zlib
+import http.client
+import urllib.request
+from base64 import b64encode
+from functools import lru_cache
+from urllib.parse import urlsplit, urljoin, unquote
+
+import tracing
+
+CONNECT_TIMEOUT = 15
+MAX_TIME = 30
+MAX_REDIRECTS = 10
+MAX_IDLE_PER_HOST = 8
+DNS_TTL = 300
+CHUNK_SIZE = 64 * 1024
+USER_AGENT = 'Mozilla/5.0 (compatible; feed-digest/1.1)'
+
+REDIRECT_STATUSES = (301, 302, 303, 307, 308)
+# Credentials that only go back to the host they were meant for (lowercase).
+CREDENTIAL_HEADERS = frozenset({'authorization', 'proxy-authorization', 'cookie', 'x-api-key'})
+# Errors that mean a pooled keep-alive connection was closed by the server
+# while idle; the request is retried once on a fresh connection.
+STALE_CONNECTION_ERRORS = (
+    http.client.RemoteDisconnected,
+    http.client.BadStatusLine,
+    ConnectionResetError,
+    BrokenPipeError,
+)
+
+_pool = {}
+_pool_lock = threading.Lock()
+_dns_cache = {}
+_dns_lock = threading.Lock()
+
+
+# =============================================================================
+# Connection management
+# =============================================================================
+
+@lru_cache(maxsize=1)
+def _ssl_context():
+    return ssl.create_default_context()
+
+
+@lru_cache(maxsize=1)
+def _proxies():
+    return urllib.request.getproxies()
+
+
+def proxy_for(url):
+    """Return the proxy URL to use for url, or None for a direct connection."""
+    parts = urlsplit(url)
+    proxies = _proxies()
+    if not proxies or urllib.request.proxy_bypass(parts.hostname or ''):
+        return None
+    return proxies.get(parts.scheme) or proxies.get('all')
+
+
+def _resolve(host, port):
+    """getaddrinfo with a small TTL cache shared by all connections."""
+    key = (host, port)
+    now = time.monotonic()
+    with _dns_lock:
+        cached = _dns_cache.get(key)
+        if cached and cached[0] > now:
+            return cached[1]
+    with tracing.span('dns', host=host):
+        infos = socket.getaddrinfo(host, port, 0, socket.SOCK_STREAM)
+    with _dns_lock:
+        _dns_cache[key] = (now + DNS_TTL, infos)
+    return infos
+
+
+def _create_connection(address, timeout=CONNECT_TIMEOUT, source_address=None, *args, **kwargs):
+    """Drop-in for socket.create_connection that uses the DNS cache."""
+    host, port = address[0], address[1]
+    last_error = None
+    for family, socktype, proto, _, sockaddr in _resolve(host, port):
+        sock = socket.socket(family, socktype, proto)
+        try:
+            if timeout is not None:
+                sock.settimeout(timeout)
+            if source_address:
+                sock.bind(source_address)
+            with tracing.span('connect', host=host):
+                sock.connect(sockaddr)
+            return sock
+        except OSError as e:
+            last_error = e
+            sock.close()
+    raise last_error or OSError(f"could not resolve {host}")
+
+
+class _HTTPSConnection(http.client.HTTPSConnection):
+    """HTTPSConnection with the TLS handshake timed separately from TCP connect."""
+
+    def connect(self):
+        http.client.HTTPConnection.connect(self)
+        server_hostname = self._tunnel_host or self.host
+        with tracing.span('tls', host=server_hostname):
+            self.sock = self._context.wrap_socket(self.sock, server_hostname=server_hostname)
+
+
+def _new_connection(scheme, host, port, proxy):
+    if proxy:
+        proxy_parts = urlsplit(proxy)
+        proxy_host = proxy_parts.hostname
+        proxy_port = proxy_parts.port or 8080
+        proxy_headers = {}
+        if proxy_parts.username:
+            credentials = f"{unquote(proxy_parts.username)}:{unquote(proxy_parts.password or '')}"
+            proxy_headers['Proxy-Authorization'] = 'Basic ' + b64encode(credentials.encode()).decode()
+        if scheme == 'https':
+            conn = _HTTPSConnection(proxy_host, proxy_port, timeout=CONNECT_TIMEOUT,
+                                    context=_ssl_context())
+            conn.set_tunnel(host, port, headers=proxy_headers)
+        else:
+            conn = http.client.HTTPConnection(proxy_host, proxy_port, timeout=CONNECT_TIMEOUT)
+        conn.proxy_headers = {} if scheme == 'https' else proxy_headers
+    elif scheme == 'https':
+        conn = _HTTPSConnection(host, port, timeout=CONNECT_TIMEOUT, context=_ssl_context())
+    else:
+        conn = http.client.HTTPConnection(host, port, timeout=CONNECT_TIMEOUT)
+    conn._create_connection = _create_connection
+    conn.reused = False
+    return conn
+
+
+def _acquire(key):
+    """Take an idle connection for key from the pool, or open a new one."""
+    with _pool_lock:
+        idle = _pool.get(key)
+        if idle:
+            conn = idle.pop()
+            conn.reused = True
+            return conn
+    return _new_connection(*key)
+
+
+def _release(key, conn):
+    """Return a connection to the pool for reuse."""
+    with _pool_lock:
+        idle = _pool.setdefault(key, [])
+        if len(idle) < MAX_IDLE_PER_HOST:
+            idle.append(conn)
+            return
+    conn.close()
+
+
+def close_all():
+    """Close every pooled connection."""
+    with _pool_lock:
+        conns = [c for idle in _pool.values() for c in idle]
+        _pool.clear()
+    for conn in conns:
+        conn.close()
+
+
+# =============================================================================
+# Responses
+# =============================================================================
+
+class BodyTooLarge(Exception):
+    """The body ran past max_bytes; the bytes up to the cap were delivered first."""
+
+class Response:
+    """
+    HTTP response with a lazily-read, transparently decompressed body.
+
+    With stream=True the body is consumed through iter_chunks(); otherwise it
+    is read eagerly and available as .body. The underlying connection goes
+    back to the pool once the body has been read to the end.
+
+    With max_bytes set, at most that many decoded bytes are delivered: the
+    read stops there, the connection is dropped and BodyTooLarge is raised,
+    so an oversized (or decompression-bomb) body never sits in memory whole.
+    """
+
+    def __init__(self, url, status, headers, raw=None, body=None, release=None, deadline=None,
+                 max_bytes=None, truncated=False, sock=None):
+        self.url = url
+        self.status = status
+        self.headers = headers
+        self.max_bytes = max_bytes
+        # A buffered body that was already cut short on the wire.
+        self.truncated = truncated
+        self._raw = raw
+        self._body = body
+        self._release = release
+        self._deadline = deadline
+        # Socket under raw, whose timeout is kept at the time left before the deadline.
+        self._sock = sock
+
+    def _decoder(self):
+        encoding = (self.headers.get('Content-Encoding') or '').lower()
+        if encoding in ('gzip', 'x-gzip', 'deflate'):
+            # 32 + MAX_WBITS auto-detects gzip and zlib framing.
+            return zlib.decompressobj(32 + zlib.MAX_WBITS)
+        return None
+
+    def _decoded_chunks(self, chunk_size):
+        """Decoded body pieces of at most chunk_size bytes, however well it compresses."""
+        decoder = self._decoder()
+        while True:
+            if self._deadline:
+                remaining = _remaining(self._deadline, self.url)
+                if self._sock is not None:
+                    self._sock.settimeout(remaining)
+            with tracing.span('download'):
+                # read1: one socket read at most, so the deadline is checked between them.
+                data = self._raw.read1(chunk_size)
+            if not data:
+                # read1() does not mark a fully read body finished; read() does,
+                # so http.client lets the connection be reused.
+                self._raw.read()
+                break
+            tracing.count('bytes', len(data))
+            while data:
+                with tracing.span('download'):
+                    if decoder is None:
+                        chunk, data = data, b''
+                    else:
+                        try:
+                            chunk = decoder.decompress(data, chunk_size)
+                        except zlib.error:
+                            # Some servers send raw deflate without zlib headers.
+                            decoder = zlib.decompressobj(-zlib.MAX_WBITS)
+                            chunk = decoder.decompress(data, chunk_size)
+                        data = decoder.unconsumed_tail
+                if chunk:
+                    yield chunk
+        if decoder is not None:
+            tail = decoder.flush()
+            if tail:
+                yield tail
+        self._finish(reusable=True)
+
+    def iter_chunks(self, chunk_size=CHUNK_SIZE):
+        """Yield decoded body chunks as they arrive."""
+        if self._body is not None:
+            body = self._body
+            if self.max_bytes is not None and len(body) > self.max_bytes:
+                body, self.truncated = body[:self.max_bytes], True
+            if body:
+                yield body
+            if self.truncated:
+                raise BodyTooLarge(f"body larger than {self.max_bytes} bytes: {self.url}")
+            return
+        if self._raw is None:
+            return
+        delivered = 0
+        try:
+            for chunk in self._decoded_chunks(chunk_size):
+                if self.max_bytes is not None and delivered + len(chunk) > self.max_bytes:
+                    chunk = chunk[:self.max_bytes - delivered]
+                    if chunk:
+                        yield chunk
+                    self.truncated = True
+                    raise BodyTooLarge(f"body larger than {self.max_bytes} bytes: {self.url}")
+                delivered += len(chunk)
+                yield chunk
+        finally:
+            self.close()
+
+    def read(self):
+        """Read and return the whole decoded body."""
+        # A buffered body still goes through iter_chunks() to enforce max_bytes.
+        if self._body is None or self.max_bytes is not None:
+            self._body = b''.join(self.iter_chunks())
+        return self._body
+
+    @property
+    def body(self):
+        return self.read()
+
+    def text(self, encoding='utf-8'):
+        return self.read().decode(encoding, errors='replace')
+
+    def json(self):
+        body = self.read()
+        with tracing.span('parse'):
+            return json.loads(body)
+
+    def _finish(self, reusable):
+        release, self._release = self._release, None
+        raw, self._raw = self._raw, None
+        if release is not None:
+            release(reusable and raw is not None and not raw.will_close)
+
+    def close(self):
+        """Release the connection; an unfinished body makes it non-reusable."""
+        if self._raw is not None:
+            self._raw.close()
+        self._finish(reusable=False)
+
+
+# =============================================================================
+# Requests
+# =============================================================================
+
+def _default_headers(parts, headers):
+    request_headers = {
+        'Host': parts.netloc.rsplit('@', 1)[-1],
+        'User-Agent': USER_AGENT,
+        'Accept': '*/*',
+        'Accept-Encoding': 'gzip, deflate',
+    }
+    request_headers.update(headers or {})
+    return request_headers
+
+
+def _request_target(parts):
+    target = parts.path or '/'
+    if parts.query:
+        target += '?' + parts.query
+    return target
+
+
+def _redirect_method(status, method, body, headers):
+    """Method/body to use after a redirect, matching curl -L."""
+    if status == 303 or (status in (301, 302) and method == 'POST'):
+        headers.pop('Content-Type', None)
+        return 'GET', None
+    return method, body
+
+
+def _redirect_headers(url, target, headers):
+    """
+    Headers for following a redirect from url to target. Like curl -L,
+    credentials are dropped once the scheme, host or port changes.
+    """
+    old, new = urlsplit(url), urlsplit(target)
+    if (old.scheme.lower(), old.netloc.lower()) == (new.scheme.lower(), new.netloc.lower()):
+        return headers
+    return {k: v for k, v in headers.items() if k.lower() not in CREDENTIAL_HEADERS}
+
+
+def _encode_body(body, headers):
+    headers = dict(headers or {})
+    if isinstance(body, dict):
+        body = json.dumps(body).encode('utf-8')
+        headers.setdefault('Content-Type', 'application/json')
+    return body, headers
+
+
+def _remaining(deadline, url):
+    """Seconds left before deadline; TimeoutError if none are."""
+    remaining = deadline - time.monotonic()
+    if remaining <= 0:
+        raise TimeoutError(f"request timed out: {url}")
+    return remaining
+
+
+def _send(method, url, headers, body, deadline):
+    """
+    Send one request and read the response headers. Connect (at most
+    CONNECT_TIMEOUT), TLS, sending and every later socket read all share
+    the time left before `deadline` (a time.monotonic() value).
+    """
+    parts = urlsplit(url)
+    scheme = parts.scheme.lower()
+    if scheme not in ('http', 'https'):
+        raise ValueError(f"unsupported URL scheme: {url}")
+    proxy = proxy_for(url)
+    if proxy and urlsplit(proxy).scheme.lower().startswith('socks'):
+        return _send_with_curl(method, url, headers, body, _remaining(deadline, url), proxy)
+
+    host = parts.hostname
+    port = parts.port or (443 if scheme == 'https' else 80)
+    key = (scheme, host, port, proxy)
+    request_headers = _default_headers(parts, headers)
+    target = _request_target(parts)
+
+    for attempt in range(2):
+        conn = _acquire(key)
+        if proxy and scheme == 'http':
+            request_target = url.split('#', 1)[0]
+            request_headers.update(conn.proxy_headers)
+        else:
+            request_target = target
+        try:
+            remaining = _remaining(deadline, url)
+            # Used by connect() for a new connection; a pooled one has its socket.
+            conn.timeout = min(CONNECT_TIMEOUT, remaining)
+            if conn.sock is not None:
+                conn.sock.settimeout(remaining)
+            with tracing.span('ttfb'):
+                conn.request(method, request_target, body=body, headers=request_headers)
+                conn.sock.settimeout(_remaining(deadline, url))
+                raw = conn.getresponse()
+        except STALE_CONNECTION_ERRORS:
+            conn.close()
+            if conn.reused and attempt == 0:
+                continue
+            raise
+        except BaseException:
+            conn.close()
+            raise
+
+        def release(reusable, conn=conn):
+            if reusable:
+                _release(key, conn)
+            else:
+                conn.close()
+
+        return Response(url, raw.status, raw.headers, raw=raw, release=release,
+                        deadline=deadline, sock=conn.sock)
+
+
+def _parse_header_block(raw):
+    """Parse the last header block from a curl --dump-header file."""
+    # With -L curl writes one block per hop; only the final response matters.
+    blocks = [b for b in re.split(r'\r?\n\r?\n', raw) if b.strip()]
+    message = http.client.HTTPMessage()
+    if blocks:
+        for line in blocks[-1].splitlines()[1:]:
+            key, sep, value = line.partition(':')
+            if sep:
+                message[key.strip()] = value.strip()
+    return message
+
+
+def _send_with_curl(method, url, headers, body, timeout, proxy):
+    """Fallback for proxies the stdlib cannot speak (SOCKS)."""
+    cmd = ['curl', '-sS', '-L', '--compressed', '--proxy', proxy,
+           '--connect-timeout', str(min(CONNECT_TIMEOUT, timeout)), '--max-time', str(timeout),
+           '-X', method]
+    for k, v in (headers or {}).items():
+        cmd.extend(['-H', f'{k}: {v}'])
+    if body is not None:
+        cmd.extend(['--data-binary', '@-'])
+
+    with tempfile.NamedTemporaryFile(mode='r', suffix='.headers') as header_file:
+        cmd.extend(['-D', header_file.name, '-w', '\n%{http_code}', url])
+        result = subprocess.run(cmd, input=body, capture_output=True)
+        if result.returncode != 0:
+            raise RuntimeError(f"curl failed: {result.stderr.decode(errors='replace')}")
+        response_headers = _parse_header_block(header_file.read())
+
+    payload, _, status = result.stdout.rpartition(b'\n')
+    # curl already followed redirects and decoded the body.
+    del response_headers['Content-Encoding']
+    return Response(url, int(status or 0), response_headers, body=payload)
+
+
+def request(url, method='GET', headers=None, body=None, timeout=MAX_TIME, stream=False,
+            max_bytes=None):
+    """
+    Perform an HTTP request, following redirects like curl -L: credential
+    headers are not sent on to another host.
+
+    body may be bytes or a dict (sent as JSON). Returns a Response; unless
+    stream=True the body has already been read and the connection released.
+    max_bytes caps the decoded body (see Response).
+
+    timeout bounds the whole request like curl --max-time: connecting,
+    redirects, waiting for the response and reading the body.
+    """
+    body, headers = _encode_body(body, headers)
+    deadline = time.monotonic() + timeout
+
+    for _ in range(MAX_REDIRECTS + 1):
+        response = _send(method, url, headers, body, deadline)
+        location = response.headers.get('Location')
+        if response.status in REDIRECT_STATUSES and location:
+            response.read()
+            target = urljoin(url, location)
+            headers = _redirect_headers(url, target, headers)
+            url = target
+            method, body = _redirect_method(response.status, method, body, headers)
+            continue
+        response.max_bytes = max_bytes
+        if not stream:
+            response.read()
+        return response
+    raise RuntimeError(f"too many redirects: {url}")
+
+
+# =============================================================================
+# asyncio transport
+# =============================================================================
+
+def _decode_body(body, headers, max_bytes=None):
+    """Decompress a buffered body; with max_bytes, stop one byte past the cap."""
+    encoding = (headers.get('Content-Encoding') or '').lower()
+    if not body or encoding not in ('gzip', 'x-gzip', 'deflate'):
+        return body
+    limit = max_bytes + 1 if max_bytes is not None else 0
+    try:
+        return zlib.decompressobj(32 + zlib.MAX_WBITS).decompress(body, limit)
+    except zlib.error:
+        return zlib.decompressobj(-zlib.MAX_WBITS).decompress(body, limit)
+
+
+async def _read_headers(reader):
+    message = http.client.HTTPMessage()
+    while True:
+        line = await reader.readline()
+        if line in (b'\r\n', b'\n', b''):
+            return message
+        key, sep, value = line.decode('latin-1').partition(':')
+        if sep:
+            message[key.strip()] = value.strip()
+
+
+async def _read_chunked(reader, limit=None):
+    """Chunked body as (payload, truncated), stopping once past limit bytes."""
+    chunks = []
+    received = 0
+    while True:
+        size_line = await reader.readline()
+        size = int(size_line.split(b';', 1)[0].strip() or b'0', 16)
+        if size == 0:
+            # Skip trailers up to the terminating blank line.
+            await _read_headers(reader)
+            return b''.join(chunks), False
+        chunks.append(await reader.readexactly(size))
+        await reader.readexactly(2)
+        received += size
+        if limit is not None and received > limit:
+            return b''.join(chunks), True
+
+
+async def _read_to_eof(reader, limit=None):
+    """Body delimited by connection close as (payload, truncated)."""
+    if limit is None:
+        return await reader.read(), False
+    chunks = []
+    received = 0
+    while received <= limit:
+        chunk = await reader.read(CHUNK_SIZE)
+        if not chunk:
+            return b''.join(chunks), False
+        chunks.append(chunk)
+        received += len(chunk)
+    return b''.join(chunks), True
+
+
+class AsyncClient:
+    """
+    Single-threaded asyncio HTTP/1.1 client with its own keep-alive pool.
+
+    Bound to the event loop it is used on; use as `async with AsyncClient()`.
+    Proxy selection and DNS caching match the blocking transport.
+    """
+
+    def __init__(self):
+        self._idle = {}
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, *exc):
+        self.close()
+
+    def close(self):
+        for conns in self._idle.values():
+            for _, writer in conns:
+                writer.close()
+        self._idle.clear()
+
+    async def _resolve(self, host, port):
+        now = time.monotonic()
+        with _dns_lock:
+            cached = _dns_cache.get((host, port))
+        if cached and cached[0] > now:
+            return cached[1]
+        with tracing.span('dns', host=host):
+            infos = await asyncio.get_running_loop().getaddrinfo(host, port, type=socket.SOCK_STREAM)
+        with _dns_lock:
+            _dns_cache[(host, port)] = (now + DNS_TTL, infos)
+        return infos
+
+    async def _open_tcp(self, host, port, **kwargs):
+        last_error = None
+        for family, _, _, _, sockaddr in await self._resolve(host, port):
+            try:
+                with tracing.span('connect', host=host):
+                    return await asyncio.wait_for(
+                        asyncio.open_connection(sockaddr[0], sockaddr[1], family=family, **kwargs),
+                        CONNECT_TIMEOUT,
+                    )
+            except (OSError, asyncio.TimeoutError) as e:
+                last_error = e
+        raise last_error or OSError(f"could not resolve {host}")
+
+    async def _connect(self, scheme, host, port, proxy):
+        tls = _ssl_context() if scheme == 'https' else None
+        if not proxy:
+            if tls:
+                return await self._open_tcp(host, port, ssl=tls, server_hostname=host)
+            return await self._open_tcp(host, port)
+
+        proxy_parts = urlsplit(proxy)
+        reader, writer = await self._open_tcp(proxy_parts.hostname, proxy_parts.port or 8080)
+        if scheme == 'https':
+            lines = [f'CONNECT {host}:{port} HTTP/1.1', f'Host: {host}:{port}']
+            lines += [f'{k}: {v}' for k, v in self._proxy_headers(proxy).items()]
+            writer.write(('\r\n'.join(lines) + '\r\n\r\n').encode('latin-1'))
+            status_line = await reader.readline()
+            await _read_headers(reader)
+            if b' 200' not in status_line:
+                writer.close()
+                raise ConnectionError(f"proxy CONNECT failed: {status_line.decode('latin-1').strip()}")
+            await writer.start_tls(tls, server_hostname=host)
+        return reader, writer
+
+    @staticmethod
+    def _proxy_headers(proxy):
+        proxy_parts = urlsplit(proxy)
+        if not proxy_parts.username:
+            return {}
+        credentials = f"{unquote(proxy_parts.username)}:{unquote(proxy_parts.password or '')}"
+        return {'Proxy-Authorization': 'Basic ' + b64encode(credentials.encode()).decode()}
+
+    async def _send(self, method, url, headers, body, max_bytes=None):
+        parts = urlsplit(url)
+        scheme = parts.scheme.lower()
+        if scheme not in ('http', 'https'):
+            raise ValueError(f"unsupported URL scheme: {url}")
+        proxy = proxy_for(url)
+        if proxy and urlsplit(proxy).scheme.lower().startswith('socks'):
+            return await asyncio.to_thread(_send_with_curl, method, url, headers, body, MAX_TIME, proxy)
+
+        port = parts.port or (443 if scheme == 'https' else 80)
+        key = (scheme, parts.hostname, port, proxy)
+        request_headers = _default_headers(parts, headers)
+        if body is not None:
+            request_headers['Content-Length'] = str(len(body))
+        if proxy and scheme == 'http':
+            target = url.split('#', 1)[0]
+            request_headers.update(self._proxy_headers(proxy))
+        else:
+            target = _request_target(parts)
+        head = f'{method} {target} HTTP/1.1\r\n' + ''.join(
+            f'{k}: {v}\r\n' for k, v in request_headers.items()
+        ) + '\r\n'
+
+        for attempt in range(2):
+            idle = self._idle.get(key)
+            reused = bool(idle)
+            reader, writer = idle.pop() if idle else await self._connect(*key)
+            try:
+                with tracing.span('ttfb'):
+                    writer.write(head.encode('latin-1') + (body or b''))
+                    await writer.drain()
+                    status, response_headers, payload, keep_alive, truncated = \
+                        await self._read_response(reader, method, max_bytes)
+            except (ConnectionError, asyncio.IncompleteReadError):
+                writer.close()
+                if reused and attempt == 0:
+                    continue
+                raise
+            except BaseException:
+                writer.close()
+                raise
+            if keep_alive and len(self._idle.get(key, ())) < MAX_IDLE_PER_HOST:
+                self._idle.setdefault(key, []).append((reader, writer))
+            else:
+                writer.close()
+            return Response(url, status, response_headers,
+                            body=_decode_body(payload, response_headers, max_bytes),
+                            max_bytes=max_bytes, truncated=truncated)
+
+    async def _read_response(self, reader, method, max_bytes=None):
+        """
+        Status, headers, raw payload, keep-alive and whether the payload was
+        cut off after max_bytes (the connection is then not reused).
+        """
+        while True:
+            status_line = await reader.readline()
+            if not status_line:
+                raise ConnectionResetError("connection closed before response")
+            version, status, _ = (status_line.decode('latin-1').split(' ', 2) + [''])[:3]
+            status = int(status)
+            headers = await _read_headers(reader)
+            if status >= 200 or status == 101:
+                break
+
+        keep_alive = version.upper() == 'HTTP/1.1' and (headers.get('Connection') or '').lower() != 'close'
+        truncated = False
+        with tracing.span('download'):
+            if method == 'HEAD' or status in (204, 304):
+                payload = b''
+            elif 'chunked' in (headers.get('Transfer-Encoding') or '').lower():
+                payload, truncated = await _read_chunked(reader, max_bytes)
+            elif headers.get('Content-Length') is not None:
+                length = int(headers['Content-Length'])
+                if max_bytes is not None and length > max_bytes:
+                    length, truncated = max_bytes, True
+                payload = await reader.readexactly(length)
+            else:
+                payload, truncated = await _read_to_eof(reader, max_bytes)
+                keep_alive = False
+        tracing.count('bytes', len(payload))
+        return status, headers, payload, keep_alive and not truncated, truncated
+
+    async def request(self, url, method='GET', headers=None, body=None, max_bytes=None):
+        """
+        Async counterpart of request(); the body is always read eagerly, but
+        no further than max_bytes on the wire.
+        """
+        body, headers = _encode_body(body, headers)
+
+        for _ in range(MAX_REDIRECTS + 1):
+            response = await self._send(method, url, headers, body, max_bytes)
+            location = response.headers.get('Location')
+            if response.status in REDIRECT_STATUSES and location:
+                target = urljoin(url, location)
+                headers = _redirect_headers(url, target, headers)
+                url = target
+                method, body = _redirect_method(response.status, method, body, headers)
+                continue
+            # Also caps bodies buffered by the curl fallback.
+            response.max_bytes = max_bytes
+            return response
+        raise RuntimeError(f"too many redirects: {url}")